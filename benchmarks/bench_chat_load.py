@@ -0,0 +1,375 @@
+"""
+Load a running app with many concurrent headless sessions on the chat page.
+
+Every session opens the same websocket a browser tab does and speaks Streamlit's protobufs to it.
+Sessions send chat input, regenerate and delete actions at --rate actions per second each, mixed
+by --mix, for --duration seconds. The report has p50/p95/p99 rerun latency and error rates per
+action. "database is locked" errors are counted separately, and so are timed out and dropped
+sessions. --max-p95-ms, --max-p99-ms and --max-error-rate turn it into a release gate that exits
+with status 1 when a limit is exceeded.
+
+Pages need a logged in session, pass the Cookie header of a logged in browser tab with --cookie.
+Start the app with NAOMI_PERF_INSTRUMENTATION=1 and NAOMI_PERF_EXPORT_PATH, then pass that file
+as --perf-log to report time spent in write statements, which includes waiting for the SQLite
+write lock. Point the app at benchmarks.fake_llm_server to keep generations cheap and repeatable.
+
+Usage:
+    python -m benchmarks.bench_chat_load --url http://localhost:8501 --sessions 32 --rate 0.5 \\
+        --duration 60 --cookie "$COOKIE" --perf-log perf.jsonl --max-p95-ms 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.runtime.state.common import user_key_from_element_id
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import WebSocketClosedError, websocket_connect
+
+from benchmarks.common import current_commit, emit, percentiles
+
+ACTIONS = ("chat", "regenerate", "delete")
+LOCK_ERROR = "database is locked"
+XSRF_COOKIE = "_streamlit_xsrf"
+
+
+@dataclass
+class RunResult:
+    latency: float
+    # Type names of the exceptions the page showed
+    exceptions: list[str] = field(default_factory=list)
+    locked: bool = False
+
+
+class ChatSession:
+    """One headless browser tab on the chat page."""
+
+    def __init__(self, url: str, cookie: Optional[str], timeout: float):
+        self.url = url
+        self.cookie = cookie
+        self.timeout = timeout
+        self.connection = None
+        self.page_script_hash = ""
+        # Widget ids of the last run by user key, and the chat input's id
+        self.widgets: dict[str, str] = {}
+        # Values of the last run's stateful widgets by id, sent back with every rerun
+        self.states: dict[str, WidgetState] = {}
+        self.drawn_states: dict[str, WidgetState] = {}
+        self.chat_input_id: Optional[str] = None
+        # Messages the server may send again as a reference to their hash
+        self.cached: dict[str, ForwardMsg] = {}
+
+    async def connect(self):
+        protocols = ["streamlit"]
+        if self.cookie:
+            # The browser proves it can read the XSRF cookie by echoing it as a subprotocol
+            xsrf = SimpleCookie(self.cookie).get(XSRF_COOKIE)
+            if xsrf is not None:
+                protocols.append(xsrf.value)
+        request = HTTPRequest(
+            stream_url(self.url), headers={"Cookie": self.cookie} if self.cookie else {}
+        )
+        self.connection = await websocket_connect(request, subprotocols=protocols)
+        self.page_script_hash = ""
+        self.cached.clear()
+        self.states = {}
+        await self.rerun()
+        if self.chat_input_id is None:
+            raise RuntimeError(
+                "The page did not draw a chat input, pass the cookie of a logged in session"
+            )
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    async def rerun(self, widget_state: Optional[WidgetState] = None) -> RunResult:
+        """Send one interaction and wait for the script run it causes, and any st.rerun, to end."""
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        # Like a browser, send every widget's value along with the one that triggered the rerun
+        states = dict(self.states)
+        if widget_state is not None:
+            states[widget_state.id] = widget_state
+        msg.rerun_script.widget_states.widgets.extend(states.values())
+        started = time.perf_counter()
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+        result = RunResult(0.0)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            payload = await asyncio.wait_for(
+                self.connection.read_message(), max(deadline - time.monotonic(), 0)
+            )
+            if payload is None:
+                raise WebSocketClosedError()
+            forward = self.parse(payload)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+                self.widgets = {}
+                self.drawn_states = {}
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.collect(forward.delta.new_element, result)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    result.exceptions.append("CompileError")
+                if forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.states = self.drawn_states
+                    result.latency = time.perf_counter() - started
+                    return result
+
+    def parse(self, payload: bytes) -> ForwardMsg:
+        forward = ForwardMsg()
+        forward.ParseFromString(payload)
+        if forward.WhichOneof("type") == "ref_hash":
+            return self.cached[forward.ref_hash]
+        if forward.hash:
+            self.cached[forward.hash] = forward
+        return forward
+
+    def collect(self, element, result: RunResult):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            result.exceptions.append(element.exception.type)
+            result.locked = result.locked or LOCK_ERROR in element.exception.message
+        elif kind == "chat_input":
+            self.chat_input_id = element.chat_input.id
+        elif kind == "button":
+            key = user_key_from_element_id(element.button.id)
+            if key is not None:
+                self.widgets[key] = element.button.id
+        elif kind in ("checkbox", "radio"):
+            self.keep_state(getattr(element, kind))
+
+    def keep_state(self, widget):
+        """Keep the value a stateful widget was drawn with; the page may set it, users do not."""
+        if widget.id in self.states and not widget.set_value:
+            state = self.states[widget.id]
+        else:
+            state = WidgetState(id=widget.id)
+            value = widget.value if widget.set_value else widget.default
+            if isinstance(value, bool):
+                state.bool_value = value
+            else:
+                state.int_value = value
+        self.drawn_states[widget.id] = state
+
+    def newest_button(self, prefix: str) -> Optional[str]:
+        keys = [key for key in self.widgets if key.startswith(prefix)]
+        if not keys:
+            return None
+        return self.widgets[max(keys, key=lambda key: int(key.removeprefix(prefix)))]
+
+    def action_state(self, action: str, number: int) -> tuple[str, WidgetState]:
+        """The widget state of an action; regenerate and delete act on the newest message."""
+        button_id = None
+        if action != "chat":
+            button_id = self.newest_button(f"{action}_")
+        if button_id is None:
+            action = "chat"
+            state = WidgetState(id=self.chat_input_id)
+            state.chat_input_value.data = f"Load test message {number}"
+            return action, state
+        return action, WidgetState(id=button_id, trigger_value=True)
+
+
+def stream_url(url: str) -> str:
+    parts = urlsplit(url)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return urlunsplit((scheme, parts.netloc, parts.path.rstrip("/") + "/_stcore/stream", "", ""))
+
+
+@dataclass
+class LoadStats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    actions: Counter = field(default_factory=Counter)
+    exception_types: dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def record(self, action: str, result: RunResult):
+        self.actions[action] += 1
+        self.latencies[action].append(result.latency * 1000)
+        if result.exceptions:
+            self.errors[action]["lock" if result.locked else "exception"] += 1
+            self.exception_types[action].update(set(result.exceptions))
+
+    def record_failure(self, action: str, kind: str):
+        self.actions[action] += 1
+        self.errors[action][kind] += 1
+
+
+async def session_loop(
+    url: str,
+    cookie: Optional[str],
+    timeout: float,
+    rate: float,
+    mix: dict[str, float],
+    deadline: float,
+    stats: LoadStats,
+    seed: int,
+):
+    rng = random.Random(seed)
+    session = ChatSession(url, cookie, timeout)
+    await session.connect()
+    next_at = time.monotonic()
+    number = 0
+    try:
+        while True:
+            # Poisson arrivals; a session waits for its previous rerun like a browser tab does
+            next_at += rng.expovariate(rate)
+            if next_at >= deadline:
+                break
+            await asyncio.sleep(max(next_at - time.monotonic(), 0))
+            number += 1
+            requested = rng.choices(list(mix), weights=list(mix.values()))[0]
+            action, state = session.action_state(requested, number)
+            try:
+                stats.record(action, await session.rerun(state))
+            except (asyncio.TimeoutError, WebSocketClosedError) as e:
+                stats.record_failure(
+                    action, "timeout" if isinstance(e, asyncio.TimeoutError) else "disconnect"
+                )
+                # Start over in a new session, as a browser tab would after reconnecting
+                session.close()
+                await session.connect()
+    finally:
+        session.close()
+
+
+def read_perf_log(path: str, since: float) -> list[dict]:
+    with open(path) as f:
+        profiles = [json.loads(line) for line in f if line.strip()]
+    return [profile for profile in profiles if profile["started_at"] >= since]
+
+
+def summarize(stats: LoadStats, elapsed: float, perf_log: Optional[str], since: float) -> list:
+    commit = current_commit()
+    rows = []
+    for action in (*ACTIONS, "all"):
+        if action == "all":
+            latencies = [value for values in stats.latencies.values() for value in values]
+            errors = sum((stats.errors[name] for name in ACTIONS), Counter())
+            exception_types = sum((stats.exception_types[name] for name in ACTIONS), Counter())
+            count = sum(stats.actions.values())
+        else:
+            latencies, errors, exception_types, count = (
+                stats.latencies[action],
+                stats.errors[action],
+                stats.exception_types[action],
+                stats.actions[action],
+            )
+        if not count:
+            continue
+        rerun = percentiles(latencies)
+        row = {
+            "commit": commit,
+            "action": action,
+            "reruns": count,
+            "reruns_per_s": round(count / elapsed, 2),
+            "errors": sum(errors.values()),
+            "lock_errors": errors["lock"],
+            "timeouts": errors["timeout"],
+            "disconnects": errors["disconnect"],
+            "error_rate": round(sum(errors.values()) / count, 4),
+            "exception_types": ",".join(
+                f"{name}:{number}" for name, number in exception_types.most_common()
+            ),
+            **{f"rerun_p{point}_ms": round(value, 1) for point, value in rerun.items()},
+        }
+        rows.append(row)
+
+    if perf_log and rows:
+        profiles = read_perf_log(perf_log, since)
+        write_time = percentiles([profile["sql_write_time"] * 1000 for profile in profiles])
+        rows[-1].update(
+            {
+                "profiled_reruns": len(profiles),
+                **{f"write_p{point}_ms": round(value, 1) for point, value in write_time.items()},
+            }
+        )
+    return rows
+
+
+def check_gates(
+    summary: dict,
+    max_p95_ms: Optional[float],
+    max_p99_ms: Optional[float],
+    max_error_rate: Optional[float],
+) -> list[str]:
+    failures = []
+    for metric, limit in (
+        ("rerun_p95_ms", max_p95_ms),
+        ("rerun_p99_ms", max_p99_ms),
+        ("error_rate", max_error_rate),
+    ):
+        if limit is not None and summary[metric] > limit:
+            failures.append(f"{metric} {summary[metric]} > {limit}")
+    return failures
+
+
+async def run(args, mix: dict[str, float]) -> list[dict]:
+    stats = LoadStats()
+    since = time.time()
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            session_loop(args.url, args.cookie, args.timeout, args.rate, mix, deadline, stats, seed)
+            for seed in range(args.sessions)
+        )
+    )
+    return summarize(stats, time.monotonic() - started, args.perf_log, since)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        action, _, weight = part.partition("=")
+        if action not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Unknown action {action!r}, expected {ACTIONS}")
+        mix[action] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", type=str, default="http://localhost:8501")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.5, help="Actions per second per session")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default="chat=6,regenerate=3,delete=1")
+    parser.add_argument("--cookie", type=str, default=None, help="Cookie header to send")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per rerun")
+    parser.add_argument("--perf-log", type=str, default=None, help="The app's perf export file")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args, args.mix))
+    emit(results, args.output)
+    if not results:
+        print("FAILED no action was sent, increase --duration or --rate")
+        sys.exit(1)
+
+    failures = check_gates(results[-1], args.max_p95_ms, args.max_p99_ms, args.max_error_rate)
+    for failure in failures:
+        print(f"FAILED {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare the per-rerun data cost of the chat view with and without windowed loading.
+
+Each measurement covers what draw_chat does with the database on a rerun: load the messages and
+decode their payloads. The full history load grows with the conversation, the window does not.
+
+Usage:
+    python -m benchmarks.bench_chat_window --sizes 10000 100000
+"""
+
+import argparse
+
+from naomi_core.db.chat import fetch_messages
+from naomi_streamlit.chat.window import fetch_message_window
+from naomi_streamlit.config import CHAT_WINDOW_SIZE
+from benchmarks.common import emit, seed_messages, temporary_database, time_call
+
+CONVERSATION_ID = 1
+
+
+def full_history(session):
+    return [message.payload for message in fetch_messages(session, CONVERSATION_ID)]
+
+
+def windowed(session):
+    window = fetch_message_window(session, CONVERSATION_ID, CHAT_WINDOW_SIZE)
+    return [message.payload for message in window.messages]
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        with temporary_database() as session_factory:
+            seed_messages(session_factory, CONVERSATION_ID, size)
+            for name, load in (("full_history", full_history), ("windowed", windowed)):
+                with session_factory() as session:
+                    # A fresh identity map per call, like a fresh session_scope per rerun
+                    ms = time_call(lambda: (load(session), session.expunge_all()), repeat)
+                results.append({"messages": size, "loader": name, "rerun_ms": round(ms, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    emit(run(args.sizes, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare the per-rerun data cost of the events page with and without keyset pagination.
+
+"legacy" is the old show_events query that loads every event. The paginated queries load one
+page, either the first one, one deep in the table (reached through its cursor), or a filtered
+one. Their cost should stay flat as the table grows.
+
+Usage:
+    python -m benchmarks.bench_events --sizes 10000 100000 1000000 --legacy-max 100000
+"""
+
+import argparse
+
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.config import EVENTS_PAGE_SIZE
+from naomi_streamlit.events.queries import fetch_event_page, record_payload_sizes
+from benchmarks.common import emit, seed_events, temporary_database, time_call
+
+
+def legacy(session):
+    return session.query(WebhookEvent).order_by(WebhookEvent.created_at.asc()).all()
+
+
+def deep_cursor(session, size: int):
+    middle = session.get(WebhookEvent, size // 2)
+    return (middle.created_at, middle.id)
+
+
+def run(sizes: list[int], page_size: int, legacy_max: int, repeat: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        with temporary_database() as session_factory:
+            seed_events(session_factory, size)
+            with session_factory() as session:
+                record_payload_sizes(session)
+                session.commit()
+                cursor = deep_cursor(session, size)
+                loaders = {
+                    # What every rerun pays to keep payload sizes up to date once they are
+                    "idle_size_recording": lambda: record_payload_sizes(session),
+                    "first_page": lambda: fetch_event_page(session, page_size),
+                    "deep_page": lambda: fetch_event_page(session, page_size, cursor),
+                    "filtered_page": lambda: fetch_event_page(
+                        session, page_size, event_type="sms", status="failed"
+                    ),
+                }
+                if size <= legacy_max:
+                    loaders["legacy"] = lambda: legacy(session)
+                for name, load in loaders.items():
+                    ms = time_call(lambda: (load(), session.expunge_all()), repeat)
+                    results.append({"events": size, "query": name, "rerun_ms": round(ms, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--page-size", type=int, default=EVENTS_PAGE_SIZE)
+    parser.add_argument(
+        "--legacy-max", type=int, default=100_000, help="Largest table to run the legacy load on"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    emit(run(args.sizes, args.page_size, args.legacy_max, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
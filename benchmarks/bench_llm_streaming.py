@@ -0,0 +1,148 @@
+"""
+Measure concurrent chat generations against the fake streaming LLM server.
+
+Starts benchmarks.fake_llm_server in-process and points naomi_core at it, then every simulated
+user adds a message to its own conversation and generates --generations-per-user responses
+through generate_response, the same path the chat page takes. Reports latency,
+time-to-first-token percentiles, throughput and how many generations failed.
+
+Usage:
+    python -m benchmarks.bench_llm_streaming --users 1 8 32 --ttft-ms 300 --token-delay-ms 20
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Iterator
+
+from sqlalchemy import create_engine
+
+from naomi_core.db.core import Base
+from naomi_streamlit.db.engine import Database, create_database
+from benchmarks.common import emit, percentiles
+from benchmarks.fake_llm_server import FakeLLMConfig, FakeLLMServer, start_fake_llm_server
+
+
+def simulate(db: Database, server: FakeLLMServer, users: int, generations_per_user: int) -> dict:
+    # naomi_core reads the OpenAI settings when the assistant modules are first used
+    from naomi_core.db.chat import Message, MessageModel, add_message_to_db
+    from naomi_streamlit.chat.assistant import show_llm_generation
+    from naomi_streamlit.chat.response_cache import generate_response
+
+    latencies, first_tokens, errors = [], [], Counter()
+    lock = threading.Lock()
+
+    def user_loop(conversation_id: int):
+        local_latencies, local_first_tokens, local_errors = [], [], Counter()
+        with db.session_factory() as session:
+            for i in range(generations_per_user):
+                start = time.perf_counter()
+                first_token_at = []
+
+                def timed_show(chunks: Iterator[str]) -> str:
+                    def timed_chunks():
+                        for chunk in chunks:
+                            if not first_token_at:
+                                first_token_at.append(time.perf_counter())
+                            yield chunk
+
+                    return show_llm_generation(timed_chunks())
+
+                try:
+                    add_message_to_db(
+                        Message(content=f"Question {i}", role="user"), session, conversation_id
+                    )
+                    generate_response(
+                        MessageModel.from_llm_response(conversation_id, ""), timed_show, session
+                    )
+                except Exception as e:
+                    # Injected 500s and dropped streams surface as OpenAI client errors, lock
+                    # timeouts as OperationalError
+                    session.rollback()
+                    local_errors[type(e).__name__] += 1
+                    continue
+                local_latencies.append((time.perf_counter() - start) * 1000)
+                if first_token_at:
+                    local_first_tokens.append((first_token_at[0] - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            first_tokens.extend(local_first_tokens)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=user_loop, args=(user + 1,)) for user in range(users)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    latency = percentiles(latencies)
+    ttft = percentiles(first_tokens)
+    return {
+        "generations": len(latencies),
+        "errors": sum(errors.values()),
+        "error_types": ",".join(f"{name}:{count}" for name, count in errors.most_common()),
+        "generations_per_s": round(len(latencies) / elapsed, 2),
+        "tokens_per_s": round(len(latencies) * server.config.tokens / elapsed, 1),
+        **{f"latency_p{point}_ms": round(value, 1) for point, value in latency.items()},
+        **{f"ttft_p{point}_ms": round(value, 1) for point, value in ttft.items()},
+        "server_requests": server.counts["requests"],
+        "server_errors": server.counts["errors"],
+        "server_disconnects": server.counts["disconnects"],
+    }
+
+
+def run(users: list[int], generations_per_user: int, config: FakeLLMConfig) -> list[dict]:
+    # One server for every user count, naomi_core keeps the base URL it first read
+    server = start_fake_llm_server(config)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.setdefault("OPENAI_BASE_MODEL", "fake")
+    results = []
+    try:
+        for user_count in users:
+            server.reset()
+            with tempfile.TemporaryDirectory() as tmp:
+                url = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}").url
+                db = create_database(url)
+                Base.metadata.create_all(bind=db.engine)
+                result = simulate(db, server, user_count, generations_per_user)
+                db.engine.dispose()
+                db.read_engine.dispose()
+            results.append({"users": user_count, **result})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--generations-per-user", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        args.ttft_ms,
+        args.token_delay_ms,
+        args.tokens,
+        args.error_rate,
+        args.disconnect_rate,
+        args.seed,
+    )
+    emit(run(args.users, args.generations_per_user, config), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Estimate websocket bytes per rerun of the chat history before and after the render cache.
+
+The script runs under streamlit.testing and captures the ForwardMsgs of each run, then replays
+the server's message cache (streamlit.runtime.Runtime._send_message): a large message the
+session already received is sent as a reference to its hash instead of in full.
+
+"before" draws every message with its own controls, as draw_messages did for the whole
+conversation. "after" draws pre-rendered history blocks plus the interactive live tail.
+
+Usage:
+    python -m benchmarks.bench_render --messages 1000
+"""
+
+import argparse
+from unittest.mock import patch
+
+from streamlit import config
+from streamlit.runtime.forward_msg_cache import create_reference_msg, populate_hash_if_needed
+from streamlit.runtime.runtime_util import is_cacheable_msg
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+from benchmarks.common import emit
+
+
+def chat_script(count: int, render_cache: bool):  # pragma: no cover
+    from unittest.mock import MagicMock
+    import streamlit as st
+    from naomi_core.db.chat import Message, MessageModel
+    from naomi_streamlit.chat.chat import draw_messages
+    from naomi_streamlit.chat.render import draw_history, split_live_messages
+    from naomi_streamlit.config import CHAT_LIVE_MESSAGES
+
+    messages = [
+        MessageModel(
+            conversation_id=1,
+            id=i,
+            content=Message(
+                content=f"Message {i} " + "lorem ipsum " * 20,
+                role="user" if i % 2 else "assistant",
+            ).to_json(),
+        )
+        for i in range(1, count + 1)
+    ]
+    st.header("💬 Chat")
+    if render_cache:
+        history, live = split_live_messages(messages, CHAT_LIVE_MESSAGES)
+        draw_history(history)
+        draw_messages(live, MagicMock())
+    else:
+        draw_messages(messages, MagicMock())
+
+
+class WebsocketSimulator:
+    """Replays the per-session ForwardMsg cache of the Streamlit server."""
+
+    def __init__(self):
+        self.sent_hashes: set[str] = set()
+
+    def send(self, msgs) -> int:
+        total = 0
+        for msg in msgs:
+            msg_to_send = msg
+            if is_cacheable_msg(msg):
+                msg_hash = populate_hash_if_needed(msg)
+                if msg_hash in self.sent_hashes:
+                    msg_to_send = create_reference_msg(msg)
+                self.sent_hashes.add(msg_hash)
+            total += msg_to_send.ByteSize()
+        return total
+
+
+def measure(count: int, render_cache: bool, reruns: int) -> dict:
+    captured: list = []
+    parse = local_script_runner.parse_tree_from_messages
+
+    def capture(msgs):
+        captured.append(list(msgs))
+        return parse(msgs)
+
+    simulator = WebsocketSimulator()
+    with patch.object(local_script_runner, "parse_tree_from_messages", capture):
+        at = AppTest.from_function(chat_script, args=(count, render_cache), default_timeout=60)
+        for _ in range(reruns + 1):
+            at.run()
+    assert not at.exception, at.exception
+
+    sent = [simulator.send(msgs) for msgs in captured]
+    return {
+        "messages": count,
+        "render_cache": render_cache,
+        "first_run_bytes": sent[0],
+        "rerun_bytes": max(sent[1:]),
+    }
+
+
+def run(count: int, reruns: int) -> list[dict]:
+    print(f"minCachedMessageSize={config.get_option('global.minCachedMessageSize')}")
+    return [measure(count, render_cache, reruns) for render_cache in (False, True)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000)
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    emit(run(args.messages, args.reruns), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measure read and write throughput of concurrent sessions against a SQLite file.
+
+Every simulated session loops for --duration seconds. Each iteration either loads the chat window
+of its conversation or writes one message, with one write every --write-every iterations. The
+"default" profile is a plain pooled engine on the rollback journal. The "tuned" profile is the
+SQLite profile with WAL and a separate read-only pool.
+
+Usage:
+    python -m benchmarks.bench_sqlite_concurrency --sessions 1 8 32 --duration 5
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from naomi_core.db.chat import Message, MessageModel
+from naomi_core.db.core import Base
+from naomi_streamlit.chat.window import fetch_message_window
+from naomi_streamlit.config import CHAT_WINDOW_SIZE
+from naomi_streamlit.db.engine import Database, create_database
+from benchmarks.common import emit, seed_messages
+
+PROFILES = {"default": False, "tuned": True}
+
+
+def write_message(db: Database, conversation_id: int, message_id: int):
+    with db.session_factory() as session:
+        session.execute(
+            MessageModel.__table__.insert(),
+            {
+                "conversation_id": conversation_id,
+                "id": message_id,
+                "content": Message(content=f"Message {message_id}", role="user").to_json(),
+            },
+        )
+        session.commit()
+
+
+def read_window(db: Database, conversation_id: int):
+    with db.read_session_factory() as session:
+        fetch_message_window(session, conversation_id, CHAT_WINDOW_SIZE)
+        session.expunge_all()
+
+
+def simulate(db: Database, sessions: int, duration: float, write_every: int) -> dict:
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    message_ids = itertools.count(1_000_000)
+    deadline = time.monotonic() + duration
+
+    def session_loop(conversation_id: int):
+        local = {"reads": 0, "writes": 0, "errors": 0}
+        for iteration in itertools.count():
+            if time.monotonic() >= deadline:
+                break
+            try:
+                if iteration % write_every == write_every - 1:
+                    write_message(db, conversation_id, next(message_ids))
+                    local["writes"] += 1
+                else:
+                    read_window(db, conversation_id)
+                    local["reads"] += 1
+            except OperationalError:
+                # "database is locked" once the busy timeout, if any, runs out
+                local["errors"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [
+        threading.Thread(target=session_loop, args=(conversation_id % 4 + 1,))
+        for conversation_id in range(sessions)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return {
+        "reads_per_s": round(counts["reads"] / elapsed, 1),
+        "writes_per_s": round(counts["writes"] / elapsed, 1),
+        "errors": counts["errors"],
+    }
+
+
+def run(sessions: list[int], duration: float, write_every: int, messages: int) -> list[dict]:
+    results = []
+    for profile, sqlite_profile in PROFILES.items():
+        for session_count in sessions:
+            with tempfile.TemporaryDirectory() as tmp:
+                url = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}").url
+                db = create_database(url, sqlite_profile=sqlite_profile)
+                Base.metadata.create_all(bind=db.engine)
+                for conversation_id in range(1, 5):
+                    seed_messages(db.session_factory, conversation_id, messages)
+                result = simulate(db, session_count, duration, write_every)
+                results.append({"profile": profile, "sessions": session_count, **result})
+                db.engine.dispose()
+                db.read_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per measurement")
+    parser.add_argument("--write-every", type=int, default=5, help="One write per N iterations")
+    parser.add_argument("--messages", type=int, default=1_000, help="Messages per conversation")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    emit(run(args.sessions, args.duration, args.write_every, args.messages), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure time-to-first-paint and per-rerun latency of app.py before and after the bootstrap layer.
+
+"legacy" replays the old main(): load_dotenv, argv parsing, logging setup and initialize_db on
+every script run. "bootstrap" goes through naomi_streamlit.bootstrap, which does that work once
+per process. Login and chat rendering are stubbed out so only the startup overhead is measured.
+
+Usage:
+    python -m benchmarks.bench_startup --reruns 20
+"""
+
+import argparse
+import statistics
+import time
+from unittest.mock import patch
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.common import emit
+
+
+def legacy_app():  # pragma: no cover
+    import argparse
+    import logging
+    from dotenv import load_dotenv
+    from naomi_core.db.core import initialize_db
+    from naomi_streamlit.home import run
+
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log_level", type=str, default="INFO")
+    args, _ = parser.parse_known_args()
+    logging.basicConfig(level=args.log_level.upper())
+    initialize_db()
+    run()
+
+
+def bootstrap_app():  # pragma: no cover
+    from naomi_streamlit.bootstrap import bootstrap
+    from naomi_streamlit.home import run
+
+    bootstrap()
+    run()
+
+
+def measure(script, reruns: int) -> dict:
+    from naomi_streamlit.bootstrap import bootstrap
+
+    bootstrap.clear()
+    at = AppTest.from_function(script)
+    start = time.perf_counter()
+    at.run()
+    first_paint_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    assert not at.exception, at.exception
+
+    return {
+        "first_paint_ms": round(first_paint_ms, 2),
+        "rerun_p50_ms": round(statistics.median(timings), 2),
+        "rerun_max_ms": round(max(timings), 2),
+    }
+
+
+def run(reruns: int) -> list[dict]:
+    with (
+        patch("naomi_streamlit.home.handle_login", return_value=True),
+        patch("naomi_streamlit.home.draw_chat"),
+    ):
+        return [
+            {"app": "legacy", **measure(legacy_app, reruns)},
+            {"app": "bootstrap", **measure(bootstrap_app, reruns)},
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    emit(run(args.reruns), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Drive draw_chat, show_settings and show_events through streamlit.testing with seeded databases.
+
+Each scenario seeds a throwaway SQLite database, points the front end's engines at it and runs
+the page once, then --reruns more times. It reports first run and rerun latency, SQL queries per
+rerun and the peak Python memory allocated by one rerun. Results are tagged with the current
+commit; --compare checks them against an earlier --output file and exits with status 1 when a
+scenario got slower or heavier by more than --tolerance.
+
+Usage:
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --compare results.json --chat 1000 --agents 100 --events 1000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable
+from unittest.mock import patch
+
+from sqlalchemy import event
+from streamlit.testing.v1 import AppTest
+
+from naomi_core.db.chat import DEFAULT_CONVERSATION_ID
+from naomi_streamlit.db.engine import Database, create_database
+from benchmarks.common import (
+    current_commit,
+    emit,
+    seed_agents,
+    seed_events,
+    seed_messages,
+    temporary_database,
+)
+
+# Metrics compared by --compare, all of them lower is better
+COMPARED_METRICS = ("rerun_p50_ms", "queries_per_rerun", "peak_memory_kb")
+
+
+def chat_page():  # pragma: no cover
+    from naomi_streamlit.chat.chat import draw_chat
+
+    draw_chat()
+
+
+def settings_page():  # pragma: no cover
+    from naomi_streamlit.settings.settings_tabs import show_settings
+
+    show_settings()
+
+
+def events_page():  # pragma: no cover
+    from naomi_streamlit.events.event_log import show_events
+
+    show_events()
+
+
+def seed_chat(session_factory, size: int):
+    seed_messages(session_factory, DEFAULT_CONVERSATION_ID, size)
+
+
+PAGES: dict[str, tuple[Callable, Callable]] = {
+    "chat": (chat_page, seed_chat),
+    "settings": (settings_page, seed_agents),
+    "events": (events_page, seed_events),
+}
+
+
+@contextmanager
+def front_end_database(session_factory):
+    """Point the front end's pooled engines at the seeded database and reset its caches."""
+    from naomi_streamlit.chat.payload_cache import payload_cache
+    from naomi_streamlit.events.event_log import event_filter_options
+
+    db = create_database(session_factory.kw["bind"].url)
+    payload_cache.clear()
+    event_filter_options.clear()
+    with patch("naomi_streamlit.db.engine.database", return_value=db):
+        yield db
+    db.engine.dispose()
+    db.read_engine.dispose()
+
+
+def count_queries(db: Database) -> list:
+    statements = []
+    for engine in {db.engine, db.read_engine}:
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def measure(script: Callable, db: Database, reruns: int, timeout: float) -> dict:
+    statements = count_queries(db)
+    at = AppTest.from_function(script, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    first_run_ms = (time.perf_counter() - start) * 1000
+    assert not at.exception, at.exception
+
+    timings, query_counts = [], []
+    for _ in range(reruns):
+        statements.clear()
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(statements))
+
+    # Measured on a separate rerun, tracing allocations slows everything down
+    tracemalloc.start()
+    at.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_run_ms": round(first_run_ms, 2),
+        "rerun_p50_ms": round(statistics.median(timings), 2),
+        "rerun_p95_ms": round(statistics.quantiles(timings, n=20)[-1], 2),
+        "queries_per_rerun": statistics.median(query_counts),
+        "peak_memory_kb": peak // 1024,
+    }
+
+
+def run(sizes: dict[str, list[int]], reruns: int, timeout: float) -> list[dict]:
+    commit = current_commit()
+    results = []
+    for page, page_sizes in sizes.items():
+        script, seed = PAGES[page]
+        for size in page_sizes:
+            with temporary_database() as session_factory:
+                seed(session_factory, size)
+                with front_end_database(session_factory) as db:
+                    result = measure(script, db, reruns, timeout)
+            results.append({"commit": commit, "page": page, "size": size, **result})
+    return results
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    with open(baseline_path) as f:
+        baseline = {(row["page"], row["size"]): row for row in json.load(f)}
+    regressions = []
+    for row in results:
+        before = baseline.get((row["page"], row["size"]))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if row[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{row['page']} size={row['size']}: {metric} {before[metric]} -> {row[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chat", type=int, nargs="*", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--agents", type=int, nargs="*", default=[10, 100, 1_000])
+    parser.add_argument("--events", type=int, nargs="*", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per run")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results to check")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative increase")
+    args = parser.parse_args()
+
+    sizes = {"chat": args.chat, "settings": args.agents, "events": args.events}
+    results = run(sizes, args.reruns, args.timeout)
+    emit(results, args.output)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
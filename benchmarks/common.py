@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from naomi_core.db.agent import AgentModel, AgentResponsibilityModel
+from naomi_core.db.chat import Message, MessageModel
+from naomi_core.db.core import Base
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.db.indexes import create_indexes
+from naomi_streamlit.db.models import create_tables
+
+
+@contextmanager
+def temporary_database():
+    """Yield a session factory bound to a throwaway SQLite file with the tables bootstrap makes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        create_tables(engine)
+        create_indexes(engine)
+        yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        engine.dispose()
+
+
+def seed_messages(session_factory, conversation_id: int, count: int, batch_size: int = 10_000):
+    with session_factory() as session:
+        for start in range(1, count + 1, batch_size):
+            rows = [
+                {
+                    "conversation_id": conversation_id,
+                    "id": i,
+                    "content": Message(
+                        content=f"Message {i} " + "lorem ipsum " * 20,
+                        role="user" if i % 2 else "assistant",
+                    ).to_json(),
+                }
+                for i in range(start, min(start + batch_size, count + 1))
+            ]
+            session.execute(MessageModel.__table__.insert(), rows)
+        session.commit()
+
+
+def seed_agents(session_factory, count: int, responsibilities: int = 3):
+    with session_factory() as session:
+        for i in range(count):
+            session.add(AgentModel(name=f"Agent {i:05d}", prompt=f"You are agent {i}. " * 20))
+            session.add_all(
+                AgentResponsibilityModel(
+                    agent_name=f"Agent {i:05d}",
+                    name=f"Responsibility {j}",
+                    description=f"Responsibility {j} of agent {i}",
+                )
+                for j in range(responsibilities)
+            )
+        session.commit()
+
+
+EVENT_TYPES = ("email", "calendar", "sms", "push")
+EVENT_STATUSES = ("pending", "processed", "failed")
+
+
+def seed_events(session_factory, count: int, batch_size: int = 50_000):
+    start_time = datetime(2025, 1, 1)
+    with session_factory() as session:
+        for start in range(1, count + 1, batch_size):
+            rows = [
+                {
+                    "id": i,
+                    "event_type": EVENT_TYPES[i % len(EVENT_TYPES)],
+                    "status": EVENT_STATUSES[i % len(EVENT_STATUSES)],
+                    "payload": f'{{"subject": "Event {i}", "body": "' + "x" * 200 + '"}',
+                    "created_at": start_time + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + batch_size, count + 1))
+            ]
+            session.execute(WebhookEvent.__table__.insert(), rows)
+        session.commit()
+
+
+def time_call(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Return the median wall time of fn in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def percentiles(values: list[float], points=(50, 95, 99)) -> dict[int, float]:
+    """Nearest-rank percentiles of values, 0 for every point when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return {point: 0.0 for point in points}
+    return {point: ordered[max(math.ceil(point / 100 * len(ordered)), 1) - 1] for point in points}
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def emit(results: list[dict], output: Optional[str] = None):
+    """Print results as a table and optionally write them as JSON."""
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
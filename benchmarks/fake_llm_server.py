@@ -0,0 +1,207 @@
+"""
+OpenAI-compatible chat completions server that streams canned text with configurable timing.
+
+Point naomi_core at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 to exercise streaming
+without network access or a real model. Every response waits --ttft-ms before the first token,
+then sends --tokens tokens --token-delay-ms apart. --error-rate of the requests fail with a 500,
+and --disconnect-rate of the streams are cut off halfway.
+
+Usage:
+    python -m benchmarks.fake_llm_server --port 8765 --ttft-ms 300 --token-delay-ms 20
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+WORDS = "the quick brown fox jumps over a lazy dog while naomi streams another token".split()
+
+
+@dataclass
+class FakeLLMConfig:
+    ttft_ms: float = 300
+    token_delay_ms: float = 20
+    tokens: int = 200
+    error_rate: float = 0.0
+    disconnect_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server: "FakeLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self.send_json(200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        self.server.count("requests")
+        config = self.server.config
+        if self.server.random() < config.error_rate:
+            self.server.count("errors")
+            self.send_json(500, {"error": {"message": "Injected error", "type": "server_error"}})
+            return
+
+        model = request.get("model", "fake")
+        time.sleep(config.ttft_ms / 1000)
+        if request.get("stream"):
+            self.stream_completion(model)
+        else:
+            self.send_json(200, completion(model, " ".join(self.server.words())))
+
+    def stream_completion(self, model: str):
+        config = self.server.config
+        disconnect_at = (
+            config.tokens // 2 if self.server.random() < config.disconnect_rate else None
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # Chunked framing lets clients tell a cut off stream from a finished one
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        for i, word in enumerate(self.server.words()):
+            if i == disconnect_at:
+                self.server.count("disconnects")
+                self.close_connection = True
+                return
+            if i:
+                time.sleep(config.token_delay_ms / 1000)
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            self.send_event(chunk(completion_id, model, delta, None))
+        self.send_event(chunk(completion_id, model, {}, "stop"))
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+        self.close_connection = True
+
+    def send_event(self, payload: dict):
+        self.write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def chunk(completion_id: str, model: str, delta: dict, finish_reason: Optional[str]) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def completion(model: str, text: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": 0},
+    }
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: FakeLLMConfig):
+        super().__init__(address, FakeLLMHandler)
+        self.config = config
+        self.counts = {"requests": 0, "errors": 0, "disconnects": 0}
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def reset(self):
+        """Zero the counters and reseed, so each benchmark run sees the same server."""
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+            self._random = random.Random(self.config.seed)
+
+    def words(self) -> list[str]:
+        return [WORDS[i % len(WORDS)] for i in range(self.config.tokens)]
+
+
+def start_fake_llm_server(config: FakeLLMConfig, port: int = 0) -> FakeLLMServer:
+    """Serve in a daemon thread; port 0 picks a free port, see FakeLLMServer.base_url."""
+    server = FakeLLMServer(("127.0.0.1", port), config)
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        args.ttft_ms,
+        args.token_delay_ms,
+        args.tokens,
+        args.error_rate,
+        args.disconnect_rate,
+        args.seed,
+    )
+    server = FakeLLMServer(("127.0.0.1", args.port), config)
+    print(f"Serving fake completions on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import streamlit as st
+from dotenv import load_dotenv
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from naomi_core.db.core import initialize_db
+from naomi_streamlit.chat.context import Summarizer, start_summarizer
+from naomi_streamlit.chat.conversations import backfill_conversations
+from naomi_streamlit.chat.tombstones import (
+    TombstoneCompactor,
+    start_compaction,
+)
+from naomi_streamlit.db.engine import database
+from naomi_streamlit.db.indexes import create_indexes
+from naomi_streamlit.db.models import create_tables
+from naomi_streamlit.events.retention import RetentionScheduler, start_retention
+
+
+@dataclass
+class Runtime:
+    engine: Engine
+    session_factory: sessionmaker
+    retention: Optional[RetentionScheduler] = None
+    compaction: Optional[TombstoneCompactor] = None
+    summarizer: Optional[Summarizer] = None
+
+    def stop(self):
+        """Stop the background threads."""
+        for thread in (self.retention, self.compaction, self.summarizer):
+            if thread is not None:
+                thread.stop()
+
+
+_runtime_lock = threading.Lock()
+# The runtime of the last bootstrap, whose threads outlive a clear of the resource cache
+_runtime: Optional[Runtime] = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Streamlit app for managing message trees.")
+    parser.add_argument(
+        "--log_level",
+        type=str,
+        default="INFO",
+        help="Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)",
+    )
+    # Streamlit forwards its own flags to multipage scripts as well, so ignore unknown ones
+    args, _ = parser.parse_known_args()
+    return args
+
+
+@st.cache_resource(show_spinner=False)
+def bootstrap() -> Runtime:
+    """
+    One-time process setup shared by every page: environment, logging and database schema.
+
+    Streamlit re-executes page scripts on every interaction; the resource cache makes this run
+    once per server process instead of once per rerun.
+    """
+    load_dotenv()
+    args = parse_args()
+
+    logging.basicConfig(
+        level=args.log_level.upper(), format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    # Initialize database
+    initialize_db()
+
+    db = database()
+    create_tables(db.engine)
+    create_indexes(db.engine)
+    with db.session_factory() as session:
+        # Summarize conversations written before the summary table existed, once per process
+        if backfilled := backfill_conversations(session):
+            logging.info(f"Summarized {backfilled} existing conversations")
+        session.commit()
+    logging.info(f"Bootstrapped naomi_streamlit against {db.engine.url!r}")
+
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None:
+            # Bootstrapped again after the cache was cleared, so replace the previous threads
+            _runtime.stop()
+        _runtime = Runtime(
+            engine=db.engine,
+            session_factory=db.session_factory,
+            retention=start_retention(db.session_factory),
+            compaction=start_compaction(db.session_factory),
+            summarizer=start_summarizer(db.session_factory),
+        )
+        return _runtime
@@ -2,16 +2,42 @@ import logging
 from typing import Iterator
 import streamlit as st
 
-from naomi_core.assistant.persistence import generate_and_persist_llm_response
 from naomi_core.db.chat import (
     MessageModel,
-    delete_messages_after,
 )
+from naomi_streamlit.chat.branches import branch_from, delete_message, sync_branch
+from naomi_streamlit.chat.conversations import record_activity
+from naomi_streamlit.chat.generation import (
+    active_generation,
+    draw_generation_tail,
+    start_generation,
+)
+from naomi_streamlit.chat.payload_cache import message_payload, payload_cache
+from naomi_streamlit.chat.response_cache import generate_response
+from naomi_streamlit.chat.streaming import StreamStats, coalesce_chunks
+from naomi_streamlit.config import (
+    BACKGROUND_GENERATION,
+    BRANCHING,
+    STREAM_FLUSH_BYTES,
+    STREAM_FLUSH_INTERVAL_MS,
+)
+from naomi_streamlit.perf import phase, record_stream
+
+STREAM_STATS_KEY = "llm_stream_stats"
 
 
 def show_llm_response(chunks: Iterator[str], spinner_message: str) -> str:
+    stats = StreamStats()
+    coalesced = coalesce_chunks(chunks, STREAM_FLUSH_BYTES, STREAM_FLUSH_INTERVAL_MS / 1000, stats)
     with st.spinner(spinner_message):
-        return str(st.write_stream(chunks))
+        response = str(st.write_stream(coalesced))
+    st.session_state[STREAM_STATS_KEY] = stats
+    record_stream(stats)
+    logging.debug(
+        f"Streamed {stats.tokens} tokens in {stats.deltas} deltas: "
+        f"{stats.tokens_per_second:.1f} tokens/s, {stats.deltas_per_second:.1f} deltas/s"
+    )
+    return response
 
 
 def show_llm_generation(chunks: Iterator[str]) -> str:
@@ -30,15 +56,60 @@ def draw_assistant_message(existing_message: MessageModel, session):
 
     if col2.button("🗑️", key=f"delete_{message_id}"):
         logging.info(f"Deleting messages from {existing_message.id}")
-        delete_messages_after(session, existing_message)
+        removed = delete_message(session, existing_message)
+        record_activity(session, existing_message.conversation_id, -removed)
+        payload_cache.invalidate_from(existing_message.conversation_id, message_id)
+        session.commit()
         st.rerun()
         return
 
-    if not col3.button("🔃", key=f"regenerate_{message_id}"):
-        st.markdown(existing_message.payload.body)
+    regenerate = col3.button("🔃", key=f"regenerate_{message_id}")
+
+    if regenerate and BRANCHING:
+        draw_regenerated_branch(existing_message, session)
+        return
+
+    if BACKGROUND_GENERATION:
+        if regenerate:
+            # The worker reads the history from its own session
+            session.commit()
+            start_generation(existing_message.conversation_id, message_id)
+        job = active_generation(existing_message.conversation_id, message_id)
+        if job is not None:
+            draw_generation_tail(job)
+            return
+
+    if BACKGROUND_GENERATION or not regenerate:
+        st.markdown(message_payload(existing_message).body)
         return
 
-    generate_and_persist_llm_response(existing_message, show_llm_generation, session)
+    with phase("generate_and_persist_llm_response"):
+        generate_response(existing_message, show_llm_generation, session)
+    payload_cache.invalidate(existing_message.conversation_id, message_id)
+
+
+def draw_regenerated_branch(existing_message: MessageModel, session):
+    """Generate a sibling of existing_message, keeping it on a branch of its own."""
+    conversation_id = existing_message.conversation_id
+    logging.info(f"Branching from {existing_message.id}")
+    record_activity(session, conversation_id, branch_from(session, existing_message))
+    payload_cache.invalidate_from(conversation_id, existing_message.id)
+
+    if BACKGROUND_GENERATION:
+        # The worker reads the history of the new branch from its own session
+        session.commit()
+        start_generation(conversation_id)
+        st.rerun()
+        return
+
+    message = MessageModel.from_llm_response(conversation_id, "")
+    with phase("generate_and_persist_llm_response"):
+        generate_response(message, show_llm_regeneration, session)
+    # Link the new message to its parent, so it shows with its siblings
+    sync_branch(session, conversation_id)
+    # Redraw with the new branch active and its sibling switcher
+    session.commit()
+    st.rerun()
 
 
 def draw_draft_assistant_message(conversation_id: int, session):
@@ -46,5 +117,15 @@ def draw_draft_assistant_message(conversation_id: int, session):
 
     col1.write("draft")
 
+    if BACKGROUND_GENERATION:
+        # The worker reads the new message from its own session; the response is tailed by
+        # draw_chat once the page reruns
+        session.commit()
+        start_generation(conversation_id)
+        return
+
     message = MessageModel.from_llm_response(conversation_id, "")
-    generate_and_persist_llm_response(message, show_llm_generation, session)
+    with phase("generate_and_persist_llm_response"):
+        generate_response(message, show_llm_generation, session)
+    if message.id is not None:
+        payload_cache.invalidate_from(conversation_id, message.id)
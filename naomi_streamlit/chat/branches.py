@@ -0,0 +1,285 @@
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, insert, select, union_all
+from sqlalchemy.orm import aliased
+
+from naomi_core.db.chat import MessageModel
+from naomi_streamlit.chat.tombstones import (
+    add_tombstone,
+    clip_inactive_ranges,
+    forget_messages,
+    hidden_ranges,
+    in_ranges,
+    scan_segments,
+    segment_bounds,
+    truncate_after,
+    visible_segments,
+)
+from naomi_streamlit.config import TOMBSTONE_TRUNCATION
+from naomi_streamlit.db.engine import insert_ignoring_conflicts
+from naomi_streamlit.db.models import InactiveMessageRange, MessageParent, MessageTombstone
+
+
+def _not_truncated():
+    return ~in_ranges(MessageTombstone, MessageParent.conversation_id, MessageParent.id)
+
+
+def branch_path(session, conversation_id: int, leaf_id: Optional[int]) -> list[int]:
+    """
+    The ids from the root of a conversation down to leaf_id, oldest first.
+
+    One recursive query walking parent pointers, each step a primary key lookup.
+    """
+    if leaf_id is None:
+        return []
+    path = (
+        select(MessageParent.id, MessageParent.parent_id)
+        .where(MessageParent.conversation_id == conversation_id, MessageParent.id == leaf_id)
+        .cte("path", recursive=True)
+    )
+    path = path.union_all(
+        select(MessageParent.id, MessageParent.parent_id).where(
+            MessageParent.conversation_id == conversation_id,
+            MessageParent.id == path.c.parent_id,
+        )
+    )
+    return sorted(session.scalars(select(path.c.id)).all())
+
+
+def descendant_ids(session, conversation_id: int, message_id: int) -> list[int]:
+    """message_id and every message under it that is not truncated, walking the parent index."""
+    tree = (
+        select(MessageParent.id)
+        .where(MessageParent.conversation_id == conversation_id, MessageParent.id == message_id)
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(MessageParent.id).where(
+            MessageParent.conversation_id == conversation_id,
+            MessageParent.parent_id == tree.c.id,
+            _not_truncated(),
+        )
+    )
+    return sorted(session.scalars(select(tree.c.id)).all())
+
+
+def parent_of(session, conversation_id: int, message_id: int) -> Optional[int]:
+    return session.scalar(
+        select(MessageParent.parent_id).where(
+            MessageParent.conversation_id == conversation_id, MessageParent.id == message_id
+        )
+    )
+
+
+def sync_branch(session, conversation_id: int):
+    """
+    Attach messages written since the last call to the end of the active branch.
+
+    naomi_core numbers messages after the highest stored id, so new messages are exactly those
+    above the last message with a parent, found from the end of both primary keys. The page and a
+    generation worker may attach the same messages at once; whichever writes first wins.
+    """
+    known = session.scalar(
+        select(func.max(MessageParent.id)).where(MessageParent.conversation_id == conversation_id)
+    )
+    ranges = hidden_ranges(session, conversation_id)
+    ids = select(MessageModel.id).where(MessageModel.conversation_id == conversation_id)
+    lower = None if known is None else known + 1
+    new_ids = scan_segments(session, ids, visible_segments(ranges, lower=lower))
+    if not new_ids:
+        return
+    leaf = None
+    if known is not None:
+        leaf = next(
+            iter(scan_segments(session, ids, visible_segments(ranges, upper=known), True, 1)),
+            None,
+        )
+    rows = []
+    for message_id in new_ids:
+        rows.append({"conversation_id": conversation_id, "id": message_id, "parent_id": leaf})
+        leaf = message_id
+    session.execute(insert_ignoring_conflicts(session, MessageParent), rows)
+
+
+def _entering_path(session, conversation_id: int, leaf_id: Optional[int]):
+    """
+    The inactive messages on the path to leaf_id and the active message it forks from, if any.
+
+    Walks up from leaf_id only while messages are inactive, so the cost is the length of the
+    branch being entered rather than of the whole path.
+    """
+    if leaf_id is None:
+        return None, []
+    walk = (
+        select(MessageParent.id, MessageParent.parent_id)
+        .where(MessageParent.conversation_id == conversation_id, MessageParent.id == leaf_id)
+        .cte("walk", recursive=True)
+    )
+    walk = walk.union_all(
+        select(MessageParent.id, MessageParent.parent_id).where(
+            MessageParent.conversation_id == conversation_id,
+            MessageParent.id == walk.c.parent_id,
+            in_ranges(InactiveMessageRange, conversation_id, walk.c.id),
+        )
+    )
+    inactive = in_ranges(InactiveMessageRange, conversation_id, walk.c.id)
+    rows = session.execute(select(walk.c.id, inactive)).all()
+    fork = next((message_id for message_id, hidden in rows if not hidden), None)
+    return fork, sorted(message_id for message_id, hidden in rows if hidden)
+
+
+def _count_visible(session, conversation_id: int, lower: Optional[int] = None) -> int:
+    """Visible messages from lower on, one count per visible segment of the tail."""
+    in_conversation = MessageModel.conversation_id == conversation_id
+    segments = visible_segments(hidden_ranges(session, conversation_id), lower=lower)
+    return sum(
+        session.scalar(select(func.count()).where(in_conversation, *segment_bounds(segment)))
+        for segment in segments
+    )
+
+
+def activate_branch(session, conversation_id: int, leaf_id: Optional[int]) -> int:
+    """
+    Make the path to leaf_id the active branch by marking every other message inactive.
+
+    Only the ranges after the fork from the active branch are rewritten: those of the branch being
+    left and of the one being entered. Parents have lower ids than their children, so everything
+    after the fork that is not entered is off the new branch. Returns the change in the number of
+    visible messages.
+    """
+    fork, entering = _entering_path(session, conversation_id, leaf_id)
+    leaving = _count_visible(session, conversation_id, None if fork is None else fork + 1)
+    in_conversation = MessageModel.conversation_id == conversation_id
+    after_fork = InactiveMessageRange.conversation_id == conversation_id
+    if fork is None:
+        first_id = session.scalar(select(func.min(MessageModel.id)).where(in_conversation))
+    else:
+        after_fork = after_fork & (InactiveMessageRange.from_id > fork)
+    last_id = session.scalar(select(func.max(MessageModel.id)).where(in_conversation))
+    session.execute(delete(InactiveMessageRange).where(after_fork))
+    if last_id is None:
+        return 0
+    ranges = []
+    previous = first_id - 1 if fork is None else fork
+    for message_id in entering + [last_id + 1]:
+        if message_id > previous + 1:
+            ranges.append(
+                {
+                    "conversation_id": conversation_id,
+                    "from_id": previous + 1,
+                    "to_id": message_id - 1,
+                }
+            )
+        previous = message_id
+    if ranges:
+        session.execute(insert(InactiveMessageRange), ranges)
+    session.flush()
+    return len(entering) - leaving
+
+
+def branch_from(session, message: MessageModel) -> int:
+    """
+    Start a sibling branch of message: everything from message on becomes inactive.
+
+    The next message written to the conversation is attached to message's parent. Returns the
+    change in the number of visible messages.
+    """
+    sync_branch(session, message.conversation_id)
+    parent_id = parent_of(session, message.conversation_id, message.id)
+    return activate_branch(session, message.conversation_id, parent_id)
+
+
+def switch_branch(session, conversation_id: int, message_id: int) -> int:
+    """
+    Activate the branch through message_id that ends in its most recent descendant.
+
+    Returns the change in the number of visible messages.
+    """
+    sync_branch(session, conversation_id)
+    return activate_branch(
+        session, conversation_id, max(descendant_ids(session, conversation_id, message_id))
+    )
+
+
+def delete_message(session, message: MessageModel) -> int:
+    """
+    Remove message and every message under it, returning how many of them were visible.
+
+    A conversation that never branched is truncated in constant time; otherwise the descendants
+    are collected from the parent index so other branches are kept.
+    """
+    conversation_id = message.conversation_id
+    sync_branch(session, conversation_id)
+    branched = session.scalar(
+        select(InactiveMessageRange.from_id)
+        .where(InactiveMessageRange.conversation_id == conversation_id)
+        .limit(1)
+    )
+    if branched is None:
+        removed = _count_visible(session, conversation_id, message.id)
+        truncate_after(session, message)
+        if not TOMBSTONE_TRUNCATION:
+            forget_messages(session, conversation_id, lambda message_id: message_id >= message.id)
+        return removed
+
+    ids = descendant_ids(session, conversation_id, message.id)
+    ranges = hidden_ranges(session, conversation_id)
+    removed = sum(
+        not any(from_id <= message_id <= to_id for from_id, to_id in ranges) for message_id in ids
+    )
+    if TOMBSTONE_TRUNCATION:
+        for from_id, to_id in _runs(ids):
+            add_tombstone(session, conversation_id, from_id, to_id)
+        return removed
+    session.execute(
+        delete(MessageModel)
+        .where(MessageModel.conversation_id == conversation_id, MessageModel.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    forget_messages(session, conversation_id, lambda message_id: message_id.in_(ids))
+    clip_inactive_ranges(session, conversation_id)
+    return removed
+
+
+def _runs(ids: list[int]) -> list[tuple[int, int]]:
+    runs = []
+    for message_id in ids:
+        if runs and runs[-1][1] == message_id - 1:
+            runs[-1] = (runs[-1][0], message_id)
+        else:
+            runs.append((message_id, message_id))
+    return runs
+
+
+def fetch_siblings(session, conversation_id: int, message_ids: list[int]) -> dict[int, list[int]]:
+    """
+    The ids of the messages sharing a parent with each of message_ids, for those that have any.
+
+    One query over the parent index; inactive siblings are included, truncated ones are not.
+    """
+    if not message_ids:
+        return {}
+    shown = aliased(MessageParent)
+    in_window = and_(shown.conversation_id == conversation_id, shown.id.in_(message_ids))
+    children_of = select(MessageParent.id, MessageParent.parent_id).where(
+        MessageParent.conversation_id == conversation_id, _not_truncated()
+    )
+    # Roots are siblings too; the two halves each use the parent index
+    query = union_all(
+        children_of.where(MessageParent.parent_id.in_(select(shown.parent_id).where(in_window))),
+        children_of.where(
+            MessageParent.parent_id.is_(None),
+            select(shown.id).where(in_window, shown.parent_id.is_(None)).exists(),
+        ),
+    )
+    children = defaultdict(list)
+    parents = {}
+    for message_id, parent_id in session.execute(query).all():
+        children[parent_id].append(message_id)
+        parents[message_id] = parent_id
+    return {
+        message_id: sorted(children[parents[message_id]])
+        for message_id in message_ids
+        if message_id in parents and len(children[parents[message_id]]) > 1
+    }
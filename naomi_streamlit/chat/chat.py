@@ -1,39 +1,195 @@
+import logging
+from typing import Optional
+
 import streamlit as st
 
 from naomi_core.db.chat import (
     DEFAULT_CONVERSATION_ID,
     MessageModel,
     add_message_to_db,
-    fetch_messages,
     Message,
 )
 from naomi_streamlit.chat.assistant import draw_assistant_message, draw_draft_assistant_message
+from naomi_streamlit.chat.branches import switch_branch
+from naomi_streamlit.chat.conversations import (
+    conversation_caption,
+    conversation_title,
+    create_conversation,
+    list_conversations,
+    record_activity,
+)
+from naomi_streamlit.chat.generation import active_generation, draw_generation_tail
+from naomi_streamlit.chat.payload_cache import message_payload, payload_cache, reset_parse_stats
+from naomi_streamlit.chat.render import draw_history, history_blocks, split_live_messages
 from naomi_streamlit.chat.user_input import draw_user_message
-from naomi_core.db.core import session_scope
+from naomi_streamlit.chat.window import fetch_message_window, find_older_page_start
+from naomi_streamlit.config import (
+    BACKGROUND_GENERATION,
+    CHAT_LIVE_MESSAGES,
+    CHAT_WINDOW_SIZE,
+    CONVERSATION_LIST_SIZE,
+    HISTORY_BLOCK_SIZE,
+)
+from naomi_streamlit.db.engine import session_scope
+from naomi_streamlit.db.models import ConversationSummary
+from naomi_streamlit.perf import phase
+from naomi_streamlit.utils import current_user_id
+
+WINDOW_START_KEY = "chat_window_start_id"
+CONVERSATION_KEY = "conversation_id"
+
+
+def select_branch(conversation_id: int, message_id: int):
+    with session_scope() as session:
+        record_activity(
+            session, conversation_id, switch_branch(session, conversation_id, message_id)
+        )
+    st.session_state.pop(WINDOW_START_KEY, None)
+
+
+def draw_branch_switcher(message: MessageModel, siblings: list[int]):
+    index = siblings.index(message.id)
+    previous, position, following = st.columns([1, 1, 6])
+    previous.button(
+        "◀",
+        key=f"branch_previous_{message.id}",
+        disabled=index == 0,
+        on_click=select_branch,
+        args=(message.conversation_id, siblings[max(index - 1, 0)]),
+    )
+    position.caption(f"{index + 1} / {len(siblings)}")
+    following.button(
+        "▶",
+        key=f"branch_next_{message.id}",
+        disabled=index == len(siblings) - 1,
+        on_click=select_branch,
+        args=(message.conversation_id, siblings[min(index + 1, len(siblings) - 1)]),
+    )
 
 
-def draw_messages(messages: list[MessageModel], session):
+def draw_messages(
+    messages: list[MessageModel], session, siblings: Optional[dict[int, list[int]]] = None
+):
+    siblings = siblings or {}
     for message in messages:
-        role = message.payload["role"]
+        role = message_payload(message)["role"]
         with st.chat_message("user" if role == "user" else "assistant"):
             if role == "user":
                 draw_user_message(message, session)
             else:
                 draw_assistant_message(message, session)
+            if message.id in siblings:
+                draw_branch_switcher(message, siblings[message.id])
+
+
+def draw_history_with_branches(
+    history: list[MessageModel], siblings: dict[int, list[int]], session
+):
+    """
+    draw_history block by block, split after each message with siblings to draw its switcher.
+
+    Each block has a toggle that draws its messages with their controls instead, so older
+    messages can still be edited, deleted and regenerated.
+    """
+    for block in history_blocks(history, HISTORY_BLOCK_SIZE):
+        label = f"Show controls for messages {block[0].id}–{block[-1].id}"
+        if st.toggle(label, key=f"history_controls_{block[0].id // HISTORY_BLOCK_SIZE}"):
+            draw_messages(block, session, siblings)
+            continue
+        start = 0
+        for end, message in enumerate(block, start=1):
+            if message.id in siblings:
+                draw_history(block[start:end])
+                draw_branch_switcher(message, siblings[message.id])
+                start = end
+        draw_history(block[start:])
+
+
+def draw_load_older_button(conversation_id: int, messages: list[MessageModel], session):
+    if not st.button("⬆️ Load older messages", key="load_older"):
+        return
+    start_id = find_older_page_start(session, conversation_id, messages[0].id, CHAT_WINDOW_SIZE)
+    if start_id is not None:
+        st.session_state[WINDOW_START_KEY] = start_id
+    st.rerun()
+
+
+def draw_draft_generation(conversation_id: int):
+    job = active_generation(conversation_id, None)
+    if job is not None:
+        with st.chat_message("assistant"):
+            draw_generation_tail(job)
+
+
+def start_conversation():
+    with session_scope() as session:
+        st.session_state[CONVERSATION_KEY] = create_conversation(session, current_user_id())
+    st.session_state.pop(WINDOW_START_KEY, None)
+
+
+def switch_conversation():
+    st.session_state.pop(WINDOW_START_KEY, None)
+
+
+def draw_conversation_list(session) -> int:
+    """Draw the conversations in the sidebar and return the id of the selected one."""
+    with phase("fetch_conversations"):
+        conversations = list_conversations(session, current_user_id(), CONVERSATION_LIST_SIZE)
+    summaries = {summary.conversation_id: summary for summary in conversations}
+    if CONVERSATION_KEY not in st.session_state:
+        st.session_state[CONVERSATION_KEY] = (
+            conversations[0].conversation_id if conversations else DEFAULT_CONVERSATION_ID
+        )
+    selected = st.session_state[CONVERSATION_KEY]
+    if selected not in summaries:
+        # New, or too old to be listed; shown first without being added to the database
+        summaries = {selected: ConversationSummary(conversation_id=selected), **summaries}
+
+    with st.sidebar:
+        st.button("➕ New conversation", key="new_conversation", on_click=start_conversation)
+        st.radio(
+            "Conversations",
+            list(summaries),
+            format_func=lambda conversation_id: conversation_title(summaries[conversation_id]),
+            captions=[conversation_caption(summary) for summary in summaries.values()],
+            key=CONVERSATION_KEY,
+            on_change=switch_conversation,
+        )
+    return st.session_state[CONVERSATION_KEY]
 
 
 def draw_chat():
     st.header("💬 Chat")
+    stats = reset_parse_stats()
 
     with session_scope() as session:
-        messages = fetch_messages(session, DEFAULT_CONVERSATION_ID)
-        draw_messages(messages, session)
+        conversation_id = draw_conversation_list(session)
+        with phase("fetch_messages"):
+            window = fetch_message_window(
+                session,
+                conversation_id,
+                CHAT_WINDOW_SIZE,
+                st.session_state.get(WINDOW_START_KEY),
+            )
+        if window.has_older and window.messages:
+            draw_load_older_button(conversation_id, window.messages, session)
+        history, live = split_live_messages(window.messages, CHAT_LIVE_MESSAGES)
+        with phase("draw_messages"):
+            draw_history_with_branches(history, window.siblings, session)
+            draw_messages(live, session, window.siblings)
+        if BACKGROUND_GENERATION:
+            draw_draft_generation(conversation_id)
+        next_id = window.messages[-1].id + 1 if window.messages else 1
+    logging.debug(f"Parsed {stats.bytes} bytes of message JSON ({stats.messages} messages)")
 
     if prompt := st.chat_input("Type your message here..."):
         with st.chat_message("user"):
             st.markdown(prompt)
         with session_scope() as session:
-            add_message_to_db(Message.from_user_input(prompt), session, DEFAULT_CONVERSATION_ID)
+            payload_cache.invalidate_from(conversation_id, next_id)
+            add_message_to_db(Message.from_user_input(prompt), session, conversation_id)
+            record_activity(session, conversation_id, 1, title=prompt)
             with st.chat_message("assistant"):
-                draw_draft_assistant_message(DEFAULT_CONVERSATION_ID, session)
+                draw_draft_assistant_message(conversation_id, session)
+                session.commit()
                 st.rerun()
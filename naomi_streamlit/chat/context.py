@@ -0,0 +1,302 @@
+import logging
+import queue
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import and_, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from naomi_core.assistant import agent, persistence
+from naomi_core.db.chat import Message, MessageModel
+from naomi_streamlit.chat.packer import (
+    PackingDecision,
+    estimate_tokens,
+    message_tokens,
+    pack_history,
+)
+from naomi_streamlit.chat.tombstones import hidden_ranges, scan_segments, visible_segments
+from naomi_streamlit.config import (
+    CONTEXT_RECENT_TOKENS,
+    CONTEXT_SUMMARIES,
+    CONTEXT_TOKEN_BUDGET,
+    PROMPT_PACKING,
+    PROMPT_TOKEN_BUDGET,
+)
+from naomi_streamlit.db.models import SummarySize, summaries
+from naomi_streamlit.perf import record_context
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep names, facts, "
+    "decisions and open questions; leave out pleasantries. Reply with the summary only."
+)
+
+_summarizer: Optional["Summarizer"] = None
+
+
+@dataclass
+class Summary:
+    until_id: int
+    content: str
+    # Estimated tokens of the messages the summary stands in for, 0 if it was not written here
+    source_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.source_tokens - estimate_tokens(self.content), 0)
+
+    def to_message(self) -> Message:
+        return Message(
+            content=f"Summary of the conversation so far:\n{self.content}", role="system"
+        )
+
+
+def latest_summary(
+    session, conversation_id: int, ranges=None, before_id: Optional[int] = None
+) -> Optional[Summary]:
+    """
+    The newest summary of the conversation whose last message is on the active branch.
+
+    A summary covers the branch up to its last message, so it holds for every branch through it.
+    Pass before_id to only consider summaries ending before that message.
+    """
+    ranges = hidden_ranges(session, conversation_id) if ranges is None else ranges
+    query = (
+        select(summaries.c.summary_until_id, summaries.c.content, SummarySize.source_tokens)
+        .outerjoin(
+            SummarySize,
+            and_(
+                SummarySize.conversation_id == summaries.c.conversation_id,
+                SummarySize.summary_until_id == summaries.c.summary_until_id,
+            ),
+        )
+        .where(summaries.c.conversation_id == conversation_id)
+        .order_by(summaries.c.summary_until_id.desc())
+    )
+    if before_id is not None:
+        query = query.where(summaries.c.summary_until_id < before_id)
+    for until_id, content, source_tokens in session.execute(query):
+        if not any(from_id <= until_id <= to_id for from_id, to_id in ranges):
+            return Summary(until_id, content, source_tokens or 0)
+    return None
+
+
+class ContextStats:
+    """Process-wide counts of the histories assembled for the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {
+            "requests": 0,
+            "summarized_requests": 0,
+            "prompt_tokens": 0,
+            "tokens_saved": 0,
+            "dropped_messages": 0,
+            "summaries_written": 0,
+        }
+        self._last_packing: Optional[dict] = None
+
+    def record_request(self, packing: PackingDecision, tokens_saved: int, summarized: bool):
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["summarized_requests"] += int(summarized)
+            self._counts["prompt_tokens"] += packing.prompt_tokens
+            self._counts["tokens_saved"] += tokens_saved
+            self._counts["dropped_messages"] += packing.dropped_messages
+            self._last_packing = {
+                **asdict(packing),
+                "dropped_messages": packing.dropped_messages,
+                "prompt_tokens": packing.prompt_tokens,
+            }
+
+    def record_summary(self):
+        with self._lock:
+            self._counts["summaries_written"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests = self._counts["requests"]
+            return {
+                **self._counts,
+                "prompt_tokens_avg": self._counts["prompt_tokens"] / requests if requests else None,
+                "tokens_saved_avg": self._counts["tokens_saved"] / requests if requests else None,
+                "last_packing": self._last_packing,
+            }
+
+
+context_stats = ContextStats()
+
+
+@dataclass
+class PromptContext:
+    """What is sent to the LLM for a conversation: a summary and the newest messages after it."""
+
+    conversation_id: int
+    messages: list[Message]
+    packing: PackingDecision
+    summary: Optional[Summary] = None
+
+    def record(self):
+        """Count a request to the LLM, and ask for a summary once the history is over budget."""
+        if CONTEXT_TOKEN_BUDGET and self.packing.history_tokens > CONTEXT_TOKEN_BUDGET:
+            request_summary(self.conversation_id)
+        tokens_saved = 0 if self.summary is None else self.summary.tokens_saved
+        summarized = self.summary is not None
+        context_stats.record_request(self.packing, tokens_saved, summarized)
+        record_context(self.packing.prompt_tokens, tokens_saved, self.packing.dropped_messages)
+
+
+def build_context(session, conversation_id: int, before_id: Optional[int] = None) -> PromptContext:
+    """
+    The latest summary and the visible messages after it, packed to the prompt budget.
+
+    Messages off the active branch and truncated ones are skipped, as on the chat page. The
+    summary is sent as a system message that is never stored. Pass before_id to leave out that
+    message and those after it, as when it is regenerated in place.
+    """
+    ranges = hidden_ranges(session, conversation_id)
+    summary = None
+    if CONTEXT_TOKEN_BUDGET:
+        summary = latest_summary(session, conversation_id, ranges, before_id)
+    lower = None if summary is None else summary.until_id + 1
+    upper = None if before_id is None else before_id - 1
+    query = select(MessageModel).where(MessageModel.conversation_id == conversation_id)
+    history = scan_segments(session, query, visible_segments(ranges, lower, upper))
+    reserved_tokens = 0 if summary is None else estimate_tokens(summary.content)
+    budget = PROMPT_TOKEN_BUDGET if PROMPT_PACKING else 0
+    history, packing = pack_history(history, budget, reserved_tokens)
+    messages = [Message.from_json(message.content) for message in history]
+    if summary is not None:
+        messages.insert(0, summary.to_message())
+    return PromptContext(conversation_id, messages, packing, summary)
+
+
+def stream_llm_response(messages: list[Message]) -> Iterator[str]:
+    """Stream a response to messages from the LLM client naomi_core is set up with."""
+    return persistence.process_llm_response(agent.llm_client().run(messages=messages))
+
+
+def llm_summarize(previous: Optional[str], messages: list[Message]) -> str:
+    """Summarize messages after a previous summary with the LLM client naomi_core is set up with."""
+    prompt = [Message(content=SUMMARY_PROMPT, role="system")]
+    if previous:
+        prompt.append(Message(content=f"Summary so far:\n{previous}", role="system"))
+    prompt += messages
+    return "".join(stream_llm_response(prompt))
+
+
+class Summarizer(threading.Thread):
+    """
+    Daemon thread that summarizes conversations whose history outgrew the token budget.
+
+    Conversations are queued by request and summarized one at a time. The oldest messages after
+    the latest summary are folded into a new one, leaving the newest recent_tokens as they are.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        budget: int,
+        recent_tokens: int,
+        summarize: Callable[[Optional[str], list[Message]], str] = llm_summarize,
+    ):
+        super().__init__(name="naomi-summarizer", daemon=True)
+        self.session_factory = session_factory
+        self.budget = budget
+        self.recent_tokens = recent_tokens
+        self.summarize = summarize
+        self._queue: queue.Queue[Optional[int]] = queue.Queue()
+        self._pending: set[int] = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def request(self, conversation_id: int):
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+        self._queue.put(conversation_id)
+
+    def run_once(self, conversation_id: int) -> Optional[int]:
+        """Summarize the conversation if it is over budget and return the new summary_until_id."""
+        with self.session_factory() as session:
+            ranges = hidden_ranges(session, conversation_id)
+            summary = latest_summary(session, conversation_id, ranges)
+            lower = None if summary is None else summary.until_id + 1
+            query = select(MessageModel).where(MessageModel.conversation_id == conversation_id)
+            messages = scan_segments(session, query, visible_segments(ranges, lower=lower))
+            tokens = message_tokens(messages)
+            if sum(tokens) <= self.budget:
+                return None
+            kept, kept_tokens = 0, 0
+            for count in reversed(tokens):
+                if kept_tokens + count > self.recent_tokens:
+                    break
+                kept, kept_tokens = kept + 1, kept_tokens + count
+            condensed = messages[: len(messages) - kept]
+            if not condensed:
+                return None
+            until_id = condensed[-1].id
+            payloads = [Message.from_json(message.content) for message in condensed]
+            source_tokens = sum(tokens[: len(condensed)])
+            if summary is not None:
+                source_tokens += summary.source_tokens
+
+        # No transaction is held while the LLM writes the summary
+        content = self.summarize(summary.content if summary else None, payloads)
+        with self.session_factory() as session:
+            if session.get(MessageModel, (conversation_id, until_id)) is None:
+                # Truncated while the summary was written
+                return None
+            session.execute(
+                insert(summaries).values(
+                    conversation_id=conversation_id, summary_until_id=until_id, content=content
+                )
+            )
+            session.add(
+                SummarySize(
+                    conversation_id=conversation_id,
+                    summary_until_id=until_id,
+                    source_tokens=source_tokens,
+                    summary_tokens=estimate_tokens(content),
+                )
+            )
+            session.commit()
+        context_stats.record_summary()
+        logging.info(f"Summarized conversation {conversation_id} up to message {until_id}")
+        return until_id
+
+    def run(self):
+        while not self._stopped.is_set():
+            conversation_id = self._queue.get()
+            if conversation_id is None:
+                continue
+            with self._lock:
+                self._pending.discard(conversation_id)
+            try:
+                self.run_once(conversation_id)
+            except Exception:
+                # A failed summary is retried the next time the conversation is over budget
+                logging.exception(f"Summarizing conversation {conversation_id} failed")
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+
+
+def request_summary(conversation_id: int):
+    if _summarizer is not None:
+        _summarizer.request(conversation_id)
+
+
+def start_summarizer(session_factory: sessionmaker) -> Optional[Summarizer]:
+    """
+    With NAOMI_CONTEXT_SUMMARIES, start summarizing conversations over NAOMI_CONTEXT_TOKEN_BUDGET
+    in the background.
+    """
+    global _summarizer
+    if not CONTEXT_SUMMARIES or CONTEXT_TOKEN_BUDGET <= 0:
+        return None
+    _summarizer = Summarizer(session_factory, CONTEXT_TOKEN_BUDGET, CONTEXT_RECENT_TOKENS)
+    _summarizer.start()
+    return _summarizer
@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from naomi_core.db.chat import Message, MessageModel
+from naomi_streamlit.chat.tombstones import (
+    hidden_ranges,
+    scan_segments,
+    segment_bounds,
+    visible_segments,
+)
+from naomi_streamlit.db.models import ConversationSummary
+
+# Characters of the first message used as the title of a conversation
+TITLE_CHARS = 60
+
+
+def conversation_title(summary: ConversationSummary) -> str:
+    return summary.title or f"Conversation {summary.conversation_id}"
+
+
+def conversation_caption(summary: ConversationSummary) -> str:
+    if summary.last_activity_at is None:
+        return ""
+    return f"{summary.message_count} messages · {summary.last_activity_at:%b %d %H:%M}"
+
+
+def list_conversations(session, owner: str, limit: int) -> list[ConversationSummary]:
+    """The owner's most recently active conversations, and those without an owner."""
+    query = (
+        select(ConversationSummary)
+        .where(or_(ConversationSummary.owner == owner, ConversationSummary.owner.is_(None)))
+        .order_by(ConversationSummary.last_activity_at.desc())
+        .limit(limit)
+    )
+    return list(session.scalars(query).all())
+
+
+def create_conversation(
+    session, owner: str, now: Optional[datetime] = None, attempts: int = 5
+) -> int:
+    """
+    Start an empty conversation owned by owner and return its id.
+
+    The id follows the highest in use; when another session takes it first, the insert is retried
+    with the next one.
+    """
+    attempt = 1
+    while True:
+        # Both maxima are read from the end of a primary key index
+        conversation_id = 1 + max(
+            session.scalar(select(func.max(ConversationSummary.conversation_id))) or 0,
+            session.scalar(select(func.max(MessageModel.conversation_id))) or 0,
+        )
+        try:
+            with session.begin_nested():
+                session.add(
+                    ConversationSummary(
+                        conversation_id=conversation_id,
+                        owner=owner,
+                        message_count=0,
+                        last_activity_at=now or datetime.utcnow(),
+                    )
+                )
+            return conversation_id
+        except IntegrityError:
+            if attempt == attempts:
+                raise
+            attempt += 1
+
+
+def record_activity(
+    session,
+    conversation_id: int,
+    added: int = 0,
+    title: Optional[str] = None,
+    now: Optional[datetime] = None,
+):
+    """
+    Count messages added to a conversation, or removed with a negative count, and mark it active.
+
+    Called in the transaction that writes the messages, it is a single update of the summary row.
+    title is the text that names the conversation if it has no title yet. A conversation without
+    a summary is counted once by refresh_conversation instead.
+    """
+    values = {
+        "message_count": ConversationSummary.message_count + added,
+        "last_activity_at": now or datetime.utcnow(),
+    }
+    if added > 0:
+        # Read from the end of the primary key
+        values["last_message_id"] = (
+            select(func.max(MessageModel.id))
+            .where(MessageModel.conversation_id == conversation_id)
+            .scalar_subquery()
+        )
+    if title:
+        values["title"] = func.coalesce(ConversationSummary.title, title[:TITLE_CHARS])
+    updated = session.execute(
+        update(ConversationSummary)
+        .where(ConversationSummary.conversation_id == conversation_id)
+        .values(**values)
+        .execution_options(synchronize_session="fetch")
+    ).rowcount
+    if not updated:
+        refresh_conversation(session, conversation_id, now)
+
+
+def refresh_conversation(
+    session, conversation_id: int, now: Optional[datetime] = None
+) -> ConversationSummary:
+    """
+    Recount a conversation from its messages.
+
+    Counting is a range scan of the (conversation_id, id) primary key of one conversation that
+    skips over hidden messages. A conversation without a summary gets one without an owner.
+    """
+    in_conversation = MessageModel.conversation_id == conversation_id
+    segments = visible_segments(hidden_ranges(session, conversation_id))
+    count = sum(
+        session.scalar(select(func.count()).where(in_conversation, *segment_bounds(segment)))
+        for segment in segments
+    )
+    last = scan_segments(session, select(MessageModel.id).where(in_conversation), segments, True, 1)
+    summary = session.get(ConversationSummary, conversation_id)
+    if summary is None:
+        summary = ConversationSummary(conversation_id=conversation_id)
+        session.add(summary)
+    summary.message_count = count
+    summary.last_message_id = last[0] if last else None
+    summary.last_activity_at = now or datetime.utcnow()
+    if summary.title is None and count:
+        query = select(MessageModel.content).where(in_conversation)
+        first = scan_segments(session, query, segments, limit=1)[0]
+        summary.title = Message.from_json(first)["content"][:TITLE_CHARS] or None
+    session.flush()
+    return summary
+
+
+def backfill_conversations(session) -> int:
+    """Summarize conversations that have messages but no summary yet, in one statement."""
+    known = select(ConversationSummary.conversation_id)
+    missing = (
+        select(
+            MessageModel.conversation_id,
+            func.count(),
+            func.max(MessageModel.id),
+            func.current_timestamp(),
+        )
+        .where(MessageModel.conversation_id.not_in(known))
+        .group_by(MessageModel.conversation_id)
+    )
+    query = insert(ConversationSummary).from_select(
+        ["conversation_id", "message_count", "last_message_id", "last_activity_at"], missing
+    )
+    return session.execute(query).rowcount
@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Iterator, Optional
+
+import streamlit as st
+from sqlalchemy import func, select
+
+from naomi_core.db.chat import Message, MessageModel, add_message_to_db
+from naomi_streamlit.chat.branches import sync_branch
+from naomi_streamlit.chat.conversations import record_activity
+from naomi_streamlit.chat.payload_cache import payload_cache
+from naomi_streamlit.chat.response_cache import generate_response
+from naomi_streamlit.config import (
+    BRANCHING,
+    GENERATION_CHECKPOINT_INTERVAL_MS,
+    GENERATION_POLL_INTERVAL_MS,
+    GENERATION_QUEUE_DEPTH,
+    GENERATION_WORKERS,
+)
+from naomi_streamlit.db.engine import session_scope
+from naomi_streamlit.utils import current_user_id
+
+# Finished generations nobody came back for are forgotten after this many seconds
+FINISHED_JOB_TTL = 600
+
+JobKey = tuple[int, Optional[int]]
+
+
+class GenerationQueueFull(Exception):
+    pass
+
+
+@dataclass
+class GenerationJob:
+    """
+    A generation owned by the worker pool; message_id is None for a new draft response.
+
+    A draft is stored before it is generated, and its job is then keyed by the new message's id.
+    """
+
+    conversation_id: int
+    message_id: Optional[int]
+    owner: str
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    _chunks: list[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def key(self) -> JobKey:
+        return (self.conversation_id, self.message_id)
+
+    @property
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._chunks)
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        return None if self.started_at is None else self.started_at - self.submitted_at
+
+    @property
+    def generation_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def consume(
+        self, chunks: Iterator[str], checkpoint: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Stand-in for show_llm_generation that buffers the stream for UI sessions to tail.
+
+        checkpoint is called with the output so far every GENERATION_CHECKPOINT_INTERVAL_MS.
+        """
+        checkpointed_at = time.monotonic()
+        for chunk in chunks:
+            with self._lock:
+                self._chunks.append(chunk)
+            now = time.monotonic()
+            if checkpoint is not None and (
+                now - checkpointed_at >= GENERATION_CHECKPOINT_INTERVAL_MS / 1000
+            ):
+                checkpoint(self.text)
+                checkpointed_at = now
+        return self.text
+
+
+class GenerationExecutor:
+    """
+    Bounded worker pool that owns generate_response calls.
+
+    Generations keep running when the script run that started them is interrupted by a rerun or
+    a disconnect; UI sessions attach to them by (conversation_id, message_id).
+    """
+
+    def __init__(self, max_workers: int, max_queue_per_user: int):
+        self.max_queue_per_user = max_queue_per_user
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="naomi-generation")
+        self._jobs: dict[JobKey, GenerationJob] = {}
+        self._lock = threading.Lock()
+        self._queue_waits: deque[float] = deque(maxlen=1_000)
+        self._generation_times: deque[float] = deque(maxlen=1_000)
+        self._counts = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def submit(self, conversation_id: int, message_id: Optional[int], owner: str) -> GenerationJob:
+        key = (conversation_id, message_id)
+        with self._lock:
+            self._forget_expired()
+            existing = self._jobs.get(key)
+            if existing is not None and not existing.done.is_set():
+                return existing
+            pending = sum(
+                1 for j in self._jobs.values() if j.owner == owner and not j.done.is_set()
+            )
+            if pending >= self.max_queue_per_user:
+                self._counts["rejected"] += 1
+                raise GenerationQueueFull(f"{owner} already has {pending} generations in progress")
+            job = GenerationJob(conversation_id, message_id, owner)
+            self._jobs[key] = job
+            self._counts["submitted"] += 1
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, conversation_id: int, message_id: Optional[int]) -> Optional[GenerationJob]:
+        with self._lock:
+            return self._jobs.get((conversation_id, message_id))
+
+    def forget(self, job: GenerationJob):
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            active = [j for j in self._jobs.values() if not j.done.is_set()]
+            return {
+                **self._counts,
+                "running": sum(1 for j in active if j.started_at is not None),
+                "queued": sum(1 for j in active if j.started_at is None),
+                "queue_wait_avg_s": _average(self._queue_waits),
+                "generation_time_avg_s": _average(self._generation_times),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def _run(self, job: GenerationJob):
+        job.started_at = time.monotonic()
+        try:
+            with session_scope() as session:
+                if job.message_id is None:
+                    message = insert_draft(session, job.conversation_id)
+                    self._attach(job, message.id)
+                else:
+                    message = session.get(MessageModel, job.key)
+                checkpoint = partial(checkpoint_response, session, message)
+                generate_response(message, partial(job.consume, checkpoint=checkpoint), session)
+                if BRANCHING:
+                    # Link a regenerated response to its parent, so it shows with its siblings
+                    sync_branch(session, job.conversation_id)
+        except Exception as e:
+            logging.exception(f"Generation for {job.key} failed")
+            job.error = e
+        finally:
+            job.finished_at = time.monotonic()
+            if job.message_id is not None:
+                payload_cache.invalidate(job.conversation_id, job.message_id)
+            with self._lock:
+                self._queue_waits.append(job.queue_wait or 0.0)
+                self._generation_times.append(job.generation_time or 0.0)
+                self._counts["failed" if job.error else "completed"] += 1
+            job.done.set()
+        logging.info(
+            f"Generation for {job.key} finished: waited {job.queue_wait:.2f}s, "
+            f"generated in {job.generation_time:.2f}s"
+        )
+
+    def _attach(self, job: GenerationJob, message_id: int):
+        """Key a draft's job by the message it is generated into, where the chat page tails it."""
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+            job.message_id = message_id
+            self._jobs[job.key] = job
+
+    def _forget_expired(self):
+        now = time.monotonic()
+        expired = [
+            key
+            for key, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > FINISHED_JOB_TTL
+        ]
+        for key in expired:
+            del self._jobs[key]
+
+
+def insert_draft(session, conversation_id: int) -> MessageModel:
+    """Store an empty response for a generation to checkpoint into, before it starts."""
+    add_message_to_db(Message.from_llm_response(""), session, conversation_id)
+    record_activity(session, conversation_id, 1)
+    message_id = session.scalar(
+        select(func.max(MessageModel.id)).where(MessageModel.conversation_id == conversation_id)
+    )
+    session.commit()
+    return session.get(MessageModel, (conversation_id, message_id))
+
+
+def checkpoint_response(session, message: MessageModel, text: str):
+    """Save the output so far, so a restart mid-generation keeps it."""
+    message.content = MessageModel.from_llm_response(message.conversation_id, text).content
+    session.commit()
+
+
+def _average(values: deque[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+@st.cache_resource
+def generation_executor() -> GenerationExecutor:
+    return GenerationExecutor(GENERATION_WORKERS, GENERATION_QUEUE_DEPTH)
+
+
+def start_generation(conversation_id: int, message_id: Optional[int] = None):
+    try:
+        generation_executor().submit(conversation_id, message_id, current_user_id())
+    except GenerationQueueFull:
+        st.warning("You already have responses being generated, please wait for them to finish.")
+
+
+def active_generation(conversation_id: int, message_id: Optional[int]) -> Optional[GenerationJob]:
+    """The generation for a message if it is still running; finished generations are released."""
+    job = generation_executor().get(conversation_id, message_id)
+    if job is None:
+        return None
+    if not job.done.is_set():
+        return job
+    generation_executor().forget(job)
+    if job.error is not None:
+        st.error(f"Response generation failed: {job.error}")
+    return None
+
+
+@st.fragment(run_every=GENERATION_POLL_INTERVAL_MS / 1000)
+def draw_generation_tail(job: GenerationJob):
+    if job.done.is_set():
+        # Redraw the whole page so the persisted message replaces the tail
+        st.rerun()
+    st.markdown(job.text + "▌")
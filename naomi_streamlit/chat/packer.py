@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+from naomi_core.db.chat import MessageModel
+
+# Rough size of a token in characters; naomi_core ships no tokenizer to count with
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def message_tokens(messages: list[MessageModel]) -> list[int]:
+    """The estimated tokens of each of messages."""
+    return [estimate_tokens(message.content) for message in messages]
+
+
+@dataclass
+class PackingDecision:
+    """What pack_history sent to the LLM of a history and what it left out."""
+
+    budget: int
+    # Tokens of messages sent in any case, such as a summary
+    reserved_tokens: int
+    history_messages: int
+    history_tokens: int
+    packed_messages: int
+    packed_tokens: int
+
+    @property
+    def dropped_messages(self) -> int:
+        return self.history_messages - self.packed_messages
+
+    @property
+    def dropped_tokens(self) -> int:
+        return self.history_tokens - self.packed_tokens
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.reserved_tokens + self.packed_tokens
+
+
+def pack_history(
+    messages: list[MessageModel], budget: int, reserved_tokens: int = 0
+) -> tuple[list[MessageModel], PackingDecision]:
+    """
+    The newest of messages that fit the budget left after reserved_tokens, oldest first.
+
+    The newest message is always sent, however large. A budget of 0 sends every message.
+    """
+    tokens = message_tokens(messages)
+    kept, kept_tokens = 0, 0
+    for count in reversed(tokens):
+        if budget and kept and reserved_tokens + kept_tokens + count > budget:
+            break
+        kept, kept_tokens = kept + 1, kept_tokens + count
+    decision = PackingDecision(
+        budget=budget,
+        reserved_tokens=reserved_tokens,
+        history_messages=len(messages),
+        history_tokens=sum(tokens),
+        packed_messages=kept,
+        packed_tokens=kept_tokens,
+    )
+    dropped = decision.dropped_messages
+    return messages[dropped:], decision
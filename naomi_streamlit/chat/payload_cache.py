@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import streamlit as st
+
+from naomi_core.db.chat import Message, MessageModel
+from naomi_streamlit.config import PAYLOAD_CACHE_SIZE
+
+PARSE_STATS_KEY = "payload_parse_stats"
+
+
+@dataclass
+class ParseStats:
+    messages: int = 0
+    bytes: int = 0
+
+
+class PayloadCache:
+    """
+    Process-wide LRU cache of decoded message payloads keyed by (conversation_id, id).
+
+    Entries remember the raw JSON they were decoded from, so a row rewritten behind our back
+    (e.g. by another process) is decoded again instead of served stale.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, int], tuple[str, Message]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message: MessageModel, stats: Optional[ParseStats] = None) -> Message:
+        key = (message.conversation_id, message.id)
+        content = message.content
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == content:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        payload = message.payload
+        if stats is not None:
+            stats.messages += 1
+            stats.bytes += len(content)
+        if message.id is None:
+            return payload
+
+        with self._lock:
+            self._entries[key] = (content, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def invalidate(self, conversation_id: int, message_id: int):
+        with self._lock:
+            self._entries.pop((conversation_id, message_id), None)
+
+    def invalidate_from(self, conversation_id: int, message_id: int):
+        """Drop the entry for message_id and every later message of the conversation."""
+        with self._lock:
+            stale = [
+                key for key in self._entries if key[0] == conversation_id and key[1] >= message_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+payload_cache = PayloadCache(PAYLOAD_CACHE_SIZE)
+
+
+def reset_parse_stats() -> ParseStats:
+    st.session_state[PARSE_STATS_KEY] = ParseStats()
+    return st.session_state[PARSE_STATS_KEY]
+
+
+def parse_stats() -> ParseStats:
+    if PARSE_STATS_KEY not in st.session_state:
+        return reset_parse_stats()
+    return st.session_state[PARSE_STATS_KEY]
+
+
+def message_payload(message: MessageModel) -> Message:
+    """Decoded payload of a message, parsing its JSON only on a cache miss."""
+    return payload_cache.get(message, parse_stats())
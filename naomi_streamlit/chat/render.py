@@ -0,0 +1,76 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from itertools import groupby
+
+import streamlit as st
+
+from naomi_core.db.chat import MessageModel
+from naomi_streamlit.chat.payload_cache import message_payload
+from naomi_streamlit.config import HISTORY_BLOCK_CACHE_SIZE, HISTORY_BLOCK_SIZE
+
+_block_cache: OrderedDict[str, str] = OrderedDict()
+_block_cache_lock = threading.Lock()
+
+
+def split_live_messages(
+    messages: list[MessageModel], live_count: int
+) -> tuple[list[MessageModel], list[MessageModel]]:
+    """Split messages into immutable history and the newest `live_count` interactive messages."""
+    if len(messages) <= live_count:
+        return [], messages
+    split = len(messages) - live_count
+    return messages[:split], messages[split:]
+
+
+def message_markdown(message: MessageModel) -> str:
+    payload = message_payload(message)
+    if payload["role"] == "user":
+        return f"🧑 **User** `{message.id}`\n\n{payload['content']}"
+    return f"🤖 **Assistant** `{message.id}`\n\n{payload.body}"
+
+
+def block_hash(messages: list[MessageModel]) -> str:
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(f"{message.conversation_id}:{message.id}:".encode())
+        digest.update(message.content.encode())
+    return digest.hexdigest()
+
+
+def render_block(messages: list[MessageModel]) -> str:
+    """Pre-rendered markdown for a block of messages, cached by a hash of their contents."""
+    key = block_hash(messages)
+    with _block_cache_lock:
+        if key in _block_cache:
+            _block_cache.move_to_end(key)
+            return _block_cache[key]
+
+    markdown = "\n\n---\n\n".join(message_markdown(message) for message in messages)
+
+    with _block_cache_lock:
+        _block_cache[key] = markdown
+        while len(_block_cache) > HISTORY_BLOCK_CACHE_SIZE:
+            _block_cache.popitem(last=False)
+    return markdown
+
+
+def history_blocks(messages: list[MessageModel], block_size: int) -> list[list[MessageModel]]:
+    """
+    Group messages into blocks by id.
+
+    Grouping by id rather than by position means a block's contents (and therefore the element
+    Streamlit sends) only change when one of its own messages changes.
+    """
+    return [list(block) for _, block in groupby(messages, key=lambda m: m.id // block_size)]
+
+
+def draw_history(messages: list[MessageModel]):
+    """
+    Draw immutable history as a few large, stable markdown elements.
+
+    Streamlit replaces a large element it has already sent to the browser with a reference to
+    its hash, so unchanged blocks cost almost nothing on the websocket on later reruns.
+    """
+    for block in history_blocks(messages, HISTORY_BLOCK_SIZE):
+        st.markdown(render_block(block))
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+from naomi_core.db.chat import Message, MessageModel, add_message_to_db
+from naomi_streamlit.chat.context import build_context, stream_llm_response
+from naomi_streamlit.chat.conversations import record_activity
+from naomi_streamlit.config import RESPONSE_CACHE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_S
+from naomi_streamlit.db.agents import load_agents_with_responsibilities
+
+# Environment variables naomi_core's LLM client is configured from
+MODEL_SETTINGS = ("OPENAI_BASE_URL", "OPENAI_BASE_MODEL")
+
+
+class ResponseCache:
+    """
+    Process-wide cache of LLM responses keyed by a hash of the request, expiring after ttl seconds.
+
+    Once the responses exceed max_bytes in total the least recently used are evicted; a response
+    larger than max_bytes is never cached.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (expires_at, size in bytes, response)
+        self._entries: OrderedDict[str, tuple[float, int, str]] = OrderedDict()
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._remove(key)
+                self._counts["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[2]
+
+    def put(self, key: str, response: str):
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, size, response)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counts["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "hit_rate": self._counts["hits"] / lookups if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_S)
+
+
+def request_key(session, history: list[Message]) -> str:
+    """Hash of what is sent to the LLM: the history, the agents' prompts and the model."""
+    agents = [
+        {
+            "name": agent.name,
+            "prompt": agent.prompt,
+            "responsibilities": [[r.name, r.description] for r in responsibilities],
+        }
+        for agent, responsibilities in load_agents_with_responsibilities(session)
+    ]
+    request = {
+        "messages": [message.to_json() for message in history],
+        "agents": agents,
+        "model": {name: os.getenv(name) for name in MODEL_SETTINGS},
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+def persist_response(session, message: MessageModel, response: str):
+    """Store a response where naomi_core's generate_and_persist_llm_response would have."""
+    generated = MessageModel.from_llm_response(message.conversation_id, response)
+    if message.id is None:
+        add_message_to_db(generated.payload, session, message.conversation_id)
+    else:
+        message.content = generated.content
+        session.add(message)
+    record_activity(session, message.conversation_id, int(message.id is None))
+    session.commit()
+
+
+def generate_response(message: MessageModel, show_fn: Callable[[Iterator[str]], str], session):
+    """
+    Generate a response to the history of build_context through show_fn and persist it.
+
+    This is naomi_core's generate_and_persist_llm_response with the summarized and packed history
+    in place of the whole conversation. With NAOMI_RESPONSE_CACHE, a request identical to an
+    earlier one replays the earlier response through show_fn at full speed instead of calling the
+    LLM.
+    """
+    conversation_id = message.conversation_id
+    # A message regenerated in place answers the history before it, not its own old content
+    context = build_context(session, conversation_id, before_id=message.id)
+    key = request_key(session, context.messages) if RESPONSE_CACHE else None
+    cached = None if key is None else response_cache.get(key)
+    if cached is not None:
+        logging.info(f"Replaying a cached response in conversation {conversation_id}")
+        persist_response(session, message, show_fn(iter([cached])))
+        return
+
+    context.record()
+    response = show_fn(stream_llm_response(context.messages))
+    persist_response(session, message, response)
+    if key is not None:
+        response_cache.put(key, response)
@@ -0,0 +1,77 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+
+@dataclass
+class StreamStats:
+    tokens: int = 0
+    deltas: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.duration
+
+    @property
+    def deltas_per_second(self) -> float:
+        return self.deltas / self.duration
+
+
+def coalesce_chunks(
+    chunks: Iterator[str],
+    max_bytes: int,
+    interval: float,
+    stats: Optional[StreamStats] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[str]:
+    """
+    Merge a stream of small LLM chunks into fewer, larger deltas.
+
+    Buffered text is flushed once it reaches max_bytes or interval seconds have passed since the
+    last flush. The first chunk is always flushed immediately so time-to-first-token is not
+    affected. The interval is checked when a chunk arrives, so a stalled stream never holds back
+    more than the text received since the last flush.
+    """
+    stats = stats if stats is not None else StreamStats()
+    buffer: list[str] = []
+    buffered_bytes = 0
+    last_flush = clock()
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        now = clock()
+        stats.tokens += 1
+        if stats.first_token_at is None:
+            stats.first_token_at = now
+        size = len(chunk.encode("utf-8"))
+        stats.bytes += size
+        buffer.append(chunk)
+        buffered_bytes += size
+
+        if stats.deltas == 0 or buffered_bytes >= max_bytes or now - last_flush >= interval:
+            stats.deltas += 1
+            yield "".join(buffer)
+            buffer.clear()
+            buffered_bytes = 0
+            last_flush = now
+
+    if buffer:
+        stats.deltas += 1
+        yield "".join(buffer)
+    stats.finished_at = clock()
@@ -0,0 +1,265 @@
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import delete, func, select, union_all, update
+from sqlalchemy.orm import sessionmaker
+
+from naomi_core.db.chat import MessageModel, delete_messages_after
+from naomi_streamlit.config import (
+    TOMBSTONE_COMPACTION_BATCH,
+    TOMBSTONE_COMPACTION_INTERVAL_S,
+    TOMBSTONE_TRUNCATION,
+)
+from naomi_streamlit.db.models import (
+    InactiveMessageRange,
+    MessageParent,
+    MessageTombstone,
+    SummarySize,
+    summaries,
+)
+
+# An inclusive range of message ids, None leaves that end open
+Segment = tuple[Optional[int], Optional[int]]
+
+
+def hidden_ranges(session, conversation_id: int) -> list[tuple[int, int]]:
+    """
+    The id ranges hidden in a conversation, truncated or off the active branch.
+
+    Ranges may overlap. Both tables are read from their primary key.
+    """
+    query = union_all(
+        *(
+            select(table.from_id, table.to_id).where(table.conversation_id == conversation_id)
+            for table in (MessageTombstone, InactiveMessageRange)
+        )
+    )
+    return sorted(tuple(row) for row in session.execute(query).all())
+
+
+def visible_segments(
+    ranges: Iterable[tuple[int, int]], lower: Optional[int] = None, upper: Optional[int] = None
+) -> list[Segment]:
+    """The id ranges between lower and upper that no hidden range covers, oldest first."""
+    segments = []
+    start = lower
+    for from_id, to_id in sorted(ranges):
+        if upper is not None and from_id > upper:
+            break
+        if start is None or from_id > start:
+            segments.append((start, from_id - 1))
+        start = to_id + 1 if start is None else max(start, to_id + 1)
+    if start is None or upper is None or start <= upper:
+        segments.append((start, upper))
+    return segments
+
+
+def segment_bounds(segment: Segment) -> list:
+    lower, upper = segment
+    bounds = []
+    if lower is not None:
+        bounds.append(MessageModel.id >= lower)
+    if upper is not None:
+        bounds.append(MessageModel.id <= upper)
+    return bounds
+
+
+def scan_segments(
+    session, query, segments: list[Segment], descending: bool = False, limit: Optional[int] = None
+) -> list:
+    """
+    Run query over each segment in id order until limit rows are found.
+
+    Every segment is a primary key range scan, so hidden messages are never read. Without
+    tombstones there is a single segment and a single query.
+    """
+    rows = []
+    order = MessageModel.id.desc() if descending else MessageModel.id
+    for segment in reversed(segments) if descending else segments:
+        segment_query = query.where(*segment_bounds(segment)).order_by(order)
+        if limit is not None:
+            segment_query = segment_query.limit(limit - len(rows))
+        rows.extend(session.scalars(segment_query).all())
+        if limit is not None and len(rows) >= limit:
+            break
+    return rows
+
+
+def truncate_messages_after(session, message: MessageModel) -> Optional[MessageTombstone]:
+    """
+    Hide message and every later message of its conversation without touching their rows.
+
+    Costs a lookup of the conversation's last id and one insert, however long the tail is.
+    """
+    last_id = session.scalar(
+        select(func.max(MessageModel.id)).where(
+            MessageModel.conversation_id == message.conversation_id
+        )
+    )
+    if last_id is None or last_id < message.id:
+        return None
+    return add_tombstone(session, message.conversation_id, message.id, last_id)
+
+
+def add_tombstone(session, conversation_id: int, from_id: int, to_id: int) -> MessageTombstone:
+    """Hide the messages from from_id to to_id, widening a tombstone starting at from_id."""
+    tombstone = session.get(MessageTombstone, (conversation_id, from_id))
+    if tombstone is None:
+        tombstone = MessageTombstone(conversation_id=conversation_id, from_id=from_id, to_id=to_id)
+        session.add(tombstone)
+    else:
+        tombstone.to_id = max(tombstone.to_id, to_id)
+    session.flush()
+    return tombstone
+
+
+def truncate_after(session, message: MessageModel):
+    """Remove message and everything after it, as configured by NAOMI_TOMBSTONE_TRUNCATION."""
+    if TOMBSTONE_TRUNCATION:
+        truncate_messages_after(session, message)
+    else:
+        delete_messages_after(session, message)
+
+
+def in_ranges(table, conversation_id, message_id):
+    """Whether a message falls in a range of table, probed through the range primary key."""
+    return (
+        select(table.from_id)
+        .where(
+            table.conversation_id == conversation_id,
+            table.from_id <= message_id,
+            table.to_id >= message_id,
+        )
+        .exists()
+    )
+
+
+def compact_tombstone(session, tombstone) -> int:
+    """
+    Delete the messages a tombstone hides, then the tombstone, and return how many were deleted.
+
+    tombstone is a MessageTombstone or any row with its conversation_id, from_id and to_id.
+    """
+    deleted = session.execute(
+        delete(MessageModel)
+        .where(
+            MessageModel.conversation_id == tombstone.conversation_id,
+            MessageModel.id.between(tombstone.from_id, tombstone.to_id),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    forget_messages(
+        session,
+        tombstone.conversation_id,
+        lambda message_id: message_id.between(tombstone.from_id, tombstone.to_id),
+    )
+    clip_inactive_ranges(session, tombstone.conversation_id)
+    # A truncation may have widened the range meanwhile; it is then compacted on the next run
+    session.execute(
+        delete(MessageTombstone)
+        .where(
+            MessageTombstone.conversation_id == tombstone.conversation_id,
+            MessageTombstone.from_id == tombstone.from_id,
+            MessageTombstone.to_id == tombstone.to_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return deleted
+
+
+def forget_messages(session, conversation_id: int, selected: Callable):
+    """
+    Delete what the front end keeps about deleted messages: parents and summaries ending there.
+
+    selected builds the where clause picking the messages from an id column.
+    """
+    for table, conversation, message_id in (
+        (MessageParent, MessageParent.conversation_id, MessageParent.id),
+        (SummarySize, SummarySize.conversation_id, SummarySize.summary_until_id),
+        (summaries, summaries.c.conversation_id, summaries.c.summary_until_id),
+    ):
+        session.execute(
+            delete(table)
+            .where(conversation == conversation_id, selected(message_id))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def clip_inactive_ranges(session, conversation_id: int):
+    """
+    Cut inactive ranges off at the last message of a conversation.
+
+    naomi_core numbers new messages after the highest stored id, so once the last messages are
+    compacted their ids are handed out again and must not be inactive.
+    """
+    last_id = session.scalar(
+        select(func.max(MessageModel.id)).where(MessageModel.conversation_id == conversation_id)
+    )
+    in_conversation = InactiveMessageRange.conversation_id == conversation_id
+    if last_id is None:
+        session.execute(delete(InactiveMessageRange).where(in_conversation))
+        return
+    session.execute(
+        delete(InactiveMessageRange).where(in_conversation, InactiveMessageRange.from_id > last_id)
+    )
+    session.execute(
+        update(InactiveMessageRange)
+        .where(in_conversation, InactiveMessageRange.to_id > last_id)
+        .values(to_id=last_id)
+    )
+
+
+class TombstoneCompactor(threading.Thread):
+    """Daemon thread that deletes the messages hidden by truncations, oldest truncation first."""
+
+    def __init__(self, session_factory: sessionmaker, interval: float, batch_size: int):
+        super().__init__(name="naomi-tombstone-compaction", daemon=True)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run_once(self) -> int:
+        with self.session_factory() as session:
+            tombstones = session.execute(
+                select(
+                    MessageTombstone.conversation_id,
+                    MessageTombstone.from_id,
+                    MessageTombstone.to_id,
+                )
+                .order_by(MessageTombstone.created_at)
+                .limit(self.batch_size)
+            ).all()
+        deleted = 0
+        for tombstone in tombstones:
+            # One short transaction per truncation keeps the write lock away from chat sessions
+            with self.session_factory() as session:
+                deleted += compact_tombstone(session, tombstone)
+                session.commit()
+        if tombstones:
+            logging.info(f"Compacted {len(tombstones)} truncations, deleting {deleted} messages")
+        return deleted
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # Keep the schedule alive through transient failures such as a locked database
+                logging.exception("Tombstone compaction failed")
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_compaction(session_factory: sessionmaker) -> Optional[TombstoneCompactor]:
+    """Start compacting truncated messages in the background if tombstone truncation is on."""
+    if not TOMBSTONE_TRUNCATION or TOMBSTONE_COMPACTION_INTERVAL_S <= 0:
+        return None
+    compactor = TombstoneCompactor(
+        session_factory, TOMBSTONE_COMPACTION_INTERVAL_S, TOMBSTONE_COMPACTION_BATCH
+    )
+    compactor.start()
+    return compactor
@@ -3,19 +3,23 @@ import streamlit as st
 
 from naomi_core.db.chat import (
     MessageModel,
-    delete_messages_after,
 )
+from naomi_streamlit.chat.branches import delete_message
+from naomi_streamlit.chat.conversations import record_activity
+from naomi_streamlit.chat.payload_cache import message_payload, payload_cache
 
 
 def draw_user_message(message: MessageModel, session):
-    msg = message.payload
+    msg = message_payload(message)
     col1, _, col3 = st.columns([3, 1, 1])
     with col1:
         st.write(message.id)
     with col3:
         if st.button("🗑️", key=f"delete_{message.id}"):
             logging.info(f"Deleting messages from {message.id}")
-            delete_messages_after(session, message)
+            record_activity(session, message.conversation_id, -delete_message(session, message))
+            payload_cache.invalidate_from(message.conversation_id, message.id)
+            session.commit()
             st.rerun()
             return
     st.markdown(msg["content"])
@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import select
+
+from naomi_core.db.chat import MessageModel
+from naomi_streamlit.chat.branches import fetch_siblings
+from naomi_streamlit.chat.tombstones import hidden_ranges, scan_segments, visible_segments
+
+
+@dataclass
+class MessageWindow:
+    messages: list[MessageModel]
+    has_older: bool
+    # Sibling ids of the messages that have other branches, see fetch_siblings
+    siblings: dict[int, list[int]] = field(default_factory=dict)
+
+
+def fetch_message_window(
+    session, conversation_id: int, limit: int, start_id: Optional[int] = None
+) -> MessageWindow:
+    """
+    Load a window of messages through a keyset query on the (conversation_id, id) primary key.
+
+    Without a start_id only the newest `limit` messages are loaded. With a start_id every message
+    from that id onwards is loaded (used once the user has paged back with "load older").
+    Messages hidden by a truncation or off the active branch are skipped over by id range rather
+    than filtered row by row.
+    """
+    query = select(MessageModel).where(MessageModel.conversation_id == conversation_id)
+    ranges = hidden_ranges(session, conversation_id)
+    if start_id is None:
+        rows = scan_segments(session, query, visible_segments(ranges), True, limit + 1)
+        messages = list(reversed(rows[:limit]))
+        return MessageWindow(
+            messages, len(rows) > limit, _siblings(session, conversation_id, messages)
+        )
+
+    messages = scan_segments(session, query, visible_segments(ranges, lower=start_id))
+    older = select(MessageModel.id).where(MessageModel.conversation_id == conversation_id)
+    older_segments = visible_segments(ranges, upper=start_id - 1)
+    has_older = bool(scan_segments(session, older, older_segments, True, limit=1))
+    return MessageWindow(messages, has_older, _siblings(session, conversation_id, messages))
+
+
+def _siblings(session, conversation_id: int, messages: list[MessageModel]) -> dict[int, list[int]]:
+    return fetch_siblings(session, conversation_id, [message.id for message in messages])
+
+
+def find_older_page_start(
+    session, conversation_id: int, before_id: int, limit: int
+) -> Optional[int]:
+    """Return the id of the oldest message in the page of `limit` messages preceding before_id."""
+    query = select(MessageModel.id).where(MessageModel.conversation_id == conversation_id)
+    segments = visible_segments(hidden_ranges(session, conversation_id), upper=before_id - 1)
+    page = scan_segments(session, query, segments, True, limit)
+    return min(page, default=None)
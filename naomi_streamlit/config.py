@@ -0,0 +1,148 @@
+import os
+
+from dotenv import load_dotenv
+
+# Settings are read at import time, so pick up .env before anything else reads the environment
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes", "on")
+
+
+# Number of most recent messages loaded into the chat view on each rerun
+CHAT_WINDOW_SIZE = env_int("NAOMI_CHAT_WINDOW_SIZE", 50)
+
+# Most recently active conversations listed in the chat sidebar
+CONVERSATION_LIST_SIZE = env_int("NAOMI_CONVERSATION_LIST_SIZE", 50)
+
+# Regenerate responses as sibling branches instead of overwriting them
+BRANCHING = env_flag("NAOMI_BRANCHING", False)
+
+# Summarize older messages of long conversations in the background with naomi_core's LLM client
+CONTEXT_SUMMARIES = env_flag("NAOMI_CONTEXT_SUMMARIES", False)
+
+# Estimated tokens of history after the latest summary before older messages are summarized in
+# the background; 0 never summarizes
+CONTEXT_TOKEN_BUDGET = env_int("NAOMI_CONTEXT_TOKEN_BUDGET", 8_000)
+
+# Estimated tokens of the newest messages left out of a new summary and sent as they are
+CONTEXT_RECENT_TOKENS = env_int("NAOMI_CONTEXT_RECENT_TOKENS", 2_000)
+
+# Leave the oldest messages that don't fit NAOMI_PROMPT_TOKEN_BUDGET out of the history sent to
+# the LLM
+PROMPT_PACKING = env_flag("NAOMI_PROMPT_PACKING", False)
+
+# Estimated tokens of summary and history sent to the LLM when packing; 0 sends every message
+PROMPT_TOKEN_BUDGET = env_int("NAOMI_PROMPT_TOKEN_BUDGET", 12_000)
+
+# Replay the cached response of a request identical to an earlier one instead of calling the LLM
+RESPONSE_CACHE = env_flag("NAOMI_RESPONSE_CACHE", False)
+# Seconds a cached response is replayed for
+RESPONSE_CACHE_TTL_S = env_int("NAOMI_RESPONSE_CACHE_TTL_S", 3_600)
+# Bytes of cached responses kept before the least recently used are evicted
+RESPONSE_CACHE_MAX_BYTES = env_int("NAOMI_RESPONSE_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+
+# Truncate conversations by hiding the deleted messages and deleting them in the background
+TOMBSTONE_TRUNCATION = env_flag("NAOMI_TOMBSTONE_TRUNCATION", True)
+
+# Seconds between two background compactions of truncated messages
+TOMBSTONE_COMPACTION_INTERVAL_S = env_int("NAOMI_TOMBSTONE_COMPACTION_INTERVAL_S", 60)
+
+# Truncations compacted per background run, each in its own short transaction
+TOMBSTONE_COMPACTION_BATCH = env_int("NAOMI_TOMBSTONE_COMPACTION_BATCH", 100)
+
+# Maximum number of decoded message payloads kept in the process-wide LRU cache
+PAYLOAD_CACHE_SIZE = env_int("NAOMI_PAYLOAD_CACHE_SIZE", 10_000)
+
+# Newest messages drawn with their own delete/regenerate controls; older ones are pre-rendered
+CHAT_LIVE_MESSAGES = env_int("NAOMI_CHAT_LIVE_MESSAGES", 10)
+
+# Messages per pre-rendered history block, grouped by id so blocks stay stable across reruns
+HISTORY_BLOCK_SIZE = env_int("NAOMI_HISTORY_BLOCK_SIZE", 100)
+
+# Maximum number of pre-rendered history blocks kept in memory
+HISTORY_BLOCK_CACHE_SIZE = env_int("NAOMI_HISTORY_BLOCK_CACHE_SIZE", 1_000)
+
+# LLM stream coalescing: buffered tokens are flushed to the browser once either limit is reached
+STREAM_FLUSH_BYTES = env_int("NAOMI_STREAM_FLUSH_BYTES", 256)
+STREAM_FLUSH_INTERVAL_MS = env_int("NAOMI_STREAM_FLUSH_INTERVAL_MS", 50)
+
+# Run LLM generations on a background worker pool instead of the Streamlit script thread
+BACKGROUND_GENERATION = env_flag("NAOMI_BACKGROUND_GENERATION", False)
+GENERATION_WORKERS = env_int("NAOMI_GENERATION_WORKERS", 4)
+# Maximum number of queued or running generations per user
+GENERATION_QUEUE_DEPTH = env_int("NAOMI_GENERATION_QUEUE_DEPTH", 2)
+# How often the UI polls an in-progress generation for new output
+GENERATION_POLL_INTERVAL_MS = env_int("NAOMI_GENERATION_POLL_INTERVAL_MS", 250)
+# How often a background generation saves its output so far to the message
+GENERATION_CHECKPOINT_INTERVAL_MS = env_int("NAOMI_GENERATION_CHECKPOINT_INTERVAL_MS", 1_000)
+
+# Agent catalogs larger than this render one toggle per agent and only build opened forms
+LAZY_FORMS_THRESHOLD = env_int("NAOMI_LAZY_FORMS_THRESHOLD", 10)
+
+# Number of webhook events loaded into the events table per page; the single dataframe stays
+# responsive with pages of up to 50,000 events
+EVENTS_PAGE_SIZE = env_int("NAOMI_EVENTS_PAGE_SIZE", 50)
+
+# Webhook events older than this many days are deleted in the background; 0 keeps them forever
+EVENTS_RETENTION_DAYS = env_int("NAOMI_EVENTS_RETENTION_DAYS", 0)
+
+# Only expire events with this status, e.g. "processed"; empty expires events of any status
+EVENTS_RETENTION_STATUS = os.getenv("NAOMI_EVENTS_RETENTION_STATUS", "")
+
+# Minutes between two runs of the event retention policy
+EVENTS_RETENTION_INTERVAL_MINUTES = env_int("NAOMI_EVENTS_RETENTION_INTERVAL_MINUTES", 60)
+
+# Characters of a webhook event payload shown before the full payload is requested
+PAYLOAD_PREVIEW_CHARS = env_int("NAOMI_PAYLOAD_PREVIEW_CHARS", 2_000)
+
+# Largest payload in bytes that is parsed and drawn in full; larger ones can only be downloaded
+PAYLOAD_VIEW_MAX_BYTES = env_int("NAOMI_PAYLOAD_VIEW_MAX_BYTES", 1_000_000)
+
+# Milliseconds between two polls of the live event tail
+EVENTS_TAIL_INTERVAL_MS = env_int("NAOMI_EVENTS_TAIL_INTERVAL_MS", 2_000)
+
+# Newest events kept in the live event tail; only these are watched for status changes
+EVENTS_TAIL_ROWS = env_int("NAOMI_EVENTS_TAIL_ROWS", 100)
+
+# Connections kept open in the front end's database pool, and how many more it may open under load
+DB_POOL_SIZE = env_int("NAOMI_DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("NAOMI_DB_MAX_OVERFLOW", 10)
+
+# Seconds to wait for a free pooled connection before giving up
+DB_POOL_TIMEOUT = env_int("NAOMI_DB_POOL_TIMEOUT", 30)
+
+# Seconds after which a pooled connection is replaced, -1 keeps connections forever
+DB_POOL_RECYCLE = env_int("NAOMI_DB_POOL_RECYCLE", 1_800)
+
+# Check that a pooled connection is alive before handing it out
+DB_POOL_PRE_PING = env_flag("NAOMI_DB_POOL_PRE_PING", True)
+
+# Tune SQLite connections for concurrent sessions: WAL journal and a separate read-only pool
+SQLITE_PROFILE = env_flag("NAOMI_SQLITE_PROFILE", True)
+
+# Milliseconds a SQLite connection waits on a lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = env_int("NAOMI_SQLITE_BUSY_TIMEOUT_MS", 5_000)
+
+# Bytes of the SQLite database file memory-mapped by each connection
+SQLITE_MMAP_SIZE = env_int("NAOMI_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+
+# Kilobytes of page cache per SQLite connection
+SQLITE_CACHE_SIZE_KB = env_int("NAOMI_SQLITE_CACHE_SIZE_KB", 64_000)
+
+# Connections kept open in the read-only pool used with the SQLite profile
+DB_READ_POOL_SIZE = env_int("NAOMI_DB_READ_POOL_SIZE", 10)
+
+# Record per-rerun timings, SQL and LLM stream statistics and show them in a sidebar panel
+PERF_INSTRUMENTATION = env_flag("NAOMI_PERF_INSTRUMENTATION", False)
+
+# Number of profiled reruns kept per browser session
+PERF_HISTORY = env_int("NAOMI_PERF_HISTORY", 100)
+
+# Append every profiled rerun to this JSON lines file; empty only keeps them in the session
+PERF_EXPORT_PATH = os.getenv("NAOMI_PERF_EXPORT_PATH", "")
@@ -0,0 +1,39 @@
+from collections import defaultdict
+from typing import Collection
+
+from sqlalchemy import select
+
+from naomi_core.db.agent import AgentModel, AgentResponsibilityModel
+
+
+def load_agents(session, name_filter: str = "") -> list[AgentModel]:
+    query = select(AgentModel).order_by(AgentModel.name)
+    if name_filter:
+        query = query.where(AgentModel.name.icontains(name_filter, autoescape=True))
+    return list(session.scalars(query).all())
+
+
+def load_responsibilities(
+    session, agent_names: Collection[str]
+) -> dict[str, list[AgentResponsibilityModel]]:
+    """Load the responsibilities of the given agents in a single query, grouped by agent name."""
+    responsibilities: dict[str, list[AgentResponsibilityModel]] = defaultdict(list)
+    if not agent_names:
+        return responsibilities
+    query = (
+        select(AgentResponsibilityModel)
+        .where(AgentResponsibilityModel.agent_name.in_(agent_names))
+        .order_by(AgentResponsibilityModel.agent_name, AgentResponsibilityModel.name)
+    )
+    for responsibility in session.scalars(query):
+        responsibilities[responsibility.agent_name].append(responsibility)
+    return responsibilities
+
+
+def load_agents_with_responsibilities(
+    session, name_filter: str = ""
+) -> list[tuple[AgentModel, list[AgentResponsibilityModel]]]:
+    """Load agents with their responsibilities in two queries, however many agents exist."""
+    agents = load_agents(session, name_filter)
+    responsibilities = load_responsibilities(session, [agent.name for agent in agents])
+    return [(agent, responsibilities[agent.name]) for agent in agents]
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+import streamlit as st
+from sqlalchemy import Insert, create_engine, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from streamlit.runtime.scriptrunner import RerunException, StopException
+
+from naomi_core.db.core import session_scope as core_session_scope
+from naomi_streamlit.config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_READ_POOL_SIZE,
+    SQLITE_PROFILE,
+)
+from naomi_streamlit.db.sqlite import apply_sqlite_profile
+
+
+@dataclass
+class Database:
+    """
+    The read-write engine and, with the SQLite profile, a read-only one.
+
+    Without a read-only engine, reads share the read-write engine.
+    """
+
+    engine: Engine
+    session_factory: sessionmaker
+    read_engine: Optional[Engine] = None
+    read_session_factory: Optional[sessionmaker] = None
+
+    def __post_init__(self):
+        if self.read_engine is None:
+            self.read_engine = self.engine
+            self.read_session_factory = self.session_factory
+
+
+def core_engine() -> Engine:
+    """The engine naomi_core was configured with, which names the database to connect to."""
+    with core_session_scope() as session:
+        return session.get_bind()
+
+
+def is_in_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def insert_ignoring_conflicts(session, table) -> Insert:
+    """An insert into table that skips rows whose primary key another session wrote first."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect in ("mysql", "mariadb"):
+        return insert(table).prefix_with("IGNORE")
+    return insert(table)
+
+
+def create_pooled_engine(url: URL, pool_size: int = DB_POOL_SIZE) -> Engine:
+    return create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def new_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def create_database(url: URL, sqlite_profile: bool = SQLITE_PROFILE) -> Database:
+    """
+    Create pooled engines for url.
+
+    With the SQLite profile, writes go through a WAL-journaled pool and reads through a separate
+    pool of read-only connections, so readers neither wait for nor hold up the writer.
+    """
+    engine = create_pooled_engine(url)
+    if url.get_backend_name() != "sqlite" or not sqlite_profile:
+        return Database(engine, new_session_factory(engine))
+    apply_sqlite_profile(engine)
+    read_engine = create_pooled_engine(url, DB_READ_POOL_SIZE)
+    apply_sqlite_profile(read_engine, read_only=True)
+    return Database(
+        engine, new_session_factory(engine), read_engine, new_session_factory(read_engine)
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def database() -> Database:
+    """
+    The engines and session factories shared by every session and rerun of the front end.
+
+    An in-memory SQLite database only exists inside naomi_core's own engine, so it is reused
+    as is instead of being pooled.
+    """
+    engine = core_engine()
+    if is_in_memory(engine.url):
+        return Database(engine, new_session_factory(engine))
+    return create_database(engine.url)
+
+
+@contextmanager
+def session_scope():
+    """
+    Like naomi_core.db.core.session_scope, with a session from the shared pooled engine.
+
+    st.rerun() and st.stop() end the script run rather than fail it, so they commit too.
+    """
+    session: Session = database().session_factory()
+    try:
+        yield session
+        session.commit()
+    except (RerunException, StopException):
+        session.commit()
+        raise
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@contextmanager
+def read_session_scope():
+    """A session for reads only; it is rolled back rather than committed."""
+    session: Session = database().read_session_factory()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+def pool_stats(engine: Engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Negative while the pool itself still has room
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout_s": pool.timeout(),
+    }
@@ -0,0 +1,28 @@
+from sqlalchemy import Index
+from sqlalchemy.engine import Engine
+
+from naomi_core.db.webhook import WebhookEvent
+
+# Keyset pagination of the events page walks (created_at, id), optionally within one
+# event_type or status, so each filter gets an index ending in the same key.
+INDEXES = [
+    Index("ix_naomi_webhook_events_created_at_id", WebhookEvent.created_at, WebhookEvent.id),
+    Index(
+        "ix_naomi_webhook_events_type_created_at_id",
+        WebhookEvent.event_type,
+        WebhookEvent.created_at,
+        WebhookEvent.id,
+    ),
+    Index(
+        "ix_naomi_webhook_events_status_created_at_id",
+        WebhookEvent.status,
+        WebhookEvent.created_at,
+        WebhookEvent.id,
+    ),
+]
+
+
+def create_indexes(engine: Engine):
+    """Create the indexes the Streamlit front end relies on if they don't exist yet."""
+    for index in INDEXES:
+        index.create(bind=engine, checkfirst=True)
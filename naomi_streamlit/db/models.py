@@ -0,0 +1,137 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Engine
+
+from naomi_core.db.core import Base
+
+
+class EventPayloadSize(Base):
+    """
+    Byte size of a webhook event payload, kept beside naomi_core's webhook_events table.
+
+    Sizes are recorded incrementally by naomi_streamlit.events.queries.record_payload_sizes so the
+    events table can show them without reading any payload.
+    """
+
+    __tablename__ = "naomi_webhook_event_payload_sizes"
+
+    event_id = Column(Integer, primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+
+
+class ConversationSummary(Base):
+    """
+    Title, size and last activity of a chat conversation, kept beside naomi_core's messages table.
+
+    Summaries are refreshed by naomi_streamlit.chat.conversations whenever the front end writes to
+    a conversation, so the conversation list never has to scan messages. Conversations without an
+    owner predate per-user conversations and are listed for everyone.
+    """
+
+    __tablename__ = "naomi_conversations"
+    __table_args__ = (
+        Index("ix_naomi_conversations_owner_last_activity_at", "owner", "last_activity_at"),
+    )
+
+    conversation_id = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=True)
+    title = Column(String, nullable=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    last_message_id = Column(Integer, nullable=True)
+    last_activity_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MessageTombstone(Base):
+    """
+    A range of message ids hidden by truncating a conversation, until they are compacted.
+
+    Truncating records the range instead of deleting the rows, see naomi_streamlit.chat.tombstones.
+    naomi_core numbers new messages after the highest stored id, so messages written after a
+    truncation land above the range and stay visible.
+    """
+
+    __tablename__ = "naomi_message_tombstones"
+
+    conversation_id = Column(Integer, primary_key=True)
+    from_id = Column(Integer, primary_key=True)
+    to_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MessageParent(Base):
+    """
+    The message a chat message answers or follows, turning a conversation into a message tree.
+
+    Rows are added by naomi_streamlit.chat.branches as messages are written. Regenerating a message
+    adds a sibling under the same parent, so every branch shares its prefix without copying it.
+    """
+
+    __tablename__ = "naomi_message_parents"
+    __table_args__ = (
+        Index("ix_naomi_message_parents_conversation_id_parent_id", "conversation_id", "parent_id"),
+    )
+
+    conversation_id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, nullable=True)
+
+
+class InactiveMessageRange(Base):
+    """
+    A range of message ids off the active branch of a conversation.
+
+    Inactive messages are hidden like truncated ones but never compacted; switching branches
+    rewrites the ranges after the fork, see naomi_streamlit.chat.branches.
+    """
+
+    __tablename__ = "naomi_inactive_message_ranges"
+
+    conversation_id = Column(Integer, primary_key=True)
+    from_id = Column(Integer, primary_key=True)
+    to_id = Column(Integer, nullable=False)
+
+
+# naomi_core's rolling conversation summaries, each covering the active branch up to
+# summary_until_id. Kept on its own metadata so it never clashes with naomi_core's model of it.
+core_metadata = MetaData()
+summaries = Table(
+    "summaries",
+    core_metadata,
+    Column("conversation_id", Integer, primary_key=True),
+    Column("summary_until_id", Integer, primary_key=True),
+    Column("content", Text, nullable=False),
+)
+
+
+class SummarySize(Base):
+    """
+    Estimated tokens of a conversation summary and of the messages it stands in for.
+
+    Written by naomi_streamlit.chat.context next to each summary it adds, so the tokens a summary
+    saves per request are known without reading the summarized messages again.
+    """
+
+    __tablename__ = "naomi_summary_sizes"
+
+    conversation_id = Column(Integer, primary_key=True)
+    summary_until_id = Column(Integer, primary_key=True)
+    source_tokens = Column(Integer, nullable=False)
+    summary_tokens = Column(Integer, nullable=False)
+
+
+TABLES = [
+    EventPayloadSize.__table__,
+    ConversationSummary.__table__,
+    MessageTombstone.__table__,
+    MessageParent.__table__,
+    InactiveMessageRange.__table__,
+    SummarySize.__table__,
+]
+
+
+def create_tables(engine: Engine):
+    """Create the tables the Streamlit front end keeps next to naomi_core's if they don't exist."""
+    Base.metadata.create_all(bind=engine, tables=TABLES, checkfirst=True)
+    # naomi_core normally creates the summaries table itself
+    core_metadata.create_all(bind=engine, checkfirst=True)
@@ -0,0 +1,36 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from naomi_streamlit.config import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+)
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        # A negative cache size is in kilobytes rather than pages
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+    ]
+    if read_only:
+        return pragmas + ["PRAGMA query_only = ON"]
+    # WAL lets readers keep reading while a writer commits; with WAL, NORMAL only gives up
+    # durability of the last transactions on power loss, never consistency
+    return ["PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"] + pragmas
+
+
+def apply_sqlite_profile(engine: Engine, read_only: bool = False):
+    """Run the profile's pragmas on every new connection of the engine."""
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,73 @@
+import streamlit as st
+from sqlalchemy.engine import Engine
+
+from naomi_streamlit.chat.context import context_stats
+from naomi_streamlit.chat.generation import generation_executor
+from naomi_streamlit.chat.response_cache import response_cache
+from naomi_streamlit.config import RESPONSE_CACHE
+from naomi_streamlit.db.engine import database, pool_stats
+
+
+def draw_pool_stats():
+    db = database()
+    st.subheader("Database pool")
+    st.caption(db.engine.url.render_as_string(hide_password=True))
+    if db.read_engine is db.engine:
+        draw_engine_pool_stats(db.engine)
+        return
+    st.markdown("**Read-write**")
+    draw_engine_pool_stats(db.engine)
+    st.markdown("**Read-only**")
+    draw_engine_pool_stats(db.read_engine)
+
+
+def draw_engine_pool_stats(engine: Engine):
+    stats = pool_stats(engine)
+    if "size" not in stats:
+        st.info(f"The database uses a {stats['pool']}, which keeps no pool statistics.")
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Pool size", stats["size"])
+    col2.metric("Checked out", stats["checked_out"])
+    col3.metric("Checked in", stats["checked_in"])
+    col4.metric("Overflow", f"{stats['overflow']} / {stats['max_overflow']}")
+
+
+def draw_generation_metrics():
+    st.subheader("Background generation")
+    st.json(generation_executor().metrics())
+
+
+def draw_context_metrics():
+    st.subheader("LLM context")
+    st.json(context_stats.snapshot())
+
+
+def draw_response_cache_metrics():
+    st.subheader("Response cache")
+    stats = response_cache.snapshot()
+    if not RESPONSE_CACHE:
+        st.caption(
+            "Disabled, set NAOMI_RESPONSE_CACHE=1 to replay responses to identical requests."
+        )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Hit rate", "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}")
+    col2.metric("Hits", stats["hits"])
+    col3.metric("Misses", stats["misses"])
+    st.json(stats)
+
+
+def show_diagnostics():
+    st.set_page_config(
+        page_title="NAOMI Diagnostics",
+        page_icon="🩺",
+    )
+    st.title("Diagnostics")
+
+    if st.button("🔄 Refresh", key="refresh"):
+        st.rerun()
+
+    draw_pool_stats()
+    draw_generation_metrics()
+    draw_context_metrics()
+    draw_response_cache_metrics()
@@ -0,0 +1,246 @@
+from dataclasses import asdict
+from datetime import datetime, time
+from typing import Optional
+
+import streamlit as st
+
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.config import (
+    EVENTS_PAGE_SIZE,
+    EVENTS_TAIL_INTERVAL_MS,
+    EVENTS_TAIL_ROWS,
+    PAYLOAD_PREVIEW_CHARS,
+)
+from naomi_streamlit.db.engine import read_session_scope, session_scope
+from naomi_streamlit.events.payload_viewer import draw_event_payload, draw_payload_preview
+from naomi_streamlit.events.queries import (
+    Cursor,
+    EventPage,
+    delete_events,
+    distinct_values,
+    fetch_event_page,
+    payload_sizes_pending,
+    record_payload_sizes,
+    set_event_status,
+)
+from naomi_streamlit.events.tail import EventTail, poll_tail, start_tail
+from naomi_streamlit.perf import phase, profile_rerun
+
+PAGER_KEY = "events_pager"
+TABLE_KEY = "events_table"
+TAIL_KEY = "events_tail"
+
+EVENT_COLUMN_CONFIG = {
+    "id": st.column_config.NumberColumn("ID", format="%d"),
+    "event_type": "Event type",
+    "created_at": st.column_config.DatetimeColumn("Created at"),
+    "status": "Status",
+    "payload_size": st.column_config.NumberColumn("Payload size", format="%d B"),
+}
+
+
+def event_form():
+    with st.form("event_form"):
+        event_type = st.text_input("Event Type", value="email")
+        payload = st.text_area(
+            "Payload",
+            """{
+    "subject": "PNC Statement",
+    "body": "..."
+    }""",
+        )
+        draw_payload_preview(payload[:PAYLOAD_PREVIEW_CHARS], len(payload) > PAYLOAD_PREVIEW_CHARS)
+        if st.form_submit_button("Submit"):
+            with session_scope() as session:
+                new_event = WebhookEvent(event_type=event_type, payload=payload)
+                session.add(new_event)
+            event_filter_options.clear()
+            st.success("Event added successfully!")
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def event_filter_options() -> tuple[list[str], list[str]]:
+    with read_session_scope() as session:
+        return (
+            distinct_values(session, WebhookEvent.event_type),
+            distinct_values(session, WebhookEvent.status),
+        )
+
+
+def draw_event_filters() -> tuple[Optional[str], Optional[str], bool]:
+    event_types, statuses = event_filter_options()
+    col1, col2, col3 = st.columns([2, 2, 1], vertical_alignment="bottom")
+    event_type = col1.selectbox(
+        "Event type", event_types, index=None, placeholder="All", key="events_type_filter"
+    )
+    status = col2.selectbox(
+        "Status", statuses, index=None, placeholder="All", key="events_status_filter"
+    )
+    newest_first = col3.toggle("Newest first", value=True, key="events_newest_first")
+    return event_type, status, newest_first
+
+
+def page_cursors(filters: tuple) -> list[Optional[Cursor]]:
+    """Cursors of the pages visited so far; changing the filters starts over at the first page."""
+    pager = st.session_state.get(PAGER_KEY)
+    if pager is None or pager["filters"] != filters:
+        pager = {"filters": filters, "cursors": [None]}
+        st.session_state[PAGER_KEY] = pager
+        clear_selection()
+    return pager["cursors"]
+
+
+def draw_pager(cursors: list[Optional[Cursor]], next_cursor: Optional[Cursor]):
+    col1, col2, col3 = st.columns([1, 2, 1])
+    if col1.button("⬅️ Previous", key="events_previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        clear_selection()
+        st.rerun()
+    col2.caption(f"Page {len(cursors)}")
+    if col3.button("Next ➡️", key="events_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        clear_selection()
+        st.rerun()
+
+
+def draw_event_table(page: EventPage) -> list:
+    """Draw the page as a single dataframe and return the rows of the selected events."""
+    selection = st.dataframe(
+        [event._asdict() for event in page.events],
+        key=TABLE_KEY,
+        on_select="rerun",
+        selection_mode="multi-row",
+        hide_index=True,
+        use_container_width=True,
+        column_config=EVENT_COLUMN_CONFIG,
+    )
+    # The selection outlives the rows it was made on, e.g. after paging or a bulk delete
+    return [page.events[row] for row in selection.selection.rows if row < len(page.events)]
+
+
+def clear_selection():
+    st.session_state.pop(TABLE_KEY, None)
+
+
+def draw_bulk_actions(event_ids: list[int], statuses: list[str]):
+    col1, col2, col3 = st.columns([1, 2, 1], vertical_alignment="bottom")
+    if col1.button(
+        f"🗑️ Delete {len(event_ids)} selected",
+        key="events_delete_selected",
+        disabled=not event_ids,
+    ):
+        with session_scope() as session:
+            deleted = delete_events(session, event_ids)
+        event_filter_options.clear()
+        clear_selection()
+        st.toast(f"{deleted} events deleted")
+        st.rerun()
+
+    status = col2.selectbox("New status", statuses, index=None, key="events_new_status")
+    if col3.button("Set status", key="events_set_status", disabled=not event_ids or status is None):
+        with session_scope() as session:
+            updated = set_event_status(session, event_ids, status)
+        event_filter_options.clear()
+        clear_selection()
+        st.toast(f"{updated} events set to {status}")
+        st.rerun()
+
+
+def draw_bulk_delete(event_type: Optional[str], status: Optional[str]):
+    """Delete every event matching the current filters, optionally only those before a date."""
+    with st.expander("🧹 Delete matching events"):
+        older_than_date = st.date_input("Older than", value=None, key="events_older_than")
+        older_than = None if older_than_date is None else datetime.combine(older_than_date, time())
+        criteria = [
+            f"{label} {value}"
+            for label, value in (
+                ("type", event_type),
+                ("status", status),
+                ("created before", older_than_date),
+            )
+            if value
+        ]
+        st.caption(
+            "Deletes events with " + ", ".join(criteria)
+            if criteria
+            else "Pick a filter or a date to delete matching events"
+        )
+        if st.button("🗑️ Delete matching", key="events_delete_matching", disabled=not criteria):
+            with session_scope() as session:
+                deleted = delete_events(
+                    session, event_type=event_type, status=status, older_than=older_than
+                )
+            event_filter_options.clear()
+            clear_selection()
+            st.toast(f"{deleted} events deleted")
+            st.rerun()
+
+
+def draw_selected_payload(selected: list):
+    if len(selected) != 1:
+        st.caption("Select a single event to view its payload")
+        return
+    with st.container(border=True):
+        draw_event_payload(selected[0].id, selected[0].payload_size)
+
+
+@st.fragment(run_every=EVENTS_TAIL_INTERVAL_MS / 1000)
+def draw_live_tail():
+    """Poll for new and changed events; only this fragment reruns, not the rest of the page."""
+    tail: Optional[EventTail] = st.session_state.get(TAIL_KEY)
+    with read_session_scope() as session:
+        if tail is None:
+            tail = st.session_state[TAIL_KEY] = start_tail(session, EVENTS_TAIL_ROWS)
+        else:
+            poll_tail(session, tail)
+
+    st.caption(
+        f"Live tail of the newest {EVENTS_TAIL_ROWS} events, "
+        f"polled every {EVENTS_TAIL_INTERVAL_MS / 1000:g}s"
+    )
+    st.dataframe(
+        [event._asdict() for event in tail.newest_first()],
+        hide_index=True,
+        use_container_width=True,
+        column_config=EVENT_COLUMN_CONFIG,
+    )
+    if tail.changes:
+        st.caption("Status changes")
+        st.dataframe(
+            [asdict(change) for change in reversed(tail.changes)],
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def show_events():
+    st.title("Event Logger")
+
+    with profile_rerun("events"):
+        with st.expander("Add Event", expanded=True):
+            event_form()
+
+        if st.toggle("📡 Live tail", key="events_live_tail"):
+            draw_live_tail()
+        else:
+            st.session_state.pop(TAIL_KEY, None)
+
+        event_type, status, newest_first = draw_event_filters()
+        cursors = page_cursors((event_type, status, newest_first))
+        draw_bulk_delete(event_type, status)
+
+        with read_session_scope() as session:
+            sizes_pending = payload_sizes_pending(session)
+        if sizes_pending:
+            # A write transaction only on reruns that follow new events
+            with session_scope() as session:
+                record_payload_sizes(session)
+        with read_session_scope() as session, phase("fetch_events"):
+            page = fetch_event_page(
+                session, EVENTS_PAGE_SIZE, cursors[-1], event_type, status, newest_first
+            )
+
+        selected = draw_event_table(page)
+        draw_bulk_actions([event.id for event in selected], event_filter_options()[1])
+        draw_selected_payload(selected)
+        draw_pager(cursors, page.next_cursor)
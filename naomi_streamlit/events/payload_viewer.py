@@ -0,0 +1,72 @@
+import json
+from typing import Optional
+
+import streamlit as st
+
+from naomi_streamlit.config import PAYLOAD_PREVIEW_CHARS, PAYLOAD_VIEW_MAX_BYTES
+from naomi_streamlit.db.engine import read_session_scope
+from naomi_streamlit.events.queries import load_payload, load_payload_preview
+
+
+def format_size(size_bytes: Optional[int]) -> str:
+    if size_bytes is None:
+        return "unknown size"
+    size = float(size_bytes)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def draw_payload_preview(preview: str, truncated: bool):
+    st.code(preview + ("\n…" if truncated else ""), language="json")
+    if truncated:
+        st.caption(f"Showing the first {PAYLOAD_PREVIEW_CHARS:,} characters")
+
+
+def draw_full_payload(event_id: int, payload: str):
+    st.download_button(
+        "⬇️ Download raw payload",
+        payload,
+        file_name=f"event_{event_id}.json",
+        mime="application/json",
+        key=f"event_{event_id}_download",
+    )
+    size_bytes = len(payload.encode())
+    if size_bytes > PAYLOAD_VIEW_MAX_BYTES:
+        st.warning(
+            f"The payload is {format_size(size_bytes)}, too large to display. Download it instead."
+        )
+        return
+    try:
+        st.json(json.loads(payload))
+    except ValueError:
+        st.code(payload)
+
+
+def draw_event_payload(event_id: int, size_bytes: Optional[int]):
+    """
+    Show a preview of one event's payload, loading and parsing all of it only on request.
+
+    The preview is cut by the database, so a multi-megabyte payload costs a few kilobytes per
+    rerun until "Show full payload" is switched on.
+    """
+    st.caption(f"Payload of event {event_id} ({format_size(size_bytes)})")
+    show_full = st.toggle("Show full payload", key=f"event_{event_id}_full_payload")
+    with read_session_scope() as session:
+        if show_full:
+            payload = load_payload(session, event_id)
+        else:
+            payload = load_payload_preview(session, event_id, PAYLOAD_PREVIEW_CHARS)
+    if payload is None:
+        st.warning(f"Event {event_id} no longer exists")
+    elif show_full:
+        draw_full_payload(event_id, payload)
+    else:
+        truncated = (
+            len(payload) >= PAYLOAD_PREVIEW_CHARS
+            if size_bytes is None
+            else size_bytes > len(payload.encode())
+        )
+        draw_payload_preview(payload, truncated)
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    LargeBinary,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.db.models import EventPayloadSize
+
+Cursor = tuple[datetime, int]
+
+# Everything the events table shows, the payload itself is only loaded for the selected event
+EVENT_LIST_COLUMNS = (
+    WebhookEvent.id,
+    WebhookEvent.event_type,
+    WebhookEvent.created_at,
+    WebhookEvent.status,
+    EventPayloadSize.size_bytes.label("payload_size"),
+)
+
+
+def select_event_list():
+    return select(*EVENT_LIST_COLUMNS).outerjoin(
+        EventPayloadSize, EventPayloadSize.event_id == WebhookEvent.id
+    )
+
+
+@dataclass
+class EventPage:
+    events: list
+    next_cursor: Optional[Cursor]
+
+
+def event_filters(event_type: Optional[str] = None, status: Optional[str] = None) -> list:
+    filters = []
+    if event_type:
+        filters.append(WebhookEvent.event_type == event_type)
+    if status:
+        filters.append(WebhookEvent.status == status)
+    return filters
+
+
+def after_cursor(cursor: Cursor, newest_first: bool):
+    # A row value comparison lets the database seek the (created_at, id) index directly, the
+    # equivalent OR of two comparisons makes SQLite scan it from the start
+    key = tuple_(WebhookEvent.created_at, WebhookEvent.id)
+    if newest_first:
+        return key < tuple_(*cursor)
+    return key > tuple_(*cursor)
+
+
+def fetch_event_page(
+    session,
+    page_size: int,
+    cursor: Optional[Cursor] = None,
+    event_type: Optional[str] = None,
+    status: Optional[str] = None,
+    newest_first: bool = True,
+) -> EventPage:
+    """
+    Load one page of events with a keyset query on (created_at, id).
+
+    Events are returned as rows of EVENT_LIST_COLUMNS rather than full WebhookEvent objects.
+
+    The cost of a page does not depend on how deep it is or on the size of the table, as long as
+    the (created_at, id) indexes in naomi_streamlit.db.indexes exist.
+    """
+    query = select_event_list().where(*event_filters(event_type, status))
+    if cursor is not None:
+        query = query.where(after_cursor(cursor, newest_first))
+    if newest_first:
+        query = query.order_by(WebhookEvent.created_at.desc(), WebhookEvent.id.desc())
+    else:
+        query = query.order_by(WebhookEvent.created_at.asc(), WebhookEvent.id.asc())
+
+    events = list(session.execute(query.limit(page_size + 1)).all())
+    if len(events) <= page_size:
+        return EventPage(events, next_cursor=None)
+    events = events[:page_size]
+    return EventPage(events, next_cursor=(events[-1].created_at, events[-1].id))
+
+
+def fetch_event_changes(session, last_id: int, known_statuses: dict[int, str]) -> list:
+    """
+    Load events newer than last_id and known events whose status changed, in one query.
+
+    Both halves are primary key lookups, so polling without any change is a single indexed query
+    that returns no rows.
+    """
+    ids_by_status = defaultdict(list)
+    for event_id, status in known_statuses.items():
+        ids_by_status[status].append(event_id)
+    changed = [
+        and_(WebhookEvent.id.in_(event_ids), WebhookEvent.status != status)
+        for status, event_ids in ids_by_status.items()
+    ]
+    query = (
+        select_event_list()
+        .where(or_(WebhookEvent.id > last_id, *changed))
+        .order_by(WebhookEvent.id)
+    )
+    return list(session.execute(query).all())
+
+
+def distinct_values(session, column) -> list[str]:
+    return [value for value in session.scalars(select(column).distinct().order_by(column)) if value]
+
+
+def record_payload_sizes(session) -> int:
+    """
+    Record the payload size of every event newer than the last one recorded, in one statement.
+
+    Sizes are measured by the database, so payloads never leave it. Once every event has a size,
+    this is a primary key lookup and an empty range scan.
+    """
+    last_recorded = select(func.coalesce(func.max(EventPayloadSize.event_id), 0)).scalar_subquery()
+    new_events = select(
+        WebhookEvent.id, func.length(cast(WebhookEvent.payload, LargeBinary))
+    ).where(WebhookEvent.id > last_recorded)
+    query = insert(EventPayloadSize).from_select(["event_id", "size_bytes"], new_events)
+    return session.execute(query).rowcount
+
+
+def payload_sizes_pending(session) -> bool:
+    """Whether an event is newer than the last one with a recorded payload size."""
+    last_event = select(func.coalesce(func.max(WebhookEvent.id), 0)).scalar_subquery()
+    last_recorded = select(func.coalesce(func.max(EventPayloadSize.event_id), 0)).scalar_subquery()
+    return bool(session.scalar(select(last_event > last_recorded)))
+
+
+def load_payload(session, event_id: int) -> Optional[str]:
+    return session.scalar(select(WebhookEvent.payload).where(WebhookEvent.id == event_id))
+
+
+def load_payload_preview(session, event_id: int, max_chars: int) -> Optional[str]:
+    """Load only the first max_chars characters of a payload."""
+    query = select(func.substr(WebhookEvent.payload, 1, max_chars)).where(
+        WebhookEvent.id == event_id
+    )
+    return session.scalar(query)
+
+
+def delete_events(
+    session,
+    event_ids: Optional[list[int]] = None,
+    event_type: Optional[str] = None,
+    status: Optional[str] = None,
+    older_than: Optional[datetime] = None,
+) -> int:
+    """
+    Delete every event matching all of the given criteria with a single DELETE ... WHERE.
+
+    Returns how many events were deleted. Passing no criteria at all raises a ValueError rather
+    than emptying the table; an empty event_ids list deletes nothing. Recorded payload sizes of
+    the deleted events are deleted in the same transaction, since event ids can be reused.
+    """
+    if event_ids is None and not event_type and not status and older_than is None:
+        raise ValueError("Refusing to delete events without any criteria")
+    if event_ids is not None and not event_ids:
+        return 0
+    filters = event_filters(event_type, status)
+    if event_ids is not None:
+        filters.append(WebhookEvent.id.in_(event_ids))
+    if older_than is not None:
+        filters.append(WebhookEvent.created_at < older_than)
+    session.execute(
+        delete(EventPayloadSize)
+        .where(EventPayloadSize.event_id.in_(select(WebhookEvent.id).where(*filters)))
+        .execution_options(synchronize_session=False)
+    )
+    query = delete(WebhookEvent).where(*filters).execution_options(synchronize_session=False)
+    return session.execute(query).rowcount
+
+
+def set_event_status(session, event_ids: list[int], status: str) -> int:
+    """Set the status of the given events in one statement and return how many were updated."""
+    if not event_ids:
+        return 0
+    query = update(WebhookEvent).where(WebhookEvent.id.in_(event_ids)).values(status=status)
+    return session.execute(query).rowcount
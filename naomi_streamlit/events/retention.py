@@ -0,0 +1,70 @@
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from naomi_streamlit.config import (
+    EVENTS_RETENTION_DAYS,
+    EVENTS_RETENTION_INTERVAL_MINUTES,
+    EVENTS_RETENTION_STATUS,
+)
+from naomi_streamlit.events.queries import delete_events
+
+
+@dataclass
+class RetentionPolicy:
+    max_age: timedelta
+    status: Optional[str] = None
+
+
+def apply_retention(session, policy: RetentionPolicy, now: Optional[datetime] = None) -> int:
+    """Delete the events the policy has expired and return how many were deleted."""
+    # Webhook events are timestamped in naive UTC
+    now = now or datetime.utcnow()
+    return delete_events(session, status=policy.status, older_than=now - policy.max_age)
+
+
+class RetentionScheduler(threading.Thread):
+    """Daemon thread that applies a retention policy once at start and then on a fixed interval."""
+
+    def __init__(self, session_factory: sessionmaker, policy: RetentionPolicy, interval: float):
+        super().__init__(name="naomi-event-retention", daemon=True)
+        self.session_factory = session_factory
+        self.policy = policy
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run_once(self) -> int:
+        with self.session_factory() as session:
+            deleted = apply_retention(session, self.policy)
+            session.commit()
+        logging.info(f"Event retention deleted {deleted} events")
+        return deleted
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # Keep the schedule alive through transient failures such as a locked database
+                logging.exception("Event retention failed")
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_retention(session_factory: sessionmaker) -> Optional[RetentionScheduler]:
+    """Start the retention policy configured through NAOMI_EVENTS_RETENTION_*, if any."""
+    if EVENTS_RETENTION_DAYS <= 0:
+        return None
+    policy = RetentionPolicy(
+        max_age=timedelta(days=EVENTS_RETENTION_DAYS), status=EVENTS_RETENTION_STATUS or None
+    )
+    scheduler = RetentionScheduler(session_factory, policy, EVENTS_RETENTION_INTERVAL_MINUTES * 60)
+    scheduler.start()
+    logging.info(f"Started event retention with {policy}")
+    return scheduler
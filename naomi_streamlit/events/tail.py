@@ -0,0 +1,63 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from naomi_streamlit.events.queries import fetch_event_changes, fetch_event_page
+
+
+@dataclass
+class StatusChange:
+    event_id: int
+    old_status: str
+    new_status: str
+    seen_at: datetime
+
+
+@dataclass
+class EventTail:
+    """
+    The newest events of the live tail, kept up to date by polling for changes only.
+
+    Rows are kept by id, so newer events are appended and changed events are replaced in place.
+    """
+
+    max_rows: int
+    last_id: int = 0
+    rows: dict[int, object] = field(default_factory=dict)
+    changes: deque = field(default_factory=lambda: deque(maxlen=50))
+    polls: int = 0
+    empty_polls: int = 0
+
+    def apply(self, rows: list):
+        for row in rows:
+            previous = self.rows.get(row.id)
+            if previous is not None and previous.status != row.status:
+                self.changes.append(
+                    StatusChange(row.id, previous.status, row.status, datetime.now())
+                )
+            self.rows[row.id] = row
+            self.last_id = max(self.last_id, row.id)
+        for event_id in sorted(self.rows)[: -self.max_rows or None]:
+            del self.rows[event_id]
+
+    def known_statuses(self) -> dict[int, str]:
+        return {event_id: row.status for event_id, row in self.rows.items()}
+
+    def newest_first(self) -> list:
+        return [self.rows[event_id] for event_id in sorted(self.rows, reverse=True)]
+
+
+def start_tail(session, max_rows: int) -> EventTail:
+    tail = EventTail(max_rows)
+    tail.apply(fetch_event_page(session, max_rows).events)
+    return tail
+
+
+def poll_tail(session, tail: EventTail) -> int:
+    """Apply new and changed events to the tail and return how many rows were fetched."""
+    rows = fetch_event_changes(session, tail.last_id, tail.known_statuses())
+    tail.apply(rows)
+    tail.polls += 1
+    if not rows:
+        tail.empty_polls += 1
+    return len(rows)
@@ -16,6 +16,7 @@
 import streamlit as st
 
 from naomi_streamlit.chat.chat import draw_chat
+from naomi_streamlit.perf import phase, profile_rerun
 from naomi_streamlit.utils import handle_login
 
 
@@ -25,7 +26,10 @@ def run():
         page_icon="👋",
     )
 
-    if not handle_login():
-        exit(0)
+    with profile_rerun("home"):
+        with phase("handle_login"):
+            logged_in = handle_login()
+        if not logged_in:
+            exit(0)
 
-    draw_chat()
+        draw_chat()
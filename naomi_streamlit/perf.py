@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Optional
+
+import streamlit as st
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from naomi_streamlit.chat.streaming import StreamStats
+from naomi_streamlit.config import PERF_EXPORT_PATH, PERF_HISTORY, PERF_INSTRUMENTATION
+
+PERF_HISTORY_KEY = "perf_reruns"
+QUERY_START_KEY = "naomi_perf_query_start"
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+@dataclass
+class RerunProfile:
+    """Where the time of one script run went; times are in seconds."""
+
+    page: str
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    phase_calls: dict[str, int] = field(default_factory=dict)
+    sql_count: int = 0
+    sql_time: float = 0.0
+    # Writes include any wait for the SQLite write lock, up to the busy timeout
+    sql_write_count: int = 0
+    sql_write_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    # Estimated tokens of the history sent to the LLM, and those a summary stood in for
+    prompt_tokens: Optional[int] = None
+    tokens_saved: Optional[int] = None
+    # Messages left out of the history to fit the prompt budget
+    dropped_messages: Optional[int] = None
+
+    def add_phase(self, name: str, elapsed: float):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+        self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+# The profile of the script run executing in this thread, if instrumentation is on
+current_profile: ContextVar[Optional[RerunProfile]] = ContextVar("current_profile", default=None)
+
+_hooks_lock = threading.Lock()
+_hooks_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Only profiled statements are timed
+    if current_profile.get() is not None:
+        conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(QUERY_START_KEY)
+    # Statements already running when the hooks were installed have no start time
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    profile = current_profile.get()
+    if profile is not None:
+        profile.sql_count += 1
+        profile.sql_time += elapsed
+        if statement.lstrip()[:6].upper() in WRITE_STATEMENTS:
+            profile.sql_write_count += 1
+            profile.sql_write_time += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches the after hook, so drop its start time here
+    connection = context.connection
+    starts = None if connection is None else connection.info.get(QUERY_START_KEY)
+    if starts and context.execution_context is not None:
+        starts.pop()
+
+
+def install_sql_hooks():
+    """Time every statement of every engine, naomi_core's included; idempotent."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _hooks_installed = True
+
+
+@contextmanager
+def phase(name: str):
+    """Add the time spent in the block to the current rerun's profile, if there is one."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, time.perf_counter() - started)
+
+
+def record_stream(stats: StreamStats):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.time_to_first_token = stats.time_to_first_token
+        profile.tokens_per_second = stats.tokens_per_second
+
+
+def record_context(prompt_tokens: int, tokens_saved: int, dropped_messages: int = 0):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.prompt_tokens = prompt_tokens
+        profile.tokens_saved = tokens_saved
+        profile.dropped_messages = dropped_messages
+
+
+def export_jsonl(profiles: Iterable[RerunProfile]) -> str:
+    return "".join(profile.to_json() + "\n" for profile in profiles)
+
+
+@contextmanager
+def profile_rerun(page: str):
+    """
+    Profile one script run of a page when NAOMI_PERF_INSTRUMENTATION is on.
+
+    The sidebar panel is drawn first and shows the reruns before this one, so drawing it is not
+    part of the measurement.
+    """
+    if not PERF_INSTRUMENTATION:
+        yield None
+        return
+    install_sql_hooks()
+    history = st.session_state.setdefault(PERF_HISTORY_KEY, deque(maxlen=PERF_HISTORY))
+    draw_perf_panel(history)
+
+    profile = RerunProfile(page)
+    token = current_profile.set(profile)
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.duration = time.perf_counter() - started
+        current_profile.reset(token)
+        history.append(profile)
+        if PERF_EXPORT_PATH:
+            with open(PERF_EXPORT_PATH, "a") as f:
+                f.write(export_jsonl([profile]))
+
+
+def draw_perf_panel(history: deque):
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        if not history:
+            st.caption("Interact with the page to profile a rerun")
+            return
+        last: RerunProfile = history[-1]
+        col1, col2 = st.columns(2)
+        col1.metric("Last rerun", f"{last.duration * 1000:.0f} ms")
+        col2.metric("SQL", f"{last.sql_count} in {last.sql_time * 1000:.0f} ms")
+        if last.time_to_first_token is not None:
+            col1.metric("First token", f"{last.time_to_first_token * 1000:.0f} ms")
+            col2.metric("Tokens/s", f"{last.tokens_per_second:.1f}")
+        if last.prompt_tokens is not None:
+            col1.metric("Prompt tokens", last.prompt_tokens)
+            col2.metric("Tokens saved", last.tokens_saved)
+        st.dataframe(
+            [
+                {"phase": name, "ms": round(elapsed * 1000, 1), "calls": last.phase_calls[name]}
+                for name, elapsed in sorted(last.phases.items(), key=lambda item: -item[1])
+            ],
+            hide_index=True,
+        )
+        st.caption(f"{len(history)} reruns recorded")
+        st.download_button(
+            "⬇️ Export JSON lines",
+            export_jsonl(history),
+            file_name="naomi_perf.jsonl",
+            mime="application/jsonl",
+            key="perf_export",
+        )
@@ -3,13 +3,26 @@ import streamlit as st
 from naomi_core.db.agent import (
     AgentModel,
     AgentResponsibilityModel,
-    get_all_agents,
-    load_responsibilities_from_db,
 )
-from naomi_core.db.core import session_scope
+from naomi_streamlit.config import LAZY_FORMS_THRESHOLD
+from naomi_streamlit.db.agents import load_agents, load_responsibilities
+from naomi_streamlit.db.engine import session_scope
 
 
-def agent_settings_form(agent: AgentModel, session):
+def agent_toggle_key(agent: AgentModel) -> str:
+    return f"agent_open:{agent.name}"
+
+
+def responsibility_toggle_key(responsibility: AgentResponsibilityModel) -> str:
+    return f"resp_open:{responsibility.agent_name}:{responsibility.name}"
+
+
+def agent_settings_form(
+    agent: AgentModel,
+    responsibilities: list[AgentResponsibilityModel],
+    session,
+    lazy: bool = False,
+):
     st.header(f"{agent.name} Agent")
     if st.button("🗑️ Delete", key=f"{agent.name}_delete"):
         session.delete(agent)
@@ -22,11 +35,10 @@ def agent_settings_form(agent: AgentModel, session):
             session.add(agent)
             st.success(f"{agent.name} Agent settings saved")
 
-    responsibilities = load_responsibilities_from_db(agent, session)
     st.subheader(f"Responsibilities ({len(responsibilities)})")
     new_responsibility_form(agent, session)
     for responsibility in responsibilities:
-        responsibility_form(responsibility, session)
+        responsibility_form(responsibility, session, lazy)
 
 
 def new_responsibility_form(agent: AgentModel, session):
@@ -45,25 +57,50 @@ def new_responsibility_form(agent: AgentModel, session):
                 return responsibility
 
 
-def responsibility_form(responsibility: AgentResponsibilityModel, session):
-    with st.expander(str(responsibility.name), expanded=False):
-        with st.form(
-            key=f"{responsibility.name}_responsibility_settings", clear_on_submit=True, border=False
-        ):
-            description = st.text_area("Description", value=responsibility.description)
-            if st.form_submit_button("Save"):
-                responsibility.description = description  # type: ignore
-                session.add(responsibility)
-                st.success(f"{responsibility.name} Responsibility saved")
-        if st.button("🗑️ Delete", key=f"{responsibility.agent_name}_{responsibility.name}_delete"):
-            session.delete(responsibility)
-            session.commit()
-            st.success(f"'{responsibility.name}' Responsibility deleted")
-            st.rerun()
+def responsibility_form(responsibility: AgentResponsibilityModel, session, lazy: bool = False):
+    if not lazy:
+        with st.expander(str(responsibility.name), expanded=False):
+            responsibility_form_body(responsibility, session)
+        return
+
+    # An expander always builds its body, a toggle lets us skip it until it is opened
+    if st.toggle(str(responsibility.name), key=responsibility_toggle_key(responsibility)):
+        with st.container(border=True):
+            responsibility_form_body(responsibility, session)
+
+
+def responsibility_form_body(responsibility: AgentResponsibilityModel, session):
+    with st.form(
+        key=f"{responsibility.agent_name}_{responsibility.name}_responsibility_settings",
+        clear_on_submit=True,
+        border=False,
+    ):
+        description = st.text_area("Description", value=responsibility.description)
+        if st.form_submit_button("Save"):
+            responsibility.description = description  # type: ignore
+            session.add(responsibility)
+            st.success(f"{responsibility.name} Responsibility saved")
+    if st.button("🗑️ Delete", key=f"{responsibility.agent_name}_{responsibility.name}_delete"):
+        session.delete(responsibility)
+        session.commit()
+        st.success(f"'{responsibility.name}' Responsibility deleted")
+        st.rerun()
 
 
 def show_agents_tab():
+    name_filter = st.text_input("🔎 Filter agents", key="agent_filter")
     with session_scope() as session:
-        for agent in get_all_agents(session):
-            agent_settings_form(agent, session)
+        agents = load_agents(session, name_filter)
+        lazy = len(agents) > LAZY_FORMS_THRESHOLD
+        opened = [
+            agent.name
+            for agent in agents
+            if not lazy or st.session_state.get(agent_toggle_key(agent), False)
+        ]
+        responsibilities = load_responsibilities(session, opened)
+
+        for agent in agents:
+            if lazy and not st.toggle(f"🤖 {agent.name}", key=agent_toggle_key(agent)):
+                continue
+            agent_settings_form(agent, responsibilities[agent.name], session, lazy)
             st.divider()
@@ -1,5 +1,6 @@
 import streamlit as st
 
+from naomi_streamlit.perf import phase, profile_rerun
 from naomi_streamlit.settings.agent_settings import show_agents_tab
 from naomi_streamlit.settings.db_settings import show_database_tab
 
@@ -11,13 +12,14 @@ def show_settings():
     )
     st.title("Settings")
 
-    if st.button("🔄 Refresh", key="refresh"):
-        st.rerun()
+    with profile_rerun("settings"):
+        if st.button("🔄 Refresh", key="refresh"):
+            st.rerun()
 
-    (agents_tab, db_tab) = st.tabs(["🤖 Agents", "💿 Database"])
+        (agents_tab, db_tab) = st.tabs(["🤖 Agents", "💿 Database"])
 
-    with db_tab:
-        show_database_tab()
+        with db_tab, phase("show_database_tab"):
+            show_database_tab()
 
-    with agents_tab:
-        show_agents_tab()
+        with agents_tab, phase("show_agents_tab"):
+            show_agents_tab()
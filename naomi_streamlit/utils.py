@@ -30,3 +30,8 @@ def handle_login():
 
     st.stop()
     return False
+
+
+def current_user_id() -> str:
+    """Identifier of the logged-in user, used to apply per-user limits."""
+    return str(st.experimental_user.get("email") or st.experimental_user.get("name") or "anonymous")
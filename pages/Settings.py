@@ -1,4 +1,6 @@
+from naomi_streamlit.bootstrap import bootstrap
 from naomi_streamlit.settings.settings_tabs import show_settings
 
 
+bootstrap()
 show_settings()
@@ -0,0 +1,6 @@
+from naomi_streamlit.bootstrap import bootstrap
+from naomi_streamlit.diagnostics import show_diagnostics
+
+
+bootstrap()
+show_diagnostics()
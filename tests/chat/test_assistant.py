@@ -1,11 +1,14 @@
+from unittest.mock import patch
+
 from streamlit.testing.v1 import AppTest
 
 
 def show_llm_response_wrapper():  # pragma: no cover
+    import streamlit as st
     from naomi_streamlit.chat.assistant import show_llm_response
 
     chunks = iter(["chunk1", "chunk2", "chunk3"])
-    return show_llm_response(chunks, "Test Spinner")
+    st.session_state["_response_"] = show_llm_response(chunks, "Test Spinner")
 
 
 def show_llm_generation_wrapper():  # pragma: no cover
@@ -52,6 +55,8 @@ def test_show_llm_response():
 
     assert not at.exception
     assert "chunk1chunk2chunk3" in at.markdown[0].value
+    assert at.session_state["_response_"] == "chunk1chunk2chunk3"
+    assert at.session_state["llm_stream_stats"].tokens == 3
 
 
 def test_show_llm_generation():
@@ -149,3 +154,40 @@ def test_draw_draft_assistant_message_regenerate_button(mock_llm_client):
     assert at.markdown[0].value
     assert "draft" in at.markdown[0].value
     assert "Generated" in at.markdown[1].value
+
+
+def regenerate_branch_wrapper():  # pragma: no cover
+    from unittest.mock import MagicMock
+
+    import streamlit as st
+    from naomi_streamlit.chat.assistant import draw_assistant_message
+    from tests.data import message_model_2
+
+    st.session_state["_runs_"] = st.session_state.get("_runs_", 0) + 1
+    session = MagicMock()
+    try:
+        draw_assistant_message(message_model_2(), session)
+    finally:
+        st.session_state["_commits_"] = st.session_state.get("_commits_", 0) + (
+            session.commit.call_count
+        )
+
+
+@patch("naomi_streamlit.chat.assistant.BRANCHING", True)
+@patch("naomi_streamlit.chat.assistant.sync_branch")
+@patch("naomi_streamlit.chat.assistant.record_activity")
+@patch("naomi_streamlit.chat.assistant.generate_response")
+@patch("naomi_streamlit.chat.assistant.branch_from")
+def test_regenerate_branch_commits_and_reruns(
+    mock_branch_from, mock_generate_response, mock_record_activity, mock_sync_branch
+):
+    at = AppTest.from_function(regenerate_branch_wrapper)
+    at.run()
+    at.button(key="regenerate_2").click().run()
+
+    assert not at.exception
+    mock_branch_from.assert_called_once()
+    mock_generate_response.assert_called_once()
+    assert at.session_state["_commits_"] == 1
+    # The click's run and the rerun that draws the new branch
+    assert at.session_state["_runs_"] == 3
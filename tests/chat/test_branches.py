@@ -0,0 +1,204 @@
+from sqlalchemy import event, select
+
+from naomi_core.db.chat import Message, MessageModel, add_message_to_db, fetch_messages
+from naomi_streamlit.chat.branches import (
+    branch_from,
+    branch_path,
+    delete_message,
+    fetch_siblings,
+    switch_branch,
+    sync_branch,
+)
+from naomi_streamlit.chat.context import build_context
+from naomi_streamlit.chat.conversations import refresh_conversation
+from naomi_streamlit.chat.tombstones import TombstoneCompactor
+from naomi_streamlit.chat.window import fetch_message_window
+from naomi_streamlit.db.models import InactiveMessageRange, MessageParent, MessageTombstone
+from tests.conftest import TestingSessionLocal, in_memory_session
+
+
+def add(session, content: str, conversation_id: int = 1) -> int:
+    add_message_to_db(Message(content=content, role="user"), session, conversation_id)
+    session.flush()
+    return session.scalar(
+        select(MessageModel.id)
+        .where(MessageModel.conversation_id == conversation_id)
+        .order_by(MessageModel.id.desc())
+        .limit(1)
+    )
+
+
+def parents(session, conversation_id: int = 1) -> dict[int, int]:
+    query = select(MessageParent.id, MessageParent.parent_id).where(
+        MessageParent.conversation_id == conversation_id
+    )
+    return dict(session.execute(query).all())
+
+
+def window_ids(session, conversation_id: int = 1) -> list[int]:
+    return [m.id for m in fetch_message_window(session, conversation_id, 20).messages]
+
+
+def branched_conversation(session):
+    """1 -> 2 -> 3 -> 4, then 3 regenerated as 5 and answered with 6."""
+    for i in range(1, 5):
+        add(session, f"Message {i}")
+    sync_branch(session, 1)
+    branch_from(session, session.get(MessageModel, (1, 3)))
+    add(session, "Message 5")
+    add(session, "Message 6")
+    sync_branch(session, 1)
+
+
+def test_sync_branch_chains_new_messages():
+    with in_memory_session() as session:
+        for i in range(1, 4):
+            add(session, f"Message {i}")
+
+        sync_branch(session, 1)
+        sync_branch(session, 1)
+        assert parents(session) == {1: None, 2: 1, 3: 2}
+
+        add(session, "Message 4")
+        sync_branch(session, 1)
+        assert parents(session)[4] == 3
+        assert branch_path(session, 1, 4) == [1, 2, 3, 4]
+
+
+def test_branch_from_keeps_original():
+    with in_memory_session() as session:
+        branched_conversation(session)
+
+        assert parents(session) == {1: None, 2: 1, 3: 2, 4: 3, 5: 2, 6: 5}
+        assert window_ids(session) == [1, 2, 5, 6]
+        assert fetch_message_window(session, 1, 20).siblings == {5: [3, 5]}
+        assert refresh_conversation(session, 1).message_count == 4
+
+        switch_branch(session, 1, 3)
+        assert window_ids(session) == [1, 2, 3, 4]
+        assert fetch_message_window(session, 1, 20).siblings == {3: [3, 5]}
+
+        # New messages continue the active branch
+        add(session, "Message 7")
+        sync_branch(session, 1)
+        assert parents(session)[7] == 4
+        assert window_ids(session) == [1, 2, 3, 4, 7]
+
+        switch_branch(session, 1, 5)
+        assert window_ids(session) == [1, 2, 5, 6]
+
+
+def inactive_ranges(session, conversation_id: int = 1) -> list[tuple[int, int]]:
+    query = select(InactiveMessageRange.from_id, InactiveMessageRange.to_id).where(
+        InactiveMessageRange.conversation_id == conversation_id
+    )
+    return sorted(session.execute(query).all())
+
+
+def test_switch_branch_rewrites_ranges_after_fork():
+    with in_memory_session() as session:
+        branched_conversation(session)
+        branch_from(session, session.get(MessageModel, (1, 6)))
+        add(session, "Message 7")
+        sync_branch(session, 1)
+        assert parents(session)[7] == 5
+        assert inactive_ranges(session) == [(3, 4), (6, 6)]
+        statements = []
+
+        def record(*args):
+            statements.append(args[2])
+
+        event.listen(session.get_bind(), "before_cursor_execute", record)
+        try:
+            switch_branch(session, 1, 6)
+        finally:
+            event.remove(session.get_bind(), "before_cursor_execute", record)
+
+        assert window_ids(session) == [1, 2, 5, 6]
+        assert inactive_ranges(session) == [(3, 4), (7, 7)]
+        # Only the ranges after the fork at 5 are deleted
+        deletes = [s for s in statements if s.lstrip().upper().startswith("DELETE")]
+        assert len(deletes) == 1 and "from_id >" in deletes[0]
+
+        switch_branch(session, 1, 3)
+        assert window_ids(session) == [1, 2, 3, 4]
+        assert inactive_ranges(session) == [(5, 7)]
+
+
+def test_branch_operations_return_visible_changes():
+    with in_memory_session() as session:
+        for i in range(1, 5):
+            add(session, f"Message {i}")
+
+        assert branch_from(session, session.get(MessageModel, (1, 3))) == -2
+        add(session, "Message 5")
+        add(session, "Message 6")
+        assert switch_branch(session, 1, 3) == 0
+        assert delete_message(session, session.get(MessageModel, (1, 4))) == 1
+        assert switch_branch(session, 1, 5) == 1
+        assert window_ids(session) == [1, 2, 5, 6]
+        assert refresh_conversation(session, 1).message_count == 4
+
+
+def test_branch_from_root():
+    with in_memory_session() as session:
+        add(session, "Message 1")
+        add(session, "Message 2")
+        sync_branch(session, 1)
+
+        branch_from(session, session.get(MessageModel, (1, 1)))
+        assert window_ids(session) == []
+        add(session, "Message 3")
+        sync_branch(session, 1)
+
+        assert parents(session)[3] is None
+        assert window_ids(session) == [3]
+        assert fetch_siblings(session, 1, [3]) == {3: [1, 3]}
+
+
+def test_history_follows_active_branch():
+    with in_memory_session() as session:
+        branched_conversation(session)
+        session.commit()
+
+        history = build_context(session, 1).messages
+        assert history == [m.payload for m in fetch_messages(session, 1) if m.id in (1, 2, 5, 6)]
+
+
+def test_delete_message_without_branches_truncates():
+    with in_memory_session() as session:
+        for i in range(1, 6):
+            add(session, f"Message {i}")
+
+        delete_message(session, session.get(MessageModel, (1, 3)))
+
+        tombstones = session.execute(select(MessageTombstone.from_id, MessageTombstone.to_id))
+        assert tombstones.all() == [(3, 5)]
+        assert window_ids(session) == [1, 2]
+
+
+def test_delete_message_keeps_other_branches():
+    with in_memory_session() as session:
+        branched_conversation(session)
+        add(session, "Message 7")
+        sync_branch(session, 1)
+
+        delete_message(session, session.get(MessageModel, (1, 6)))
+        assert window_ids(session) == [1, 2, 5]
+        session.commit()
+
+        TombstoneCompactor(TestingSessionLocal, 60, 10).run_once()
+        session.expire_all()
+        assert sorted(parents(session)) == [1, 2, 3, 4, 5]
+        ranges = session.execute(select(InactiveMessageRange.from_id, InactiveMessageRange.to_id))
+        assert ranges.all() == [(3, 4)]
+
+        switch_branch(session, 1, 3)
+        assert window_ids(session) == [1, 2, 3, 4]
+
+        # Ids freed by the compaction are reused and stay visible
+        switch_branch(session, 1, 5)
+        assert add(session, "Message 6 again") == 6
+        sync_branch(session, 1)
+        assert parents(session)[6] == 5
+        assert window_ids(session) == [1, 2, 5, 6]
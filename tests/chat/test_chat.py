@@ -1,8 +1,11 @@
 from streamlit.testing.v1 import AppTest
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 from naomi_core.db.chat import DEFAULT_CONVERSATION_ID, Message
 from tests.matchers import EqualsMessageModel, InstanceOf
+from naomi_streamlit.chat.window import MessageWindow
+from naomi_streamlit.db.models import ConversationSummary
 from tests.data import message_model_1, message_model_2, message_model_3
 
 
@@ -42,8 +45,10 @@ def draw_chat_wrapper():  # pragma: no cover
     draw_chat()
 
 
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.record_activity")
 @patch("naomi_streamlit.chat.chat.session_scope")
-@patch("naomi_streamlit.chat.chat.fetch_messages")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
 @patch("naomi_streamlit.chat.chat.add_message_to_db")
 @patch("naomi_streamlit.chat.chat.draw_draft_assistant_message")
 @patch("naomi_streamlit.chat.chat.draw_assistant_message")
@@ -53,11 +58,15 @@ def test_draw_chat(
     mock_draw_assistant_message,
     mock_draw_draft_assistant_message,
     mock_add_message_to_db,
-    mock_fetch_messages,
+    mock_fetch_message_window,
     mock_session_scope,
+    mock_record_activity,
+    mock_list_conversations,
 ):
     mock_session_scope.return_value.__enter__.return_value = None
-    mock_fetch_messages.return_value = [message_model_1(), message_model_2()]
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_1(), message_model_2()], has_older=False
+    )
 
     at = AppTest.from_function(draw_chat_wrapper)
     at.run()
@@ -78,8 +87,10 @@ def test_draw_chat(
     assert not mock_draw_draft_assistant_message.called
 
 
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.record_activity")
 @patch("naomi_streamlit.chat.chat.session_scope")
-@patch("naomi_streamlit.chat.chat.fetch_messages")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
 @patch("naomi_streamlit.chat.chat.add_message_to_db")
 @patch("naomi_streamlit.chat.chat.draw_draft_assistant_message")
 @patch("naomi_streamlit.chat.chat.draw_assistant_message")
@@ -89,16 +100,23 @@ def test_draw_chat_user_input(
     mock_draw_assistant_message,
     mock_draw_draft_assistant_message,
     mock_add_message_to_db,
-    mock_fetch_messages,
+    mock_fetch_message_window,
     mock_session_scope,
+    mock_record_activity,
+    mock_list_conversations,
 ):
-    mock_session_scope.return_value.__enter__.return_value = None
-    mock_fetch_messages.return_value = [message_model_1(), message_model_2()]
+    session = MagicMock()
+    mock_session_scope.return_value.__enter__.return_value = session
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_1(), message_model_2()], has_older=False
+    )
 
     def on_add_user_message(message: Message, _, conversation_id):
         assert message["content"] == "Do you know any jokes?"
         assert conversation_id == DEFAULT_CONVERSATION_ID
-        mock_fetch_messages.return_value = [message_model_1(), message_model_2(), message_model_3()]
+        mock_fetch_message_window.return_value = MessageWindow(
+            [message_model_1(), message_model_2(), message_model_3()], has_older=False
+        )
 
     mock_add_message_to_db.side_effect = on_add_user_message
 
@@ -129,3 +147,221 @@ def test_draw_chat_user_input(
 
     mock_add_message_to_db.assert_called_once()
     mock_draw_draft_assistant_message.assert_called_once()
+    mock_record_activity.assert_called_once_with(
+        session, DEFAULT_CONVERSATION_ID, 1, title="Do you know any jokes?"
+    )
+    # Committed before st.rerun() ends the script
+    session.commit.assert_called_once()
+
+
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.record_activity")
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+@patch("naomi_streamlit.chat.chat.find_older_page_start")
+@patch("naomi_streamlit.chat.chat.draw_assistant_message")
+@patch("naomi_streamlit.chat.chat.draw_user_message")
+def test_draw_chat_load_older(
+    mock_draw_user_message,
+    mock_draw_assistant_message,
+    mock_find_older_page_start,
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_record_activity,
+    mock_list_conversations,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_2(), message_model_3()], has_older=True
+    )
+    mock_find_older_page_start.return_value = 1
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert at.button[0].key == "load_older"
+    assert mock_fetch_message_window.call_args.args[3] is None
+
+    at.button[0].click().run()
+
+    assert not at.exception
+    assert at.session_state["chat_window_start_id"] == 1
+    mock_find_older_page_start.assert_called_once_with(None, DEFAULT_CONVERSATION_ID, 2, 50)
+    assert mock_fetch_message_window.call_args.args[3] == 1
+
+
+def conversation_summaries() -> list[ConversationSummary]:
+    return [
+        ConversationSummary(
+            conversation_id=2,
+            owner="user",
+            title="Newer",
+            message_count=4,
+            last_activity_at=datetime(2025, 1, 2, 9, 30),
+        ),
+        ConversationSummary(
+            conversation_id=1, message_count=10, last_activity_at=datetime(2025, 1, 1)
+        ),
+    ]
+
+
+@patch("naomi_streamlit.chat.chat.list_conversations")
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+@patch("naomi_streamlit.chat.chat.draw_assistant_message")
+@patch("naomi_streamlit.chat.chat.draw_user_message")
+def test_draw_chat_switches_conversations(
+    mock_draw_user_message,
+    mock_draw_assistant_message,
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_list_conversations,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow([message_model_1()], has_older=False)
+    mock_list_conversations.return_value = conversation_summaries()
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+
+    assert not at.exception
+    # The most recently active conversation is opened first
+    radio = at.sidebar.radio[0]
+    assert radio.options == ["Newer", "Conversation 1"]
+    assert radio.value == 2
+    assert mock_fetch_message_window.call_args.args[1] == 2
+
+    at.session_state["chat_window_start_id"] = 7
+    radio.set_value(1).run()
+
+    assert not at.exception
+    assert mock_fetch_message_window.call_args.args[1] == 1
+    # Switching starts at the newest messages of the other conversation
+    assert mock_fetch_message_window.call_args.args[3] is None
+    assert "chat_window_start_id" not in at.session_state
+
+
+@patch("naomi_streamlit.chat.chat.create_conversation", return_value=3)
+@patch("naomi_streamlit.chat.chat.list_conversations")
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+def test_draw_chat_new_conversation(
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_list_conversations,
+    mock_create_conversation,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow([], has_older=False)
+    mock_list_conversations.return_value = conversation_summaries()
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+    at.sidebar.button(key="new_conversation").click().run()
+
+    assert not at.exception
+    mock_create_conversation.assert_called_once()
+    assert at.session_state["conversation_id"] == 3
+    assert at.sidebar.radio[0].options == ["Conversation 3", "Newer", "Conversation 1"]
+    assert mock_fetch_message_window.call_args.args[1] == 3
+
+
+@patch("naomi_streamlit.chat.chat.switch_branch")
+@patch("naomi_streamlit.chat.chat.record_activity")
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+@patch("naomi_streamlit.chat.chat.draw_assistant_message")
+@patch("naomi_streamlit.chat.chat.draw_user_message")
+def test_draw_chat_switches_branches(
+    mock_draw_user_message,
+    mock_draw_assistant_message,
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_list_conversations,
+    mock_record_activity,
+    mock_switch_branch,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_1(), message_model_2()], has_older=False, siblings={2: [2, 5, 9]}
+    )
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert at.caption[0].value == "1 / 3"
+    assert at.button(key="branch_previous_2").disabled
+    assert not at.button(key="branch_next_2").disabled
+
+    at.button(key="branch_next_2").click().run()
+
+    assert not at.exception
+    mock_switch_branch.assert_called_once_with(None, DEFAULT_CONVERSATION_ID, 5)
+    mock_record_activity.assert_called_once_with(
+        None, DEFAULT_CONVERSATION_ID, mock_switch_branch.return_value
+    )
+
+
+@patch("naomi_streamlit.chat.chat.CHAT_LIVE_MESSAGES", 1)
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+@patch("naomi_streamlit.chat.chat.draw_assistant_message")
+@patch("naomi_streamlit.chat.chat.draw_user_message")
+def test_draw_chat_switches_branches_in_history(
+    mock_draw_user_message,
+    mock_draw_assistant_message,
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_list_conversations,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_1(), message_model_2()], has_older=False, siblings={1: [1, 4]}
+    )
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+
+    assert not at.exception
+    # Message 1 is drawn as history, its switcher still follows it
+    assert not mock_draw_user_message.called
+    assert "Hello" in at.markdown[0].value
+    assert at.caption[0].value == "1 / 2"
+    assert not at.button(key="branch_next_1").disabled
+
+
+@patch("naomi_streamlit.chat.chat.CHAT_LIVE_MESSAGES", 1)
+@patch("naomi_streamlit.chat.chat.list_conversations", return_value=[])
+@patch("naomi_streamlit.chat.chat.session_scope")
+@patch("naomi_streamlit.chat.chat.fetch_message_window")
+@patch("naomi_streamlit.chat.chat.draw_assistant_message")
+@patch("naomi_streamlit.chat.chat.draw_user_message")
+def test_draw_chat_history_controls(
+    mock_draw_user_message,
+    mock_draw_assistant_message,
+    mock_fetch_message_window,
+    mock_session_scope,
+    mock_list_conversations,
+):
+    mock_session_scope.return_value.__enter__.return_value = None
+    mock_fetch_message_window.return_value = MessageWindow(
+        [message_model_1(), message_model_2()], has_older=False, siblings={}
+    )
+
+    at = AppTest.from_function(draw_chat_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert not mock_draw_user_message.called
+    assert at.toggle[0].label == "Show controls for messages 1–1"
+
+    at.toggle[0].set_value(True).run()
+
+    assert not at.exception
+    # The history block is drawn with the controls of a live message
+    mock_draw_user_message.assert_called_once()
+    assert mock_draw_user_message.call_args.args[0].id == 1
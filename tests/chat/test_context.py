@@ -0,0 +1,227 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import insert, select
+
+from naomi_core.db.chat import Message, MessageModel, fetch_messages
+from naomi_streamlit.chat import context
+from naomi_streamlit.chat.branches import branch_from, sync_branch
+from naomi_streamlit.chat.context import (
+    Summarizer,
+    build_context,
+    context_stats,
+    estimate_tokens,
+    latest_summary,
+    llm_summarize,
+    start_summarizer,
+)
+from naomi_streamlit.chat.tombstones import TombstoneCompactor, add_tombstone
+from naomi_streamlit.db.models import SummarySize, summaries
+from tests.conftest import TestingSessionLocal, add_messages, in_memory_session
+
+
+def padded(i: int) -> str:
+    return f"{i}".ljust(40, ".")
+
+
+def message_tokens() -> int:
+    return estimate_tokens(Message(content=padded(1), role="user").to_json())
+
+
+def add_summary(session, until_id: int, content: str, source_tokens: int = 0):
+    session.execute(
+        insert(summaries).values(conversation_id=1, summary_until_id=until_id, content=content)
+    )
+    if source_tokens:
+        session.add(
+            SummarySize(
+                conversation_id=1,
+                summary_until_id=until_id,
+                source_tokens=source_tokens,
+                summary_tokens=estimate_tokens(content),
+            )
+        )
+    session.commit()
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_latest_summary_on_active_branch():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        add_summary(session, 2, "Up to 2")
+        add_summary(session, 5, "Up to 5", source_tokens=100)
+
+        summary = latest_summary(session, 1)
+        assert (summary.until_id, summary.content) == (5, "Up to 5")
+        assert summary.tokens_saved == 100 - estimate_tokens("Up to 5")
+
+        add_tombstone(session, 1, 4, 6)
+        assert latest_summary(session, 1).content == "Up to 2"
+        assert latest_summary(session, 1).tokens_saved == 0
+        assert latest_summary(session, 2) is None
+
+
+def test_build_context_sends_summary_and_tail():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        add_summary(session, 4, "Earlier things", source_tokens=200)
+        before = context_stats.snapshot()
+
+        prompt = build_context(session, 1)
+
+        assert prompt.messages[0]["role"] == "system"
+        assert "Earlier things" in prompt.messages[0]["content"]
+        assert [m["content"][0] for m in prompt.messages[1:]] == ["5", "6"]
+        # The summary is not a message of the conversation
+        assert [m.id for m in fetch_messages(session, 1)] == list(range(1, 7))
+        assert context_stats.snapshot()["requests"] == before["requests"]
+
+        prompt.record()
+        after = context_stats.snapshot()
+        assert after["requests"] == before["requests"] + 1
+        assert after["summarized_requests"] == before["summarized_requests"] + 1
+        saved = 200 - estimate_tokens("Earlier things")
+        assert after["tokens_saved"] == before["tokens_saved"] + saved
+
+
+def test_build_context_honors_tombstones():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        add_summary(session, 2, "Earlier things")
+        add_tombstone(session, 1, 5, 6)
+        session.commit()
+
+        prompt = build_context(session, 1)
+
+        assert [m["content"][0] for m in prompt.messages[1:]] == ["3", "4"]
+
+
+def test_build_context_before_message():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        add_summary(session, 2, "Up to 2")
+        add_summary(session, 5, "Up to 5")
+
+        prompt = build_context(session, 1, before_id=5)
+
+        # The summary ending at the message itself covers its old content
+        assert "Up to 2" in prompt.messages[0]["content"]
+        assert [m["content"][0] for m in prompt.messages[1:]] == ["3", "4"]
+
+
+@patch("naomi_streamlit.chat.context.request_summary")
+def test_build_context_requests_summary_over_budget(mock_request_summary):
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+
+        with patch.object(context, "CONTEXT_TOKEN_BUDGET", 1_000):
+            build_context(session, 1).record()
+        mock_request_summary.assert_not_called()
+
+        with patch.object(context, "CONTEXT_TOKEN_BUDGET", 20):
+            prompt = build_context(session, 1)
+            assert len(prompt.messages) == 6
+            prompt.record()
+        mock_request_summary.assert_called_once_with(1)
+
+
+def test_build_context_packs_prompt_budget():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        add_summary(session, 2, "Earlier things")
+        size = message_tokens()
+        budget = estimate_tokens("Earlier things") + 3 * size
+
+        with patch.object(context, "PROMPT_TOKEN_BUDGET", budget):
+            # Packing is off by default
+            assert len(build_context(session, 1).messages) == 1 + 4
+            with patch.object(context, "PROMPT_PACKING", True):
+                prompt = build_context(session, 1)
+
+        # The summary and the newest messages that fit
+        assert [m["content"][0] for m in prompt.messages[1:]] == ["4", "5", "6"]
+        prompt.record()
+        packing = context_stats.snapshot()["last_packing"]
+        assert (packing["history_messages"], packing["dropped_messages"]) == (4, 1)
+        assert packing["prompt_tokens"] == budget
+
+
+def test_summarizer_folds_old_messages():
+    summarize = MagicMock(side_effect=["First summary", "Second summary"])
+    size = message_tokens()
+    # 6 messages are over budget and the newest 2 are kept
+    summarizer = Summarizer(TestingSessionLocal, 5 * size, 2 * size, summarize=summarize)
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+
+        assert summarizer.run_once(1) == 4
+        previous, messages = summarize.call_args.args
+        assert previous is None
+        assert [m["content"][0] for m in messages] == ["1", "2", "3", "4"]
+
+        summary = latest_summary(session, 1)
+        assert (summary.until_id, summary.content) == (4, "First summary")
+        assert summary.source_tokens == 4 * size
+
+        # Under budget again
+        assert summarizer.run_once(1) is None
+
+        add_messages(session, 1, 5, start=7, content=padded)
+        assert summarizer.run_once(1) == 9
+        assert summarize.call_args.args[0] == "First summary"
+        assert latest_summary(session, 1).source_tokens == 9 * size
+
+
+def test_summaries_follow_branches_and_compaction():
+    size = message_tokens()
+    summarizer = Summarizer(
+        TestingSessionLocal, 5 * size, 2 * size, summarize=lambda previous, m: "Summary"
+    )
+    with in_memory_session() as session:
+        add_messages(session, 1, 6, content=padded)
+        sync_branch(session, 1)
+        assert summarizer.run_once(1) == 4
+
+        branch_from(session, session.get(MessageModel, (1, 3)))
+        assert latest_summary(session, 1) is None
+
+        add_tombstone(session, 1, 3, 6)
+        session.commit()
+        TombstoneCompactor(TestingSessionLocal, 60, 10).run_once()
+        assert session.execute(select(summaries)).all() == []
+        assert session.scalars(select(SummarySize)).all() == []
+
+
+def test_llm_summarize(mock_llm_client):
+    mock_llm_client.return_value.run.return_value = iter(["Sum", "mary"])
+
+    summary = llm_summarize("Before", [Message(content="Hello", role="user")])
+
+    assert summary == "Summary"
+    assert mock_llm_client.return_value.run.call_args.kwargs["messages"][1:] == [
+        {"role": "system", "content": "Summary so far:\nBefore"},
+        {"role": "user", "content": "Hello"},
+    ]
+
+
+def test_start_summarizer_disabled():
+    assert start_summarizer(MagicMock()) is None
+    with patch.object(context, "CONTEXT_SUMMARIES", True), patch.object(
+        context, "CONTEXT_TOKEN_BUDGET", 0
+    ):
+        assert start_summarizer(MagicMock()) is None
+
+
+def test_start_summarizer():
+    with patch.object(context, "CONTEXT_SUMMARIES", True), patch.object(context, "_summarizer"):
+        summarizer = start_summarizer(TestingSessionLocal)
+        try:
+            assert summarizer.is_alive()
+            assert context._summarizer is summarizer
+        finally:
+            summarizer.stop()
+            summarizer.join(5)
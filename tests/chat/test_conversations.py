@@ -0,0 +1,148 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from naomi_core.db.chat import MessageModel
+from naomi_streamlit.chat.conversations import (
+    backfill_conversations,
+    conversation_caption,
+    conversation_title,
+    create_conversation,
+    list_conversations,
+    record_activity,
+    refresh_conversation,
+)
+from naomi_streamlit.db.models import ConversationSummary
+from tests.conftest import add_messages, in_memory_session
+
+
+def test_create_conversation_after_existing_messages():
+    with in_memory_session() as session:
+        add_messages(session, 4, 2)
+
+        conversation_id = create_conversation(session, "alice", now=datetime(2025, 1, 1))
+        assert conversation_id == 5
+        assert create_conversation(session, "alice") == 6
+
+        summary = session.get(ConversationSummary, 5)
+        assert summary.owner == "alice"
+        assert summary.message_count == 0
+        assert conversation_title(summary) == "Conversation 5"
+
+
+def test_create_conversation_retries_taken_id():
+    with in_memory_session() as session:
+        session.add(ConversationSummary(conversation_id=5, owner="bob"))
+        session.flush()
+
+        # The first maxima were read before another session took 5
+        with patch.object(session, "scalar", side_effect=[4, 0, 5, 0]):
+            assert create_conversation(session, "alice") == 6
+
+        assert session.get(ConversationSummary, 5).owner == "bob"
+        assert session.get(ConversationSummary, 6).owner == "alice"
+
+
+def test_record_activity_updates_summary_in_place():
+    with in_memory_session() as session:
+        conversation_id = create_conversation(session, "alice")
+        add_messages(session, conversation_id, 2)
+
+        record_activity(session, conversation_id, 2, title="Hello", now=datetime(2025, 1, 2))
+        summary = session.get(ConversationSummary, conversation_id)
+        assert (summary.message_count, summary.last_message_id) == (2, 2)
+        assert (summary.title, summary.last_activity_at) == ("Hello", datetime(2025, 1, 2))
+
+        record_activity(session, conversation_id, -1, title="Goodbye")
+        assert (summary.message_count, summary.last_message_id) == (1, 2)
+        assert summary.title == "Hello"
+
+
+def test_record_activity_without_summary_counts_once():
+    with in_memory_session() as session:
+        add_messages(session, 1, 3)
+
+        record_activity(session, 1, 1)
+
+        summary = session.get(ConversationSummary, 1)
+        assert (summary.owner, summary.message_count) == (None, 3)
+
+
+def test_refresh_conversation_counts_and_titles():
+    with in_memory_session() as session:
+        conversation_id = create_conversation(session, "alice")
+        add_messages(
+            session, conversation_id, 3, content=lambda i: "Tell me about the weather " * 5 + str(i)
+        )
+
+        summary = refresh_conversation(session, conversation_id, now=datetime(2025, 1, 2, 9, 30))
+
+        assert summary.message_count == 3
+        assert summary.last_message_id == 3
+        assert summary.owner == "alice"
+        assert summary.title == ("Tell me about the weather " * 5)[:60]
+        assert conversation_caption(summary) == "3 messages · Jan 02 09:30"
+
+        session.execute(MessageModel.__table__.delete().where(MessageModel.id > 1))
+        summary = refresh_conversation(session, conversation_id)
+        assert summary.message_count == 1
+        assert summary.last_message_id == 1
+
+
+def test_refresh_conversation_without_summary():
+    with in_memory_session() as session:
+        add_messages(session, 1, 2)
+
+        summary = refresh_conversation(session, 1)
+
+        assert summary.owner is None
+        assert summary.message_count == 2
+        assert summary.title == "Message 1"
+
+
+@pytest.mark.parametrize("owner, expected", [("alice", [3, 1, 2]), ("bob", [4, 1])])
+def test_list_conversations_newest_first(owner, expected):
+    with in_memory_session() as session:
+        for conversation_id, conversation_owner, day in (
+            (1, None, 2),
+            (2, "alice", 1),
+            (3, "alice", 3),
+            (4, "bob", 4),
+        ):
+            session.add(
+                ConversationSummary(
+                    conversation_id=conversation_id,
+                    owner=conversation_owner,
+                    last_activity_at=datetime(2025, 1, day),
+                )
+            )
+        session.commit()
+
+        conversations = list_conversations(session, owner, limit=10)
+        assert [c.conversation_id for c in conversations] == expected
+        assert len(list_conversations(session, owner, limit=1)) == 1
+
+
+def test_backfill_conversations():
+    with in_memory_session() as session:
+        add_messages(session, 1, 5)
+        add_messages(session, 2, 2)
+        create_conversation(session, "alice")
+        refresh_conversation(session, 2)
+        session.commit()
+
+        assert backfill_conversations(session) == 1
+        assert backfill_conversations(session) == 0
+
+        summaries = session.scalars(
+            select(ConversationSummary).order_by(ConversationSummary.conversation_id)
+        ).all()
+        assert [(s.conversation_id, s.message_count) for s in summaries] == [
+            (1, 5),
+            (2, 2),
+            (3, 0),
+        ]
+        assert summaries[0].last_message_id == 5
+        assert summaries[0].last_activity_at is not None
@@ -0,0 +1,203 @@
+import threading
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from streamlit.testing.v1 import AppTest
+
+from naomi_core.db.chat import fetch_messages
+from naomi_core.db.core import Base
+from naomi_streamlit.chat.generation import (
+    GenerationExecutor,
+    GenerationJob,
+    GenerationQueueFull,
+)
+from naomi_streamlit.db.engine import Database, new_session_factory
+from naomi_streamlit.db.models import core_metadata
+
+
+def stream_response(chunks: list[str], release: Optional[threading.Event] = None):
+    def generate(message, show_fn, session):
+        if release is not None:
+            release.wait(5)
+        message.content = show_fn(iter(chunks))
+
+    return generate
+
+
+@pytest.fixture
+def mock_session_scope():
+    with patch("naomi_streamlit.chat.generation.session_scope") as mock:
+        mock.return_value.__enter__.return_value = MagicMock()
+        yield mock
+
+
+@patch("naomi_streamlit.chat.generation.generate_response")
+def test_executor_runs_generation(mock_generate, mock_session_scope):
+    mock_generate.side_effect = stream_response(["Hello", " there"])
+    executor = GenerationExecutor(max_workers=1, max_queue_per_user=2)
+
+    job = executor.submit(1, None, "user")
+    assert job.done.wait(5)
+
+    assert job.error is None
+    assert job.text == "Hello there"
+    assert job.queue_wait is not None
+    assert job.generation_time is not None
+    metrics = executor.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["running"] == 0
+    executor.shutdown()
+
+
+@patch("naomi_streamlit.chat.generation.generate_response")
+def test_executor_attaches_and_limits_queue(mock_generate, mock_session_scope):
+    release = threading.Event()
+    mock_generate.side_effect = stream_response(["Hi"], release)
+    executor = GenerationExecutor(max_workers=1, max_queue_per_user=2)
+
+    first = executor.submit(1, 5, "user")
+    assert executor.submit(1, 5, "user") is first
+    assert executor.get(1, 5) is first
+
+    second = executor.submit(1, None, "user")
+    with pytest.raises(GenerationQueueFull):
+        executor.submit(2, None, "user")
+    executor.submit(2, None, "someone else")
+    assert executor.metrics()["rejected"] == 1
+
+    release.set()
+    assert first.done.wait(5) and second.done.wait(5)
+    executor.forget(first)
+    assert executor.get(1, 5) is None
+    executor.shutdown()
+
+
+@patch("naomi_streamlit.chat.generation.generate_response")
+def test_executor_records_failures(mock_generate, mock_session_scope):
+    mock_generate.side_effect = RuntimeError("LLM unavailable")
+    executor = GenerationExecutor(max_workers=1, max_queue_per_user=1)
+
+    job = executor.submit(1, None, "user")
+    assert job.done.wait(5)
+
+    assert isinstance(job.error, RuntimeError)
+    assert executor.metrics()["failed"] == 1
+    executor.shutdown()
+
+
+def test_consume_checkpoints_output_so_far():
+    job = GenerationJob(1, None, "user")
+    saved = []
+
+    with patch("naomi_streamlit.chat.generation.GENERATION_CHECKPOINT_INTERVAL_MS", 0):
+        assert job.consume(iter(["Hello", " there"]), saved.append) == "Hello there"
+    assert saved == ["Hello", "Hello there"]
+
+    saved.clear()
+    with patch("naomi_streamlit.chat.generation.GENERATION_CHECKPOINT_INTERVAL_MS", 60_000):
+        job.consume(iter(["!"]), saved.append)
+    assert saved == []
+
+
+def draw_draft_assistant_message_wrapper():  # pragma: no cover
+    from unittest.mock import MagicMock
+
+    from naomi_streamlit.chat.assistant import draw_draft_assistant_message
+
+    draw_draft_assistant_message(1, MagicMock())
+
+
+@patch("naomi_streamlit.chat.assistant.BACKGROUND_GENERATION", True)
+@patch("naomi_streamlit.chat.assistant.start_generation")
+def test_draw_draft_assistant_message_in_background(mock_start_generation):
+    at = AppTest.from_function(draw_draft_assistant_message_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert "draft" in at.markdown[0].value
+    mock_start_generation.assert_called_once_with(1)
+
+
+def draw_assistant_message_wrapper():  # pragma: no cover
+    from unittest.mock import MagicMock
+
+    from naomi_streamlit.chat.assistant import draw_assistant_message
+    from tests.data import message_model_2
+
+    draw_assistant_message(message_model_2(), MagicMock())
+
+
+@patch("naomi_streamlit.chat.assistant.BRANCHING", True)
+@patch("naomi_streamlit.chat.assistant.BACKGROUND_GENERATION", True)
+@patch("naomi_streamlit.chat.assistant.active_generation", return_value=None)
+@patch("naomi_streamlit.chat.assistant.start_generation")
+@patch("naomi_streamlit.chat.assistant.record_activity")
+@patch("naomi_streamlit.chat.assistant.branch_from")
+def test_regenerate_in_background_branches(
+    mock_branch_from, mock_record_activity, mock_start_generation, mock_active_generation
+):
+    at = AppTest.from_function(draw_assistant_message_wrapper)
+    at.run()
+    at.button(key="regenerate_2").click().run()
+
+    assert not at.exception
+    mock_branch_from.assert_called_once()
+    assert mock_branch_from.call_args.args[1].id == 2
+    assert mock_record_activity.call_args.args[2] is mock_branch_from.return_value
+    # The regenerated response is a new draft on the branch
+    mock_start_generation.assert_called_once_with(1)
+
+
+def draw_new_message_wrapper():  # pragma: no cover
+    from naomi_core.db.chat import Message, add_message_to_db
+    from naomi_streamlit.chat.assistant import draw_draft_assistant_message
+    from naomi_streamlit.chat.generation import generation_executor
+    from naomi_streamlit.db.engine import session_scope
+
+    with session_scope() as session:
+        add_message_to_db(Message.from_user_input("Tell me a joke"), session, 1)
+        draw_draft_assistant_message(1, session)
+        # Generate while the page still holds its session
+        generation_executor().shutdown()
+
+
+@patch("naomi_streamlit.chat.generation.GENERATION_CHECKPOINT_INTERVAL_MS", 0)
+@patch("naomi_streamlit.chat.assistant.BACKGROUND_GENERATION", True)
+def test_background_generation_reads_new_message(tmp_path, mock_llm_client):
+    # A database of its own, so the worker's connection only sees what the page committed
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    Base.metadata.create_all(engine)
+    core_metadata.create_all(engine)
+    checkpoints = []
+
+    def stream():
+        yield "Knock"
+        with new_session_factory(engine)() as session:
+            checkpoints.append([m.payload.body for m in fetch_messages(session, 1)])
+        yield " knock"
+
+    mock_llm_client.return_value.run.return_value = stream()
+    executor = GenerationExecutor(max_workers=1, max_queue_per_user=2)
+
+    with patch(
+        "naomi_streamlit.db.engine.database",
+        return_value=Database(engine, new_session_factory(engine)),
+    ), patch("naomi_streamlit.chat.generation.generation_executor", return_value=executor):
+        at = AppTest.from_function(draw_new_message_wrapper)
+        at.run()
+    job = executor.get(1, 2)
+
+    assert not at.exception
+    assert executor.get(1, None) is None
+    assert job.error is None
+    # The draft was stored up front and the first chunk saved before the stream finished
+    assert checkpoints == [["Tell me a joke", "Knock"]]
+    sent = mock_llm_client.return_value.run.call_args.kwargs["messages"]
+    assert [m["content"] for m in sent] == ["Tell me a joke"]
+    with new_session_factory(engine)() as session:
+        assert [m.payload.body for m in fetch_messages(session, 1)] == [
+            "Tell me a joke",
+            "Knock knock",
+        ]
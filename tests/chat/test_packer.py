@@ -0,0 +1,34 @@
+from naomi_core.db.chat import MessageModel
+from naomi_streamlit.chat.packer import estimate_tokens, message_tokens, pack_history
+
+
+def sized(i: int) -> MessageModel:
+    return MessageModel(conversation_id=1, id=i, content="x" * (40 * i))
+
+
+def test_message_tokens():
+    history = [sized(i) for i in range(1, 4)]
+
+    assert message_tokens(history) == [estimate_tokens(m.content) for m in history]
+    assert message_tokens(history) == [10, 20, 30]
+    assert message_tokens([]) == []
+
+
+def test_pack_history_keeps_newest():
+    history = [sized(i) for i in range(1, 5)]
+
+    packed, decision = pack_history(history, budget=75, reserved_tokens=5)
+
+    assert [m.id for m in packed] == [3, 4]
+    assert (decision.history_messages, decision.history_tokens) == (4, 100)
+    assert (decision.packed_messages, decision.packed_tokens) == (2, 70)
+    assert (decision.dropped_messages, decision.dropped_tokens) == (2, 30)
+    assert decision.prompt_tokens == 75
+
+    packed, decision = pack_history(history, budget=10)
+    assert [m.id for m in packed] == [4]
+    assert decision.prompt_tokens == 40
+
+    packed, decision = pack_history(history, budget=0)
+    assert packed == history
+    assert decision.dropped_messages == 0
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+from streamlit.testing.v1 import AppTest
+
+from naomi_core.db.chat import Message, MessageModel
+from naomi_streamlit.chat.payload_cache import ParseStats, PayloadCache, payload_cache
+
+
+def message_model(message_id: int, text: str, conversation_id: int = 1) -> MessageModel:
+    return MessageModel(
+        conversation_id=conversation_id, id=message_id, content=Message(content=text).to_json()
+    )
+
+
+def test_payload_cache_hit():
+    cache = PayloadCache(10)
+    stats = ParseStats()
+    message = message_model(1, "Hello!")
+
+    first = cache.get(message, stats)
+    second = cache.get(message_model(1, "Hello!"), stats)
+
+    assert first["content"] == "Hello!"
+    assert second is first
+    assert stats.messages == 1
+    assert stats.bytes == len(message.content)
+
+
+def test_payload_cache_detects_changed_content():
+    cache = PayloadCache(10)
+    stats = ParseStats()
+
+    cache.get(message_model(1, "Hello!"), stats)
+    payload = cache.get(message_model(1, "Regenerated"), stats)
+
+    assert payload["content"] == "Regenerated"
+    assert stats.messages == 2
+
+
+def test_payload_cache_lru_eviction():
+    cache = PayloadCache(2)
+    stats = ParseStats()
+
+    for message_id in (1, 2, 1, 3):
+        cache.get(message_model(message_id, f"Message {message_id}"), stats)
+
+    assert len(cache) == 2
+    cache.get(message_model(1, "Message 1"), stats)
+    assert stats.messages == 3
+    cache.get(message_model(2, "Message 2"), stats)
+    assert stats.messages == 4
+
+
+def test_payload_cache_invalidation():
+    cache = PayloadCache(10)
+    for conversation_id in (1, 2):
+        for message_id in (1, 2, 3):
+            cache.get(message_model(message_id, "Hi", conversation_id))
+
+    cache.invalidate(1, 1)
+    assert len(cache) == 5
+
+    cache.invalidate_from(2, 2)
+    assert len(cache) == 3
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_payload_cache_skips_unsaved_messages():
+    cache = PayloadCache(10)
+    cache.get(MessageModel.from_llm_response(1, "draft"))
+    assert len(cache) == 0
+
+
+def draw_user_message_wrapper():  # pragma: no cover
+    from unittest.mock import MagicMock
+
+    import streamlit as st
+    from naomi_core.db.chat import Message, MessageModel
+    from naomi_streamlit.chat.chat import draw_messages
+    from naomi_streamlit.chat.payload_cache import parse_stats, reset_parse_stats
+
+    reset_parse_stats()
+    message = MessageModel(conversation_id=1, id=1, content=Message(content="Hello!").to_json())
+    draw_messages([message], MagicMock())
+    st.session_state["_parsed_bytes_"] = parse_stats().bytes
+
+
+@patch("naomi_streamlit.chat.user_input.record_activity")
+@patch("naomi_streamlit.chat.user_input.delete_message")
+def test_delete_invalidates_payload_cache(mock_delete_message, mock_record_activity):
+    payload_cache.clear()
+    at = AppTest.from_function(draw_user_message_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert at.session_state["_parsed_bytes_"] > 0
+
+    # Unchanged messages are served from the cache on the next rerun
+    at.run()
+    assert at.session_state["_parsed_bytes_"] == 0
+
+    # Deleting invalidates the entry, so the rerun triggered by the delete parses it again
+    at.button[0].click().run()
+
+    assert not at.exception
+    mock_delete_message.assert_called_once()
+    mock_record_activity.assert_called_once()
+    assert mock_record_activity.call_args.args[1] == 1
+    assert mock_record_activity.call_args.args[2] == -mock_delete_message.return_value
+    assert at.session_state["_parsed_bytes_"] > 0
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+from streamlit.testing.v1 import AppTest
+
+from naomi_core.db.chat import Message, MessageModel
+from naomi_streamlit.chat.render import (
+    history_blocks,
+    message_markdown,
+    render_block,
+    split_live_messages,
+)
+
+
+def message_model(message_id: int, text: str, role: str = "user") -> MessageModel:
+    return MessageModel(
+        conversation_id=1, id=message_id, content=Message(content=text, role=role).to_json()
+    )
+
+
+def test_split_live_messages():
+    messages = [message_model(i, f"Message {i}") for i in range(1, 6)]
+
+    history, live = split_live_messages(messages, 2)
+    assert [m.id for m in history] == [1, 2, 3]
+    assert [m.id for m in live] == [4, 5]
+
+    history, live = split_live_messages(messages, 10)
+    assert history == []
+    assert live == messages
+
+
+def test_history_blocks_group_by_id():
+    messages = [message_model(i, f"Message {i}") for i in range(3, 12)]
+
+    blocks = history_blocks(messages, 5)
+
+    assert [[m.id for m in block] for block in blocks] == [[3, 4], [5, 6, 7, 8, 9], [10, 11]]
+
+
+def test_message_markdown():
+    assert "Hello!" in message_markdown(message_model(1, "Hello!"))
+    assert "`1`" in message_markdown(message_model(1, "Hello!"))
+    assert "Assistant" in message_markdown(message_model(2, "Hi!", role="assistant"))
+
+
+def test_render_block_cached_by_content():
+    first = render_block([message_model(1, "Hello!"), message_model(2, "Hi!", "assistant")])
+    second = render_block([message_model(1, "Hello!"), message_model(2, "Hi!", "assistant")])
+    changed = render_block([message_model(1, "Hello!"), message_model(2, "Bye!", "assistant")])
+
+    assert second is first
+    assert "Hello!" in first and "Hi!" in first
+    assert "Bye!" in changed
+
+
+def draw_history_wrapper():  # pragma: no cover
+    from naomi_core.db.chat import Message, MessageModel
+    from naomi_streamlit.chat.render import draw_history
+
+    draw_history(
+        [
+            MessageModel(conversation_id=1, id=i, content=Message(content=f"Message {i}").to_json())
+            for i in range(1, 31)
+        ]
+    )
+
+
+@patch("naomi_streamlit.chat.render.HISTORY_BLOCK_SIZE", 10)
+def test_draw_history():
+    at = AppTest.from_function(draw_history_wrapper)
+    at.run()
+
+    assert not at.exception
+    # ids 1-9, 10-19, 20-29 and 30
+    assert len(at.markdown) == 4
+    assert "Message 1\n" in at.markdown[0].value
+    assert "Message 30" in at.markdown[3].value
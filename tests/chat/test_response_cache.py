@@ -0,0 +1,152 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from naomi_core.db.agent import AgentModel
+from naomi_core.db.chat import Message, MessageModel, add_message_to_db, fetch_messages
+from naomi_streamlit.chat import response_cache as response_cache_module
+from naomi_streamlit.chat.context import build_context
+from naomi_streamlit.chat.response_cache import (
+    ResponseCache,
+    generate_response,
+    request_key,
+    response_cache,
+)
+from tests.conftest import in_memory_session
+
+
+def show_text(chunks) -> str:
+    return "".join(chunks)
+
+
+@pytest.fixture
+def enabled_cache():
+    cache = ResponseCache(max_bytes=1_000, ttl=60)
+    with patch.object(response_cache_module, "RESPONSE_CACHE", True), patch.object(
+        response_cache_module, "response_cache", cache
+    ):
+        yield cache
+
+
+def test_response_cache_hits_and_misses():
+    cache = ResponseCache(max_bytes=100, ttl=60)
+
+    assert cache.get("a") is None
+    cache.put("a", "Hello")
+    assert cache.get("a") == "Hello"
+
+    stats = cache.snapshot()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert (stats["entries"], stats["bytes"]) == (1, 5)
+
+
+def test_response_cache_expires_entries():
+    now = [0.0]
+    cache = ResponseCache(max_bytes=100, ttl=60, clock=lambda: now[0])
+    cache.put("a", "Hello")
+
+    now[0] = 59
+    assert cache.get("a") == "Hello"
+    now[0] = 60
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.snapshot()["expirations"] == 1
+
+
+def test_response_cache_evicts_least_recently_used_bytes():
+    cache = ResponseCache(max_bytes=10, ttl=60)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")
+
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.snapshot()["evictions"] == 1
+
+    # Never cached, however recently used
+    cache.put("d", "d" * 11)
+    assert cache.get("d") is None
+    assert cache.snapshot()["bytes"] == 8
+
+
+def test_request_key():
+    with in_memory_session() as session:
+        history = [Message("Hi")]
+        key = request_key(session, history)
+
+        assert request_key(session, [Message("Hi")]) == key
+        assert request_key(session, [Message("Hey")]) != key
+
+        with patch.dict("os.environ", {"OPENAI_BASE_MODEL": "another-model"}):
+            assert request_key(session, history) != key
+
+        session.add(AgentModel(name="Naomi", prompt="Be kind"))
+        session.flush()
+        assert request_key(session, history) != key
+
+
+def test_generate_response_replays_identical_request(mock_llm_client, enabled_cache):
+    mock_llm_client.return_value.run.return_value = iter(["Hello", " there"])
+    with in_memory_session() as session:
+        for conversation_id in (1, 2):
+            add_message_to_db(Message.from_user_input("Hi"), session, conversation_id)
+            message = MessageModel.from_llm_response(conversation_id, "")
+            show_fn = MagicMock(side_effect=show_text)
+
+            generate_response(message, show_fn, session)
+
+            assert show_fn.call_count == 1
+            assert fetch_messages(session, conversation_id)[-1].payload.body == "Hello there"
+
+        mock_llm_client.return_value.run.assert_called_once()
+        stats = enabled_cache.snapshot()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+        # The replayed response is committed, not just flushed
+        session.rollback()
+        assert fetch_messages(session, 2)[-1].payload.body == "Hello there"
+
+
+def test_generate_response_replays_in_place(mock_llm_client, enabled_cache):
+    with in_memory_session() as session:
+        add_message_to_db(Message.from_user_input("Hi"), session, 1)
+        message = add_message_to_db(Message.from_llm_response("Old"), session, 1)
+        history = build_context(session, 1, before_id=message.id).messages
+        enabled_cache.put(request_key(session, history), "Cached")
+
+        generate_response(message, show_text, session)
+
+        assert message.payload.body == "Cached"
+        mock_llm_client.return_value.run.assert_not_called()
+
+
+def test_regenerating_twice_hits_cache(mock_llm_client, enabled_cache):
+    mock_llm_client.return_value.run.return_value = iter(["First"])
+    with in_memory_session() as session:
+        add_message_to_db(Message.from_user_input("Hi"), session, 1)
+        message = add_message_to_db(Message.from_llm_response("Old"), session, 1)
+
+        generate_response(message, show_text, session)
+        assert message.payload.body == "First"
+        generate_response(message, show_text, session)
+
+        assert message.payload.body == "First"
+        mock_llm_client.return_value.run.assert_called_once()
+        # The message being regenerated is not part of its own request
+        assert mock_llm_client.return_value.run.call_args.kwargs["messages"] == [Message("Hi")]
+        stats = enabled_cache.snapshot()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_generate_response_disabled(mock_llm_client):
+    mock_llm_client.return_value.run.return_value = iter(["Hello"])
+    lookups = response_cache.snapshot()["misses"]
+    with in_memory_session() as session:
+        add_message_to_db(Message.from_user_input("Hi"), session, 1)
+
+        generate_response(MessageModel.from_llm_response(1, ""), show_text, session)
+
+        assert fetch_messages(session, 1)[-1].payload.body == "Hello"
+    assert mock_llm_client.return_value.run.call_args.kwargs["messages"] == [Message("Hi")]
+    assert response_cache.snapshot()["misses"] == lookups
@@ -0,0 +1,55 @@
+from naomi_streamlit.chat.streaming import StreamStats, coalesce_chunks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def timed_chunks(clock: FakeClock, chunks: list[tuple[float, str]]):
+    for at, chunk in chunks:
+        clock.now = at
+        yield chunk
+
+
+def test_coalesce_chunks_flushes_first_chunk_immediately():
+    clock = FakeClock()
+    stats = StreamStats()
+    chunks = timed_chunks(clock, [(0.01, "Hel"), (0.02, "lo"), (0.03, " there")])
+
+    deltas = list(coalesce_chunks(chunks, 1024, 1.0, stats, clock))
+
+    assert deltas == ["Hel", "lo there"]
+    assert stats.tokens == 3
+    assert stats.deltas == 2
+    assert stats.time_to_first_token is not None
+
+
+def test_coalesce_chunks_flushes_on_interval():
+    clock = FakeClock()
+    chunks = timed_chunks(clock, [(0.0, "a"), (0.01, "b"), (0.02, "c"), (0.06, "d"), (0.07, "e")])
+
+    deltas = list(coalesce_chunks(chunks, 1024, 0.05, clock=clock))
+
+    assert deltas == ["a", "bcd", "e"]
+
+
+def test_coalesce_chunks_flushes_on_bytes():
+    clock = FakeClock()
+    chunks = timed_chunks(clock, [(0.0, "a"), (0.0, "bb"), (0.0, "cc"), (0.0, "d"), (0.0, "")])
+
+    deltas = list(coalesce_chunks(chunks, 4, 10.0, clock=clock))
+
+    assert deltas == ["a", "bbcc", "d"]
+
+
+def test_stream_stats_rates():
+    stats = StreamStats(tokens=10, deltas=2, started_at=1.0, finished_at=3.0)
+
+    assert stats.duration == 2.0
+    assert stats.tokens_per_second == 5.0
+    assert stats.deltas_per_second == 1.0
+    assert stats.time_to_first_token is None
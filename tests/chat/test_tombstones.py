@@ -0,0 +1,157 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from naomi_core.db.chat import Message, MessageModel, add_message_to_db
+from naomi_streamlit.chat import tombstones
+from naomi_streamlit.chat.context import build_context
+from naomi_streamlit.chat.conversations import refresh_conversation
+from naomi_streamlit.chat.tombstones import (
+    TombstoneCompactor,
+    compact_tombstone,
+    start_compaction,
+    truncate_after,
+    truncate_messages_after,
+    visible_segments,
+)
+from naomi_streamlit.chat.window import fetch_message_window, find_older_page_start
+from naomi_streamlit.db.models import MessageTombstone
+from tests.conftest import TestingSessionLocal, add_messages, in_memory_session
+
+
+def message_ids(session, conversation_id: int) -> list[int]:
+    query = select(MessageModel.id).where(MessageModel.conversation_id == conversation_id)
+    return list(session.scalars(query.order_by(MessageModel.id)).all())
+
+
+@pytest.mark.parametrize(
+    "ranges, lower, upper, expected",
+    [
+        ([], None, None, [(None, None)]),
+        ([(5, 8)], None, None, [(None, 4), (9, None)]),
+        ([(9, 12), (3, 4)], None, None, [(None, 2), (5, 8), (13, None)]),
+        ([(1, 4)], 1, None, [(5, None)]),
+        ([(5, 8)], 6, None, [(9, None)]),
+        ([(5, 8)], None, 6, [(None, 4)]),
+        ([(5, 8)], None, 3, [(None, 3)]),
+        ([(5, 8)], 2, 12, [(2, 4), (9, 12)]),
+        ([(5, 8)], 5, 8, []),
+    ],
+)
+def test_visible_segments(ranges, lower, upper, expected):
+    assert visible_segments(ranges, lower, upper) == expected
+
+
+def test_truncate_messages_after_records_range():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+        add_messages(session, 2, 10)
+
+        tombstone = truncate_messages_after(session, session.get(MessageModel, (1, 4)))
+
+        assert (tombstone.from_id, tombstone.to_id) == (4, 10)
+        # Nothing was deleted yet
+        assert len(message_ids(session, 1)) == 10
+
+        window = fetch_message_window(session, 1, 5)
+        assert [m.id for m in window.messages] == [1, 2, 3]
+        assert not window.has_older
+        assert [m.id for m in fetch_message_window(session, 2, 5).messages] == list(range(6, 11))
+
+
+def test_truncate_messages_after_widens_range():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6)
+        truncate_messages_after(session, session.get(MessageModel, (1, 4)))
+        add_messages(session, 1, 3, start=7)
+
+        tombstone = truncate_messages_after(session, session.get(MessageModel, (1, 4)))
+
+        assert (tombstone.from_id, tombstone.to_id) == (4, 9)
+        assert session.scalars(select(MessageTombstone)).all() == [tombstone]
+        assert truncate_messages_after(session, MessageModel(conversation_id=1, id=20)) is None
+
+
+def test_messages_after_truncation_stay_visible():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+        truncate_messages_after(session, session.get(MessageModel, (1, 5)))
+        # naomi_core numbers the next message past the hidden ones
+        message = add_message_to_db(Message(content="Again", role="user"), session, 1)
+        assert message.id == 11
+
+        window = fetch_message_window(session, 1, 3)
+        assert [m.id for m in window.messages] == [3, 4, 11]
+        assert window.has_older
+        assert find_older_page_start(session, 1, 11, 3) == 2
+
+        window = fetch_message_window(session, 1, 3, start_id=2)
+        assert [m.id for m in window.messages] == [2, 3, 4, 11]
+        assert window.has_older
+
+        summary = refresh_conversation(session, 1)
+        assert summary.message_count == 5
+        assert summary.last_message_id == 11
+
+
+@patch("naomi_streamlit.chat.tombstones.delete_messages_after")
+@patch("naomi_streamlit.chat.tombstones.truncate_messages_after")
+def test_truncate_after_follows_setting(mock_truncate, mock_delete):
+    session, message = MagicMock(), MagicMock()
+
+    truncate_after(session, message)
+    mock_truncate.assert_called_once_with(session, message)
+
+    with patch.object(tombstones, "TOMBSTONE_TRUNCATION", False):
+        truncate_after(session, message)
+    mock_delete.assert_called_once_with(session, message)
+
+
+def test_context_skips_truncated_messages():
+    with in_memory_session() as session:
+        add_messages(session, 1, 6)
+        truncate_messages_after(session, session.get(MessageModel, (1, 3)))
+        session.commit()
+
+        assert len(build_context(session, 1).messages) == 2
+        # naomi_core numbers new messages after hidden ones too
+        assert add_message_to_db(Message.from_user_input("Next"), session, 1).id == 7
+
+
+def test_compact_tombstone():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+        add_messages(session, 2, 10)
+        truncate_messages_after(session, session.get(MessageModel, (1, 4)))
+        session.commit()
+
+        assert TombstoneCompactor(TestingSessionLocal, 60, 10).run_once() == 7
+
+        session.expire_all()
+        assert message_ids(session, 1) == [1, 2, 3]
+        assert len(message_ids(session, 2)) == 10
+        assert session.scalars(select(MessageTombstone)).all() == []
+
+
+def test_compact_tombstone_keeps_widened_range():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+        tombstone = truncate_messages_after(session, session.get(MessageModel, (1, 4)))
+        session.commit()
+        # Read before a truncation widened the range
+        stale = MessageTombstone(conversation_id=1, from_id=4, to_id=8)
+
+        assert compact_tombstone(session, stale) == 5
+        session.commit()
+
+        assert session.get(MessageTombstone, (1, 4)) is tombstone
+        assert [m.id for m in fetch_message_window(session, 1, 10).messages] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("truncation, interval", [(False, 60), (True, 0)])
+def test_start_compaction_disabled(truncation, interval):
+    with patch.object(tombstones, "TOMBSTONE_TRUNCATION", truncation), patch.object(
+        tombstones, "TOMBSTONE_COMPACTION_INTERVAL_S", interval
+    ):
+        assert start_compaction(MagicMock()) is None
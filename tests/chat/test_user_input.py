@@ -1,5 +1,9 @@
+from sqlalchemy import select
 from streamlit.testing.v1 import AppTest
 
+from naomi_streamlit.db.models import ConversationSummary, MessageTombstone
+from tests.conftest import TestingSessionLocal, add_messages, in_memory_session
+
 
 def draw_user_message_wrapper():  # pragma: no cover
     from naomi_streamlit.chat.user_input import draw_user_message
@@ -43,3 +47,27 @@ def test_draw_user_message_button_press():
     assert len(at.button) == 1
     assert at.button[0].key == "delete_1"
     assert at.button[0].label == "🗑️"
+
+
+def draw_stored_user_message_wrapper():  # pragma: no cover
+    from naomi_core.db.chat import MessageModel
+    from naomi_streamlit.chat.user_input import draw_user_message
+    from tests.conftest import TestingSessionLocal
+
+    with TestingSessionLocal() as session:
+        draw_user_message(session.get(MessageModel, (1, 2)), session)
+
+
+def test_draw_user_message_delete_is_committed():
+    with in_memory_session() as session:
+        add_messages(session, 1, 3)
+
+        at = AppTest.from_function(draw_stored_user_message_wrapper)
+        at.run()
+        at.button(key="delete_2").click().run()
+        assert not at.exception
+
+        with TestingSessionLocal() as reader:
+            tombstones = reader.execute(select(MessageTombstone.from_id, MessageTombstone.to_id))
+            assert tombstones.all() == [(2, 3)]
+            assert reader.get(ConversationSummary, 1).message_count == 1
@@ -0,0 +1,44 @@
+from naomi_streamlit.chat.window import fetch_message_window, find_older_page_start
+from tests.conftest import add_messages, in_memory_session
+
+
+def test_fetch_message_window_latest():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+        add_messages(session, 2, 3)
+
+        window = fetch_message_window(session, 1, 4)
+
+        assert [m.id for m in window.messages] == [7, 8, 9, 10]
+        assert window.has_older
+
+
+def test_fetch_message_window_fits():
+    with in_memory_session() as session:
+        add_messages(session, 1, 3)
+
+        window = fetch_message_window(session, 1, 4)
+
+        assert [m.id for m in window.messages] == [1, 2, 3]
+        assert not window.has_older
+
+
+def test_fetch_message_window_from_start_id():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+
+        window = fetch_message_window(session, 1, 4, start_id=3)
+        assert [m.id for m in window.messages] == list(range(3, 11))
+        assert window.has_older
+
+        window = fetch_message_window(session, 1, 4, start_id=1)
+        assert not window.has_older
+
+
+def test_find_older_page_start():
+    with in_memory_session() as session:
+        add_messages(session, 1, 10)
+
+        assert find_older_page_start(session, 1, 7, 4) == 3
+        assert find_older_page_start(session, 1, 3, 4) == 1
+        assert find_older_page_start(session, 1, 1, 4) is None
@@ -1,8 +1,12 @@
 from contextlib import contextmanager
 import os
+from typing import Callable
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from naomi_core.db.chat import Message, MessageModel
 from naomi_core.db.core import Base
+from naomi_streamlit.db.models import core_metadata
 
 os.environ["OPENAI_BASE_URL"] = ""
 os.environ["OPENAI_API_KEY"] = ""
@@ -10,14 +14,37 @@ os.environ["OPENAI_BASE_MODEL"] = ""
 
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(TEST_DATABASE_URL)
+# One in-memory database for the whole run; AppTest scripts use it from their own thread
+engine = create_engine(
+    TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 @contextmanager
 def in_memory_session():
-    engine = create_engine(TEST_DATABASE_URL)
     Base.metadata.create_all(bind=engine)
-    InMemorySession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    yield InMemorySession()
-    Base.metadata.drop_all(bind=engine)
+    core_metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        # Empty the tables instead of dropping them so the next test starts clean
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables + core_metadata.sorted_tables):
+                connection.execute(table.delete())
+
+
+def add_messages(
+    session,
+    conversation_id: int,
+    count: int,
+    start: int = 1,
+    content: Callable[[int], str] = lambda i: f"Message {i}",
+):
+    """Add user messages start..start+count-1 to a conversation, with ids as numbered."""
+    for i in range(start, start + count):
+        payload = Message(content=content(i), role="user").to_json()
+        session.add(MessageModel(conversation_id=conversation_id, id=i, content=payload))
+    session.commit()
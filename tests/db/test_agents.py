@@ -0,0 +1,18 @@
+from naomi_core.db.agent import AgentModel, AgentResponsibilityModel
+from naomi_streamlit.db.agents import load_agents_with_responsibilities
+from tests.conftest import in_memory_session
+
+
+def test_load_agents_with_responsibilities():
+    with in_memory_session() as session:
+        session.add(AgentModel(name="B", prompt="Prompt"))
+        session.add(AgentModel(name="A", prompt="Prompt"))
+        session.add(AgentResponsibilityModel(agent_name="B", name="Two", description="..."))
+        session.add(AgentResponsibilityModel(agent_name="B", name="One", description="..."))
+        session.commit()
+
+        loaded = load_agents_with_responsibilities(session)
+
+        assert [agent.name for agent, _ in loaded] == ["A", "B"]
+        assert loaded[0][1] == []
+        assert [r.name for r in loaded[1][1]] == ["One", "Two"]
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.pool import QueuePool
+from streamlit.runtime.scriptrunner import RerunData, RerunException, StopException
+
+from naomi_streamlit.db.engine import (
+    database,
+    insert_ignoring_conflicts,
+    pool_stats,
+    read_session_scope,
+    session_scope,
+)
+from naomi_streamlit.db.models import MessageParent
+from tests.conftest import in_memory_session
+
+
+@pytest.fixture
+def file_database(tmp_path):
+    core = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    database.clear()
+    with patch("naomi_streamlit.db.engine.core_engine", return_value=core):
+        yield database()
+    database.clear()
+
+
+def test_database_is_pooled_and_shared(file_database):
+    assert database() is file_database
+    assert isinstance(file_database.engine.pool, QueuePool)
+    assert file_database.engine.pool.size() == 5
+    assert str(file_database.engine.url).endswith("app.db")
+
+
+def test_database_reuses_in_memory_engine():
+    core = create_engine("sqlite://")
+    database.clear()
+    with patch("naomi_streamlit.db.engine.core_engine", return_value=core):
+        assert database().engine is core
+    database.clear()
+
+
+def test_session_scope_reuses_pooled_connections(file_database):
+    with session_scope() as session:
+        session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        session.execute(text("INSERT INTO items VALUES (1)"))
+        assert pool_stats(file_database.engine)["checked_out"] == 1
+
+    for _ in range(10):
+        with session_scope() as session:
+            assert session.execute(text("SELECT count(*) FROM items")).scalar() == 1
+
+    stats = pool_stats(file_database.engine)
+    assert stats["checked_out"] == 0
+    assert stats["checked_in"] == 1
+    assert stats["overflow"] == 0
+
+
+def test_session_scope_rolls_back(file_database):
+    with session_scope() as session:
+        session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+
+    with pytest.raises(RuntimeError):
+        with session_scope() as session:
+            session.execute(text("INSERT INTO items VALUES (1)"))
+            raise RuntimeError()
+
+    with session_scope() as session:
+        assert session.execute(text("SELECT count(*) FROM items")).scalar() == 0
+
+
+@pytest.mark.parametrize("exception", [RerunException(RerunData()), StopException()])
+def test_session_scope_commits_on_rerun(file_database, exception):
+    with session_scope() as session:
+        session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+
+    with pytest.raises(type(exception)):
+        with session_scope() as session:
+            session.execute(text("INSERT INTO items VALUES (1)"))
+            raise exception
+
+    with session_scope() as session:
+        assert session.execute(text("SELECT count(*) FROM items")).scalar() == 1
+
+
+def test_pool_stats_without_queue_pool():
+    assert pool_stats(create_engine("sqlite://")) == {"pool": "SingletonThreadPool"}
+
+
+def test_read_session_scope(file_database):
+    with session_scope() as session:
+        session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        session.execute(text("INSERT INTO items VALUES (1)"))
+
+    with read_session_scope() as session:
+        assert session.bind is file_database.read_engine
+        assert session.execute(text("SELECT count(*) FROM items")).scalar() == 1
+
+
+def test_insert_ignoring_conflicts():
+    with in_memory_session() as session:
+        rows = [{"conversation_id": 1, "id": 1, "parent_id": None}]
+        session.execute(insert_ignoring_conflicts(session, MessageParent), rows)
+        rows = [
+            {"conversation_id": 1, "id": 1, "parent_id": 7},
+            {"conversation_id": 1, "id": 2, "parent_id": 1},
+        ]
+        session.execute(insert_ignoring_conflicts(session, MessageParent), rows)
+
+        query = select(MessageParent.id, MessageParent.parent_id).order_by(MessageParent.id)
+        assert session.execute(query).all() == [(1, None), (2, 1)]
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from naomi_streamlit.db.engine import create_database
+
+
+@pytest.fixture
+def url(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'app.db'}").url
+
+
+def pragma(engine, name: str):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_profile(url):
+    db = create_database(url, sqlite_profile=True)
+
+    assert pragma(db.engine, "journal_mode") == "wal"
+    assert pragma(db.engine, "synchronous") == 1
+    assert pragma(db.engine, "busy_timeout") == 5_000
+    assert pragma(db.engine, "cache_size") == -64_000
+    assert pragma(db.engine, "query_only") == 0
+
+    assert db.read_engine is not db.engine
+    assert pragma(db.read_engine, "query_only") == 1
+    assert pragma(db.read_engine, "busy_timeout") == 5_000
+
+
+def test_read_pool_cannot_write(url):
+    db = create_database(url, sqlite_profile=True)
+    with db.session_factory() as session:
+        session.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        session.execute(text("INSERT INTO items VALUES (1)"))
+        session.commit()
+
+    with db.read_session_factory() as session:
+        assert session.execute(text("SELECT count(*) FROM items")).scalar() == 1
+        with pytest.raises(OperationalError):
+            session.execute(text("INSERT INTO items VALUES (2)"))
+
+
+def test_without_sqlite_profile(url):
+    db = create_database(url, sqlite_profile=False)
+
+    assert db.read_engine is db.engine
+    assert db.read_session_factory is db.session_factory
+    assert pragma(db.engine, "journal_mode") == "delete"
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+from naomi_core.db.webhook import WebhookEvent
+
+EPOCH = datetime(2025, 1, 1)
+
+
+def add_events(session, count: int, event_types=("email",), statuses=("pending",)):
+    for i in range(1, count + 1):
+        session.add(
+            WebhookEvent(
+                id=i,
+                event_type=event_types[i % len(event_types)],
+                status=statuses[i % len(statuses)],
+                payload=f'{{"subject": "Event {i}"}}',
+                # Pairs of events share a timestamp to exercise the id tie-breaker
+                created_at=EPOCH + timedelta(minutes=i // 2),
+            )
+        )
+    session.commit()
@@ -0,0 +1,181 @@
+from streamlit.testing.v1 import AppTest
+
+
+def show_events_wrapper(sizes_recorded: bool = False):  # pragma: no cover
+    from unittest.mock import patch
+    import streamlit as st
+    from naomi_streamlit.events.event_log import event_filter_options, show_events
+    from naomi_streamlit.events.queries import record_payload_sizes
+    from tests.conftest import in_memory_session
+    from tests.events.conftest import add_events
+
+    event_filter_options.clear()
+    with in_memory_session() as session:
+        add_events(session, 7, event_types=("email", "sms"))
+        if sizes_recorded:
+            record_payload_sizes(session)
+        with (
+            patch("naomi_streamlit.events.event_log.session_scope") as mock_session_scope,
+            patch("naomi_streamlit.events.event_log.read_session_scope") as mock_read_scope,
+            patch("naomi_streamlit.events.event_log.EVENTS_PAGE_SIZE", 3),
+        ):
+            mock_session_scope.return_value.__enter__.return_value = session
+            mock_read_scope.return_value.__enter__.return_value = session
+            show_events()
+            st.session_state["_write_sessions_"] = mock_session_scope.call_count
+
+
+def bulk_actions_wrapper(event_ids: list[int]):  # pragma: no cover
+    from unittest.mock import patch
+    import streamlit as st
+    from naomi_core.db.webhook import WebhookEvent
+    from naomi_streamlit.events.event_log import draw_bulk_actions
+    from tests.conftest import in_memory_session
+    from tests.events.conftest import add_events
+
+    # Each run starts from a fresh database, so stay on the run that applied the action
+    with in_memory_session() as session:
+        add_events(session, 4, statuses=("pending", "failed"))
+        with (
+            patch("naomi_streamlit.events.event_log.session_scope") as mock_session_scope,
+            patch("naomi_streamlit.events.event_log.st.rerun"),
+        ):
+            mock_session_scope.return_value.__enter__.return_value = session
+            draw_bulk_actions(event_ids, ["failed", "pending"])
+        st.session_state["_events_"] = {
+            event.id: event.status for event in session.query(WebhookEvent).order_by("id")
+        }
+
+
+def click(at, key: str):
+    at.button(key=key).click().run()
+    # Rerun once more so elements left over from the interrupted run are dropped from the tree
+    at.run()
+
+
+def event_ids(at) -> list[int]:
+    return list(at.dataframe[0].value["id"])
+
+
+def test_show_events_table():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+
+    assert not at.exception
+    # The whole page is a single element, without the payload
+    assert len(at.dataframe) == 1
+    assert list(at.dataframe[0].value.columns) == [
+        "id",
+        "event_type",
+        "created_at",
+        "status",
+        "payload_size",
+    ]
+    assert list(at.dataframe[0].value["payload_size"]) == [22, 22, 22]
+    # No payload is loaded until an event is selected
+    assert len(at.json) == 0
+    assert "Select a single event to view its payload" in [caption.value for caption in at.caption]
+    assert at.button(key="events_delete_selected").disabled
+
+
+def test_show_events_records_payload_sizes_once():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+    assert at.session_state["_write_sessions_"] == 1
+
+    # Nothing new, so nothing is written
+    at = AppTest.from_function(show_events_wrapper, args=(True,))
+    at.run()
+
+    assert not at.exception
+    assert at.session_state["_write_sessions_"] == 0
+    assert list(at.dataframe[0].value["payload_size"]) == [22, 22, 22]
+
+
+def test_show_events_live_tail():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+    assert len(at.dataframe) == 1
+
+    at.toggle(key="events_live_tail").set_value(True).run()
+
+    assert not at.exception
+    # The tail is drawn above the paged table
+    assert len(at.dataframe) == 2
+    assert list(at.dataframe[0].value["id"]) == [7, 6, 5, 4, 3, 2, 1]
+    assert at.session_state["events_tail"].last_id == 7
+
+    at.toggle(key="events_live_tail").set_value(False).run()
+
+    assert len(at.dataframe) == 1
+    assert "events_tail" not in at.session_state
+
+
+def test_show_events_pages():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert event_ids(at) == [7, 6, 5]
+    assert at.button(key="events_previous").disabled
+
+    click(at, "events_next")
+    assert event_ids(at) == [4, 3, 2]
+
+    click(at, "events_next")
+    assert event_ids(at) == [1]
+    assert at.button(key="events_next").disabled
+
+    click(at, "events_previous")
+    assert event_ids(at) == [4, 3, 2]
+
+
+def test_show_events_filters():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+    click(at, "events_next")
+
+    at.selectbox(key="events_type_filter").set_value("sms").run()
+
+    assert not at.exception
+    # Changing the filter starts over at the first page
+    assert event_ids(at) == [7, 5, 3]
+
+    at.toggle(key="events_newest_first").set_value(False).run()
+    assert event_ids(at) == [1, 3, 5]
+
+
+def test_delete_matching_events():
+    at = AppTest.from_function(show_events_wrapper)
+    at.run()
+    assert at.button(key="events_delete_matching").disabled
+
+    at.selectbox(key="events_type_filter").set_value("sms").run()
+    assert "type sms" in at.caption[0].value
+    at.button(key="events_delete_matching").click().run()
+
+    assert not at.exception
+    assert at.toast[0].value == "4 events deleted"
+
+
+def test_bulk_delete():
+    at = AppTest.from_function(bulk_actions_wrapper, args=([1, 3],))
+    at.run()
+    assert at.button(key="events_delete_selected").label == "🗑️ Delete 2 selected"
+
+    at.button(key="events_delete_selected").click().run()
+
+    assert not at.exception
+    assert at.session_state["_events_"] == {2: "pending", 4: "pending"}
+
+
+def test_bulk_set_status():
+    at = AppTest.from_function(bulk_actions_wrapper, args=([1, 2],))
+    at.run()
+    assert at.button(key="events_set_status").disabled
+
+    at.selectbox(key="events_new_status").set_value("failed").run()
+    at.button(key="events_set_status").click().run()
+
+    assert not at.exception
+    assert at.session_state["_events_"] == {1: "failed", 2: "failed", 3: "failed", 4: "pending"}
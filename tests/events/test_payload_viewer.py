@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+from streamlit.testing.v1 import AppTest
+
+from naomi_streamlit.events.payload_viewer import format_size
+
+LARGE_PAYLOAD = json.dumps({"subject": "Statement", "body": "x" * 500})
+
+
+def event_payload_wrapper(payload: str, size_bytes):  # pragma: no cover
+    from unittest.mock import patch
+    from naomi_core.db.webhook import WebhookEvent
+    from naomi_streamlit.events.payload_viewer import draw_event_payload
+    from tests.conftest import in_memory_session
+
+    with in_memory_session() as session:
+        session.add(WebhookEvent(id=1, event_type="email", payload=payload))
+        session.commit()
+        with (
+            patch("naomi_streamlit.events.payload_viewer.read_session_scope") as mock_session_scope,
+            patch("naomi_streamlit.events.payload_viewer.PAYLOAD_PREVIEW_CHARS", 100),
+            patch("naomi_streamlit.events.payload_viewer.PAYLOAD_VIEW_MAX_BYTES", 400),
+        ):
+            mock_session_scope.return_value.__enter__.return_value = session
+            draw_event_payload(1, size_bytes)
+
+
+def test_payload_preview_is_truncated():
+    at = AppTest.from_function(event_payload_wrapper, args=(LARGE_PAYLOAD, len(LARGE_PAYLOAD)))
+    at.run()
+
+    assert not at.exception
+    assert "(536 B)" in at.caption[0].value
+    assert at.code[0].value == LARGE_PAYLOAD[:100] + "\n…"
+    assert len(at.json) == 0
+
+
+def test_small_payload_preview_is_complete():
+    at = AppTest.from_function(event_payload_wrapper, args=('{"subject": "Hi"}', 17))
+    at.run()
+
+    assert at.code[0].value == '{"subject": "Hi"}'
+    # Only the "Payload of event" caption, no truncation notice
+    assert len(at.caption) == 1
+
+
+def test_full_payload_is_capped():
+    at = AppTest.from_function(event_payload_wrapper, args=(LARGE_PAYLOAD, len(LARGE_PAYLOAD)))
+    at.run()
+
+    at.toggle(key="event_1_full_payload").set_value(True).run()
+
+    assert not at.exception
+    assert len(at.json) == 0
+    assert "too large to display" in at.warning[0].value
+
+
+@patch("naomi_streamlit.events.payload_viewer.PAYLOAD_VIEW_MAX_BYTES", 1_000)
+def test_full_payload_is_parsed():
+    payload = json.dumps({"subject": "Statement"})
+    at = AppTest.from_function(event_payload_wrapper, args=(payload, len(payload)))
+    at.run()
+
+    at.toggle(key="event_1_full_payload").set_value(True).run()
+
+    assert not at.exception
+    assert len(at.json) == 1
+    assert len(at.warning) == 0
+
+
+def test_format_size():
+    assert format_size(None) == "unknown size"
+    assert format_size(512) == "512 B"
+    assert format_size(2048) == "2.0 KB"
+    assert format_size(5 * 1024 * 1024) == "5.0 MB"
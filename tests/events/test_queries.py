@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.db.models import EventPayloadSize
+from naomi_streamlit.events.queries import (
+    delete_events,
+    distinct_values,
+    fetch_event_page,
+    load_payload,
+    load_payload_preview,
+    payload_sizes_pending,
+    record_payload_sizes,
+    set_event_status,
+)
+from tests.conftest import in_memory_session
+from tests.events.conftest import EPOCH, add_events
+
+
+def collect_pages(session, page_size: int, **kwargs) -> list[list[int]]:
+    pages = []
+    cursor = None
+    while True:
+        page = fetch_event_page(session, page_size, cursor, **kwargs)
+        pages.append([event.id for event in page.events])
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_fetch_event_page_newest_first():
+    with in_memory_session() as session:
+        add_events(session, 10)
+
+        pages = collect_pages(session, 4)
+
+        assert pages == [[10, 9, 8, 7], [6, 5, 4, 3], [2, 1]]
+
+
+def test_fetch_event_page_oldest_first():
+    with in_memory_session() as session:
+        add_events(session, 10)
+
+        pages = collect_pages(session, 5, newest_first=False)
+
+        assert pages == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+
+
+def test_fetch_event_page_filters():
+    with in_memory_session() as session:
+        add_events(session, 12, event_types=("email", "sms"), statuses=("pending", "done", "x"))
+
+        assert collect_pages(session, 10, event_type="sms") == [[11, 9, 7, 5, 3, 1]]
+        assert collect_pages(session, 10, status="done") == [[10, 7, 4, 1]]
+        assert collect_pages(session, 10, event_type="email", status="pending") == [[12, 6]]
+
+
+def test_distinct_values():
+    with in_memory_session() as session:
+        add_events(session, 6, event_types=("sms", "email"))
+
+        assert distinct_values(session, WebhookEvent.event_type) == ["email", "sms"]
+
+
+def test_fetch_event_page_projects_columns():
+    with in_memory_session() as session:
+        add_events(session, 2)
+
+        record_payload_sizes(session)
+        page = fetch_event_page(session, 10)
+
+        assert list(page.events[0]._fields) == [
+            "id",
+            "event_type",
+            "created_at",
+            "status",
+            "payload_size",
+        ]
+        assert page.events[0].payload_size == len('{"subject": "Event 2"}')
+
+
+def test_bulk_event_updates():
+    with in_memory_session() as session:
+        add_events(session, 5)
+
+        assert set_event_status(session, [1, 2], "failed") == 2
+        assert delete_events(session, [2, 3]) == 2
+        assert delete_events(session, []) == 0
+
+        statuses = dict(session.execute(select(WebhookEvent.id, WebhookEvent.status)).all())
+        assert statuses == {1: "failed", 4: "pending", 5: "pending"}
+        assert load_payload(session, 4) == '{"subject": "Event 4"}'
+        assert load_payload(session, 2) is None
+
+
+def test_delete_events_by_criteria():
+    with in_memory_session() as session:
+        add_events(session, 12, event_types=("email", "sms"), statuses=("pending", "done", "x"))
+
+        # Events 1 to 5 were created before EPOCH + 3 minutes
+        assert delete_events(session, older_than=EPOCH + timedelta(minutes=3), status="done") == 2
+        assert delete_events(session, event_type="sms", status="pending") == 2
+        assert delete_events(session, [5, 6, 7], event_type="sms") == 2
+
+        remaining = session.scalars(select(WebhookEvent.id).order_by(WebhookEvent.id)).all()
+        assert remaining == [2, 6, 8, 10, 11, 12]
+
+
+def test_delete_events_requires_criteria():
+    with in_memory_session() as session:
+        add_events(session, 3)
+
+        with pytest.raises(ValueError):
+            delete_events(session)
+
+        assert session.query(WebhookEvent).count() == 3
+
+
+def test_record_payload_sizes():
+    with in_memory_session() as session:
+        add_events(session, 3)
+        session.add(WebhookEvent(id=4, event_type="email", payload='{"body": "é"}'))
+        session.commit()
+
+        assert record_payload_sizes(session) == 4
+        assert record_payload_sizes(session) == 0
+
+        query = select(EventPayloadSize.event_id, EventPayloadSize.size_bytes)
+        sizes = dict(session.execute(query).all())
+        # Sizes are in bytes, not characters
+        assert sizes == {1: 22, 2: 22, 3: 22, 4: 14}
+
+        delete_events(session, [4])
+        assert session.get(EventPayloadSize, 4) is None
+
+
+def test_payload_sizes_pending():
+    with in_memory_session() as session:
+        assert not payload_sizes_pending(session)
+
+        add_events(session, 3)
+        assert payload_sizes_pending(session)
+
+        record_payload_sizes(session)
+        assert not payload_sizes_pending(session)
+
+
+def test_fetch_event_page_before_sizes_are_recorded():
+    with in_memory_session() as session:
+        add_events(session, 2)
+
+        page = fetch_event_page(session, 10)
+
+        assert [event.payload_size for event in page.events] == [None, None]
+
+
+def test_load_payload_preview():
+    with in_memory_session() as session:
+        add_events(session, 1)
+
+        assert load_payload_preview(session, 1, 5) == '{"sub'
+        assert load_payload_preview(session, 1, 100) == '{"subject": "Event 1"}'
+        assert load_payload_preview(session, 2, 5) is None
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from naomi_core.db.core import Base
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.events.retention import (
+    RetentionPolicy,
+    RetentionScheduler,
+    apply_retention,
+    start_retention,
+)
+from tests.conftest import in_memory_session
+from tests.events.conftest import EPOCH, add_events
+
+
+def remaining_ids(session) -> list[int]:
+    return [event.id for event in session.query(WebhookEvent).order_by(WebhookEvent.id)]
+
+
+def test_apply_retention():
+    with in_memory_session() as session:
+        add_events(session, 10, statuses=("pending", "processed"))
+        now = EPOCH + timedelta(days=7, minutes=3)
+
+        deleted = apply_retention(session, RetentionPolicy(timedelta(days=7)), now)
+
+        # Events 1 to 5 are more than a week old
+        assert deleted == 5
+        assert remaining_ids(session) == [6, 7, 8, 9, 10]
+
+
+def test_apply_retention_by_status():
+    with in_memory_session() as session:
+        add_events(session, 10, statuses=("pending", "processed"))
+        now = EPOCH + timedelta(days=30)
+
+        deleted = apply_retention(session, RetentionPolicy(timedelta(days=7), "processed"), now)
+
+        assert deleted == 5
+        assert remaining_ids(session) == [2, 4, 6, 8, 10]
+
+
+def test_retention_scheduler_runs_in_background():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        add_events(session, 4)
+
+    scheduler = RetentionScheduler(session_factory, RetentionPolicy(timedelta(days=1)), 60)
+    with patch.object(scheduler, "run_once", wraps=scheduler.run_once) as run_once:
+        scheduler.start()
+        scheduler.stop()
+        scheduler.join(timeout=5)
+
+    assert not scheduler.is_alive()
+    run_once.assert_called_once()
+    with session_factory() as session:
+        assert remaining_ids(session) == []
+
+
+@patch("naomi_streamlit.events.retention.EVENTS_RETENTION_DAYS", 0)
+def test_start_retention_disabled():
+    assert start_retention(sessionmaker()) is None
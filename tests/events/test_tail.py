@@ -0,0 +1,73 @@
+from sqlalchemy import event, update
+
+from naomi_core.db.webhook import WebhookEvent
+from naomi_streamlit.events.queries import fetch_event_changes
+from naomi_streamlit.events.tail import poll_tail, start_tail
+from tests.conftest import in_memory_session
+from tests.events.conftest import add_events
+
+
+def tail_ids(tail) -> list[int]:
+    return [row.id for row in tail.newest_first()]
+
+
+def test_fetch_event_changes():
+    with in_memory_session() as session:
+        add_events(session, 6)
+        session.execute(update(WebhookEvent).where(WebhookEvent.id == 2).values(status="done"))
+
+        rows = fetch_event_changes(session, 4, {1: "pending", 2: "pending", 3: "pending"})
+
+        assert [(row.id, row.status) for row in rows] == [
+            (2, "done"),
+            (5, "pending"),
+            (6, "pending"),
+        ]
+
+
+def test_start_tail_keeps_newest_rows():
+    with in_memory_session() as session:
+        add_events(session, 8)
+
+        tail = start_tail(session, 5)
+
+        assert tail_ids(tail) == [8, 7, 6, 5, 4]
+        assert tail.last_id == 8
+
+
+def test_poll_tail_appends_and_tracks_status_changes():
+    with in_memory_session() as session:
+        add_events(session, 4)
+        tail = start_tail(session, 3)
+
+        session.add(WebhookEvent(id=5, event_type="email", payload="{}", status="pending"))
+        session.execute(update(WebhookEvent).where(WebhookEvent.id == 3).values(status="done"))
+        session.commit()
+
+        assert poll_tail(session, tail) == 2
+        assert tail_ids(tail) == [5, 4, 3]
+        assert tail.rows[3].status == "done"
+        assert [(c.event_id, c.old_status, c.new_status) for c in tail.changes] == [
+            (3, "pending", "done")
+        ]
+
+        # Event 2 already left the tail, so its changes are not watched
+        session.execute(update(WebhookEvent).where(WebhookEvent.id == 2).values(status="done"))
+        assert poll_tail(session, tail) == 0
+
+
+def test_idle_poll_is_a_single_empty_query():
+    with in_memory_session() as session:
+        add_events(session, 20)
+        tail = start_tail(session, 10)
+
+        statements = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        assert poll_tail(session, tail) == 0
+        assert len(statements) == 1
+        assert (tail.polls, tail.empty_polls) == (1, 1)
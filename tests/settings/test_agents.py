@@ -1,20 +1,19 @@
 from unittest.mock import patch, MagicMock
 from streamlit.testing.v1 import AppTest
 
+from naomi_streamlit.settings.agent_settings import agent_toggle_key, responsibility_toggle_key
 from tests.settings.conftest import run_wrapper
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-@patch("naomi_streamlit.settings.agent_settings.load_responsibilities_from_db")
-def test_agents_tab(
-    mock_load_responsibilities, mock_get_all_agents, mock_session_scope, mock_agent
-):
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
+def test_agents_tab(mock_load_responsibilities, mock_load_agents, mock_session_scope, mock_agent):
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
-    mock_load_responsibilities.return_value = []
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: []}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -31,36 +30,37 @@ def test_agents_tab(
 
     # Basic assertions
     assert at.title[0].value == "Settings"
-    assert mock_get_all_agents.called
+    assert mock_load_agents.called
     assert mock_load_responsibilities.called
 
     # Check for the Header element in the agents tab
     assert "children" in dir(agents_tab)
     assert len(agents_tab.children) > 0
 
-    # Based on the debug output, we can see the header is the first child (index 0)
-    assert hasattr(agents_tab.children[0], "tag")
-    assert agents_tab.children[0].tag == "h2"
+    # The agent filter comes first, followed by the agent header
+    assert agents_tab.children[0].label == "🔎 Filter agents"
+    assert hasattr(agents_tab.children[1], "tag")
+    assert agents_tab.children[1].tag == "h2"
 
     # Also verify the delete button exists
-    assert agents_tab.children[1].key == "Test Agent_delete"
-    assert agents_tab.children[1].label == "🗑️ Delete"
+    assert agents_tab.children[2].key == "Test Agent_delete"
+    assert agents_tab.children[2].label == "🗑️ Delete"
 
     # Verify form element exists
-    assert len(agents_tab.children[2].children) > 0
+    assert len(agents_tab.children[3].children) > 0
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-@patch("naomi_streamlit.settings.agent_settings.load_responsibilities_from_db")
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
 def test_agent_settings_form(
-    mock_load_responsibilities, mock_get_all_agents, mock_session_scope, mock_agent
+    mock_load_responsibilities, mock_load_agents, mock_session_scope, mock_agent
 ):
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
-    mock_load_responsibilities.return_value = []
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: []}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -70,8 +70,8 @@ def test_agent_settings_form(
 
     agents_tab = at.tabs[0]
 
-    # The form is inside the agent tab as the third child (index 2)
-    agent_form = agents_tab.children[2]
+    # The form is inside the agent tab as the fourth child (index 3)
+    agent_form = agents_tab.children[3]
 
     # Access the children by index directly from the form_children dict
     form_children = agent_form.children
@@ -102,16 +102,16 @@ def test_agent_settings_form(
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-@patch("naomi_streamlit.settings.agent_settings.load_responsibilities_from_db")
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
 def test_new_responsibility_form(
-    mock_load_responsibilities, mock_get_all_agents, mock_session_scope, mock_agent
+    mock_load_responsibilities, mock_load_agents, mock_session_scope, mock_agent
 ):
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
-    mock_load_responsibilities.return_value = []
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: []}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -121,8 +121,8 @@ def test_new_responsibility_form(
 
     agents_tab = at.tabs[0]
 
-    # Find the "Create New Responsibility" expander (index 4 in the agents tab children)
-    expander = agents_tab.children[4]
+    # Find the "Create New Responsibility" expander (index 5 in the agents tab children)
+    expander = agents_tab.children[5]
     assert "Create New Responsibility" in expander.label
 
     # Expand the expander
@@ -164,11 +164,11 @@ def test_new_responsibility_form(
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-@patch("naomi_streamlit.settings.agent_settings.load_responsibilities_from_db")
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
 def test_responsibility_form(
     mock_load_responsibilities,
-    mock_get_all_agents,
+    mock_load_agents,
     mock_session_scope,
     mock_agent,
     mock_responsibility,
@@ -176,8 +176,8 @@ def test_responsibility_form(
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
-    mock_load_responsibilities.return_value = [mock_responsibility]
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: [mock_responsibility]}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -194,12 +194,14 @@ def test_responsibility_form(
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-def test_delete_agent(mock_get_all_agents, mock_session_scope, mock_agent):
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
+def test_delete_agent(mock_load_responsibilities, mock_load_agents, mock_session_scope, mock_agent):
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: []}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -209,8 +211,8 @@ def test_delete_agent(mock_get_all_agents, mock_session_scope, mock_agent):
 
     agents_tab = at.tabs[0]
 
-    # Find the delete button (second child in the agents tab)
-    delete_button = agents_tab.children[1]
+    # Find the delete button (third child in the agents tab)
+    delete_button = agents_tab.children[2]
     assert delete_button.key == "Test Agent_delete"
     assert delete_button.label == "🗑️ Delete"
 
@@ -226,11 +228,11 @@ def test_delete_agent(mock_get_all_agents, mock_session_scope, mock_agent):
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
-@patch("naomi_streamlit.settings.agent_settings.load_responsibilities_from_db")
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_responsibilities")
 def test_delete_responsibility(
     mock_load_responsibilities,
-    mock_get_all_agents,
+    mock_load_agents,
     mock_session_scope,
     mock_agent,
     mock_responsibility,
@@ -238,8 +240,8 @@ def test_delete_responsibility(
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = [mock_agent]
-    mock_load_responsibilities.return_value = [mock_responsibility]
+    mock_load_agents.return_value = [mock_agent]
+    mock_load_responsibilities.return_value = {mock_agent.name: [mock_responsibility]}
 
     # Run the app
     at = AppTest.from_function(run_wrapper)
@@ -255,3 +257,93 @@ def test_delete_responsibility(
     # Verify responsibility was deleted
     mock_session.delete.assert_called_with(mock_responsibility)
     mock_session.commit.assert_called()
+
+
+def agents_tab_query_count_wrapper(agent_count: int):  # pragma: no cover
+    from unittest.mock import patch
+    import streamlit as st
+    from sqlalchemy import event
+    from naomi_core.db.agent import AgentModel, AgentResponsibilityModel
+    from naomi_streamlit.settings.agent_settings import show_agents_tab
+    from tests.conftest import in_memory_session
+
+    with in_memory_session() as session:
+        for i in range(agent_count):
+            session.add(AgentModel(name=f"Agent {i}", prompt="Prompt"))
+            for j in range(3):
+                session.add(
+                    AgentResponsibilityModel(
+                        agent_name=f"Agent {i}", name=f"Responsibility {j}", description="..."
+                    )
+                )
+        session.commit()
+
+        statements = []
+        engine = session.get_bind()
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        with patch("naomi_streamlit.settings.agent_settings.session_scope") as mock_session_scope:
+            mock_session_scope.return_value.__enter__.return_value = session
+            show_agents_tab()
+        st.session_state["_query_count_"] = len(statements)
+
+
+@patch("naomi_streamlit.settings.agent_settings.LAZY_FORMS_THRESHOLD", 1000)
+def test_agents_tab_query_count_is_constant():
+    query_counts = []
+    for agent_count in (2, 20):
+        at = AppTest.from_function(agents_tab_query_count_wrapper, args=(agent_count,))
+        at.run(timeout=10)
+
+        assert not at.exception
+        assert len(at.expander) == agent_count * 4
+        query_counts.append(at.session_state["_query_count_"])
+
+    assert query_counts == [2, 2]
+
+
+@patch("naomi_streamlit.settings.agent_settings.LAZY_FORMS_THRESHOLD", 5)
+def test_agents_tab_lazy_forms():
+    at = AppTest.from_function(agents_tab_query_count_wrapper, args=(20,))
+    at.run(timeout=10)
+
+    assert not at.exception
+    # One toggle per agent, no forms and no responsibilities loaded until an agent is opened
+    assert len(at.toggle) == 20
+    assert len(at.expander) == 0
+    assert len(at.text_area) == 0
+    assert at.session_state["_query_count_"] == 1
+
+    at.toggle(key="agent_open:Agent 3").set_value(True).run(timeout=10)
+
+    assert not at.exception
+    assert at.header[0].value == "Agent 3 Agent"
+    # The prompt and the new responsibility form, responsibilities stay collapsed toggles
+    assert len(at.text_area) == 2
+    assert len(at.toggle) == 20 + 3
+    assert at.session_state["_query_count_"] == 2
+
+
+def test_agents_tab_filter():
+    at = AppTest.from_function(agents_tab_query_count_wrapper, args=(12,))
+    at.run(timeout=10)
+    assert len(at.toggle) == 12
+
+    at.text_input(key="agent_filter").set_value("agent 1").run(timeout=10)
+
+    assert not at.exception
+    # Agent 1, Agent 10 and Agent 11 are few enough to be drawn eagerly
+    assert len(at.toggle) == 0
+    assert [header.value for header in at.header] == [
+        "Agent 1 Agent",
+        "Agent 10 Agent",
+        "Agent 11 Agent",
+    ]
+
+
+def test_toggle_keys_do_not_collide():
+    agent = MagicMock()
+    agent.name = "Writer_Editor"
+    responsibility = MagicMock(agent_name="Writer")
+    responsibility.name = "Editor"
+
+    assert agent_toggle_key(agent) != responsibility_toggle_key(responsibility)
@@ -5,13 +5,13 @@ from tests.settings.conftest import run_wrapper
 
 
 @patch("naomi_streamlit.settings.agent_settings.session_scope")
-@patch("naomi_streamlit.settings.agent_settings.get_all_agents")
+@patch("naomi_streamlit.settings.agent_settings.load_agents")
 @patch("naomi_streamlit.settings.db_settings.get_all_tables")
-def test_database_tab(mock_get_all_tables, mock_get_all_agents, mock_session_scope):
+def test_database_tab(mock_get_all_tables, mock_load_agents, mock_session_scope):
     # Set up mocks
     mock_session = MagicMock()
     mock_session_scope.return_value.__enter__.return_value = mock_session
-    mock_get_all_agents.return_value = []
+    mock_load_agents.return_value = []
     mock_get_all_tables.return_value = [{"name": "test_table", "count": 5}]
 
     # Run the app
@@ -59,4 +59,4 @@ def test_wipe_database(mock_wipe_db):
     wipe_db()
 
     # Now the mock should have been called
-    assert mock_wipe_db.called
\ No newline at end of file
+    assert mock_wipe_db.called
@@ -0,0 +1,26 @@
+from sqlalchemy import inspect
+
+from benchmarks import bench_suite
+from benchmarks.common import temporary_database
+from naomi_streamlit.db.models import TABLES, core_metadata
+
+
+def test_temporary_database_has_front_end_tables():
+    with temporary_database() as session_factory:
+        tables = set(inspect(session_factory.kw["bind"]).get_table_names())
+
+    assert {table.name for table in TABLES} <= tables
+    assert set(core_metadata.tables) <= tables
+
+
+def test_bench_suite_runs_on_tiny_data():
+    sizes = {"chat": [5], "settings": [2], "events": [5]}
+
+    results = bench_suite.run(sizes, reruns=2, timeout=30)
+
+    assert [(row["page"], row["size"]) for row in results] == [
+        ("chat", 5),
+        ("settings", 2),
+        ("events", 5),
+    ]
+    assert all(row["queries_per_rerun"] > 0 for row in results)
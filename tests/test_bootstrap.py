@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock, patch
+
+from naomi_streamlit.bootstrap import bootstrap, parse_args
+
+
+@patch("naomi_streamlit.bootstrap.start_summarizer")
+@patch("naomi_streamlit.bootstrap.start_compaction")
+@patch("naomi_streamlit.bootstrap.start_retention")
+@patch("naomi_streamlit.bootstrap.backfill_conversations")
+@patch("naomi_streamlit.bootstrap.create_indexes")
+@patch("naomi_streamlit.bootstrap.create_tables")
+@patch("naomi_streamlit.bootstrap.database")
+@patch("naomi_streamlit.bootstrap.initialize_db")
+@patch("naomi_streamlit.bootstrap.load_dotenv")
+@patch("naomi_streamlit.bootstrap.logging.basicConfig")
+def test_bootstrap_runs_once(
+    mock_basic_config,
+    mock_load_dotenv,
+    mock_initialize_db,
+    mock_database,
+    mock_create_tables,
+    mock_create_indexes,
+    mock_backfill_conversations,
+    mock_start_retention,
+    mock_start_compaction,
+    mock_start_summarizer,
+):
+    engine = MagicMock()
+    mock_database.return_value.engine = engine
+    bootstrap.clear()
+
+    first = bootstrap()
+    second = bootstrap()
+
+    assert first is second
+    assert first.engine is engine
+    assert first.session_factory is mock_database.return_value.session_factory
+    mock_load_dotenv.assert_called_once()
+    mock_basic_config.assert_called_once()
+    mock_initialize_db.assert_called_once()
+    mock_create_tables.assert_called_once_with(engine)
+    mock_create_indexes.assert_called_once_with(engine)
+    session_factory = mock_database.return_value.session_factory
+    mock_backfill_conversations.assert_called_once_with(
+        session_factory.return_value.__enter__.return_value
+    )
+    mock_start_retention.assert_called_once_with(first.session_factory)
+    assert first.retention is mock_start_retention.return_value
+    mock_start_compaction.assert_called_once_with(first.session_factory)
+    assert first.compaction is mock_start_compaction.return_value
+    mock_start_summarizer.assert_called_once_with(first.session_factory)
+    assert first.summarizer is mock_start_summarizer.return_value
+
+    bootstrap.clear()
+
+
+@patch("naomi_streamlit.bootstrap.start_summarizer")
+@patch("naomi_streamlit.bootstrap.start_compaction")
+@patch("naomi_streamlit.bootstrap.start_retention")
+@patch("naomi_streamlit.bootstrap.backfill_conversations")
+@patch("naomi_streamlit.bootstrap.create_indexes")
+@patch("naomi_streamlit.bootstrap.create_tables")
+@patch("naomi_streamlit.bootstrap.database")
+@patch("naomi_streamlit.bootstrap.initialize_db")
+@patch("naomi_streamlit.bootstrap.logging.basicConfig")
+def test_bootstrap_stops_threads_of_cleared_runtime(
+    mock_basic_config,
+    mock_initialize_db,
+    mock_database,
+    mock_create_tables,
+    mock_create_indexes,
+    mock_backfill_conversations,
+    mock_start_retention,
+    mock_start_compaction,
+    mock_start_summarizer,
+):
+    for mock_start in (mock_start_retention, mock_start_compaction, mock_start_summarizer):
+        mock_start.side_effect = lambda session_factory: MagicMock()
+    bootstrap.clear()
+
+    first = bootstrap()
+    bootstrap.clear()
+    second = bootstrap()
+
+    for thread in (first.retention, first.compaction, first.summarizer):
+        thread.stop.assert_called_once()
+    for thread in (second.retention, second.compaction, second.summarizer):
+        thread.stop.assert_not_called()
+
+    bootstrap.clear()
+
+
+@patch("sys.argv", ["app.py", "--log_level", "debug", "--server.port", "8501"])
+def test_parse_args_ignores_unknown():
+    assert parse_args().log_level == "debug"
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from streamlit.testing.v1 import AppTest
+
+from naomi_streamlit.db.engine import Database, create_pooled_engine
+
+
+def run_wrapper():  # pragma: no cover
+    from naomi_streamlit.diagnostics import show_diagnostics
+
+    show_diagnostics()
+
+
+@patch("naomi_streamlit.diagnostics.database")
+def test_diagnostics_shows_pool_stats(mock_database, tmp_path):
+    engine = create_pooled_engine(create_engine(f"sqlite:///{tmp_path / 'app.db'}").url)
+    mock_database.return_value = Database(engine, None)
+
+    at = AppTest.from_function(run_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert at.title[0].value == "Diagnostics"
+    assert [metric.label for metric in at.metric] == [
+        "Pool size",
+        "Checked out",
+        "Checked in",
+        "Overflow",
+        "Hit rate",
+        "Hits",
+        "Misses",
+    ]
+    assert at.metric[0].value == "5"
+    assert at.metric[3].value == "0 / 10"
+    assert "submitted" in at.json[0].value
+    assert "hit_rate" in at.json[2].value
+
+
+@patch("naomi_streamlit.diagnostics.database")
+def test_diagnostics_without_pool(mock_database):
+    mock_database.return_value = Database(create_engine("sqlite://"), None)
+
+    at = AppTest.from_function(run_wrapper)
+    at.run()
+
+    assert not at.exception
+    assert "SingletonThreadPool" in at.info[0].value
@@ -0,0 +1,146 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from streamlit.testing.v1 import AppTest
+
+from naomi_streamlit.chat.streaming import StreamStats
+from naomi_streamlit.perf import (
+    QUERY_START_KEY,
+    RerunProfile,
+    current_profile,
+    export_jsonl,
+    install_sql_hooks,
+    phase,
+    record_stream,
+)
+from tests.conftest import in_memory_session
+
+
+def profiled_wrapper():  # pragma: no cover
+    from unittest.mock import patch
+    from sqlalchemy import delete, text
+    from naomi_core.db.webhook import WebhookEvent
+    from naomi_streamlit.perf import phase, profile_rerun
+    from tests.conftest import in_memory_session
+
+    with patch("naomi_streamlit.perf.PERF_INSTRUMENTATION", True):
+        with profile_rerun("test"):
+            with phase("queries"), in_memory_session() as session:
+                for _ in range(3):
+                    session.execute(text("SELECT 1"))
+                session.execute(delete(WebhookEvent))
+            with phase("queries"):
+                pass
+            with phase("drawing"):
+                import streamlit as st
+
+                st.write("Hello")
+
+
+def test_profile_rerun_records_phases_and_sql():
+    at = AppTest.from_function(profiled_wrapper)
+    at.run()
+    at.run()
+
+    assert not at.exception
+    history = at.session_state["perf_reruns"]
+    assert len(history) == 2
+    profile = history[-1]
+    assert profile.page == "test"
+    assert set(profile.phases) == {"queries", "drawing"}
+    assert profile.phase_calls == {"queries": 2, "drawing": 1}
+    assert profile.sql_count >= 4
+    assert profile.sql_write_count >= 1
+    assert 0 < profile.sql_write_time <= profile.sql_time
+    assert profile.duration >= sum(profile.phases.values())
+
+    # The panel shows the rerun before the current one
+    assert at.sidebar.expander[0].label == "⏱️ Performance"
+    assert at.sidebar.metric[0].label == "Last rerun"
+    assert at.sidebar.caption[0].value == "1 reruns recorded"
+
+
+def disabled_wrapper():  # pragma: no cover
+    import streamlit as st
+    from naomi_streamlit.perf import profile_rerun
+
+    with profile_rerun("test") as profile:
+        st.session_state["_profile_"] = profile
+
+
+def test_profile_rerun_is_off_by_default():
+    at = AppTest.from_function(disabled_wrapper)
+    at.run()
+
+    assert at.session_state["_profile_"] is None
+    assert "perf_reruns" not in at.session_state
+    assert len(at.sidebar.expander) == 0
+
+
+def test_phase_without_profile_is_a_no_op():
+    with phase("anything"):
+        pass
+
+
+def test_sql_hooks_keep_no_start_times_without_profile():
+    install_sql_hooks()
+    with in_memory_session() as session:
+        for _ in range(3):
+            session.execute(text("SELECT 1"))
+
+        assert not session.connection().info.get(QUERY_START_KEY)
+
+
+def test_sql_hooks_drop_start_times_of_failed_statements():
+    install_sql_hooks()
+    token = current_profile.set(RerunProfile(page="test"))
+    try:
+        with in_memory_session() as session:
+            with pytest.raises(OperationalError):
+                session.execute(text("SELECT * FROM missing_table"))
+            session.rollback()
+            session.execute(text("SELECT 1"))
+
+            assert not session.connection().info.get(QUERY_START_KEY)
+    finally:
+        current_profile.reset(token)
+
+
+def test_export_jsonl(tmp_path):
+    profile = RerunProfile("home", started_at=1.0, duration=0.5, sql_count=2)
+    profile.add_phase("draw_messages", 0.25)
+
+    lines = export_jsonl([profile, RerunProfile("settings")]).splitlines()
+
+    assert len(lines) == 2
+    assert json.loads(lines[0])["phases"] == {"draw_messages": 0.25}
+    assert json.loads(lines[1])["page"] == "settings"
+
+
+def test_profile_rerun_appends_to_export_file(tmp_path):
+    export_path = tmp_path / "perf.jsonl"
+    with patch("naomi_streamlit.perf.PERF_EXPORT_PATH", str(export_path)):
+        at = AppTest.from_function(profiled_wrapper)
+        at.run()
+        at.run()
+
+    rows = [json.loads(line) for line in export_path.read_text().splitlines()]
+    assert [row["page"] for row in rows] == ["test", "test"]
+
+
+def test_record_stream():
+    from naomi_streamlit.perf import current_profile
+
+    stats = StreamStats(tokens=10, started_at=0.0, first_token_at=0.2, finished_at=2.0)
+    profile = RerunProfile("home")
+    token = current_profile.set(profile)
+    try:
+        record_stream(stats)
+    finally:
+        current_profile.reset(token)
+
+    assert profile.time_to_first_token == 0.2
+    assert profile.tokens_per_second == 5.0